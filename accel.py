@@ -0,0 +1,501 @@
+import io
+import os
+import time
+import zlib
+import threading
+import hashlib
+import zipfile
+import logging
+
+logger = logging.getLogger("GitHubDownloader")
+
+
+# ════════════════════════════════════════════════
+# Accelerated Inflate / Hash Backends
+# ════════════════════════════════════════════════
+#
+# فك الضغط هو أكبر تكلفة CPU في المستودعات الكبيرة.
+# لو مكتبة أسرع متثبتة (isal / zlib-ng) تُستخدم تلقائياً
+# وإلا zlib القياسية. GH_INFLATE يفرض backend معين.
+
+INFLATE_BACKENDS = ("isal", "zlib_ng", "zlib")
+
+_LOCAL_HEADER = 30
+_LOCAL_SIG = b"PK\x03\x04"
+
+
+def _load_inflate(name):
+    """تحميل وحدة الـ backend — ImportError لو غير متثبت"""
+    if name == "isal":
+        from isal import isal_zlib
+        return isal_zlib
+    if name == "zlib_ng":
+        from zlib_ng import zlib_ng
+        return zlib_ng
+    if name == "zlib":
+        return zlib
+    raise ValueError(f"unknown inflate backend: {name!r}")
+
+
+def available_inflate():
+    """أسماء الـ backends المتاحة بالترتيب المفضل"""
+    names = []
+    for name in INFLATE_BACKENDS:
+        try:
+            _load_inflate(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+_inflate = None
+
+
+def inflate_backend():
+    """
+    الـ backend المختار: (name, module).
+    GH_INFLATE=isal/zlib_ng/zlib للفرض، وإلا أسرع المتاح.
+    """
+    global _inflate
+    if _inflate is None:
+        forced = os.environ.get("GH_INFLATE", "").strip()
+        choice = None
+        if forced:
+            try:
+                choice = (forced, _load_inflate(forced))
+            except (ImportError, ValueError) as e:
+                logger.warning(
+                    f"GH_INFLATE={forced} غير متاح ({e})،"
+                    " استخدام الافتراضي"
+                )
+        if choice is None:
+            name = available_inflate()[0]
+            choice = (name, _load_inflate(name))
+        _inflate = choice
+    return _inflate
+
+
+def hash_backend():
+    """اسم تنفيذ SHA-256: openssl (SHA-NI) أو builtin"""
+    if hashlib.sha256.__name__.startswith("openssl_"):
+        return "openssl"
+    return "builtin"
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """
+    SHA-256 لملف كامل — يرجع كائن hash قابل للتحديث.
+    file_digest (3.11+) يقرأ بـ readinto في buffer واحد.
+    """
+    with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256")
+        h = hashlib.sha256()
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+        return h
+
+
+def describe():
+    """وصف الـ backends المستخدمة (للتقرير والسجل)"""
+    return {"inflate": inflate_backend()[0], "hash": hash_backend()}
+
+
+# ════════════════════════════════════════════════
+# Reusable Buffers
+# ════════════════════════════════════════════════
+#
+# الحلقات الساخنة (تحميل / فك / hashing) كانت تخصص bytes
+# جديدة 64 KB لكل chunk. هنا buffer لكل thread يُعاد
+# استخدامه مع readinto، وحجمه يكبر مع حجم الملف أو السرعة.
+
+MIN_BUFFER = 64 * 1024
+MAX_BUFFER = 1024 * 1024
+
+_local = threading.local()
+
+
+def buffer_size(size_hint=0, rate=0):
+    """
+    حجم مناسب (قوة 2 بين MIN_BUFFER و MAX_BUFFER):
+    ~1/16 من حجم الملف، أو ~50ms من البيانات بالسرعة الحالية.
+    """
+    want = max(size_hint // 16, int(rate) // 20)
+    n = MIN_BUFFER
+    while n < want and n < MAX_BUFFER:
+        n <<= 1
+    return n
+
+
+def get_buffer(size, slot="io"):
+    """
+    memoryview بطول size على bytearray خاص بالـ thread
+    (يكبر فقط). slot يفصل الاستخدامات المتداخلة.
+    """
+    pool = getattr(_local, "buffers", None)
+    if pool is None:
+        pool = _local.buffers = {}
+    buf = pool.get(slot)
+    if buf is None or len(buf) < size:
+        buf = pool[slot] = bytearray(size)
+    return memoryview(buf)[:size]
+
+
+def copy_stream(src, dst=None, size_hint=0, check=None,
+                on_chunk=None, slot="copy"):
+    """
+    نسخ src → dst بـ readinto في buffer مُعاد الاستخدام.
+    dst=None: قراءة فقط (مثلاً hashing عبر on_chunk).
+    check(): قبل كل جزء (للإلغاء). يرجع عدد البايتات.
+    """
+    readinto = getattr(src, "readinto", None)
+    if getattr(type(src), "readinto", None) is io.BufferedIOBase.readinto:
+        # readinto الافتراضية = read() + نسخ: buffer كبير
+        # هنا معناه تخصيص كبير لكل جزء (ZipExtFile مثلاً)
+        size_hint = 0
+    view = get_buffer(buffer_size(size_hint), slot)
+    total = 0
+    while True:
+        if check is not None:
+            check()
+        if readinto is not None:
+            n = readinto(view)
+            data = view[:n]
+        else:
+            data = src.read(len(view))
+            n = len(data)
+        if not n:
+            break
+        if on_chunk is not None:
+            on_chunk(data)
+        if dst is not None:
+            dst.write(data)
+        total += n
+    return total
+
+
+# ════════════════════════════════════════════════
+# ZIP Member Reader
+# ════════════════════════════════════════════════
+
+class DeflateMemberReader:
+    """
+    قراءة عضو ZIP مضغوط بـ deflate عبر الـ backend المختار،
+    مع التحقق من CRC-32 والحجم في النهاية (مثل zipfile).
+    يفتح مقبض ملف مستقل فآمن مع عدة threads.
+    """
+
+    def __init__(self, path, info, module):
+        self.info = info
+        self._mod = module
+        self._fp = open(path, "rb")
+        try:
+            self._fp.seek(info.header_offset)
+            header = self._fp.read(_LOCAL_HEADER)
+            if (
+                len(header) != _LOCAL_HEADER
+                or header[:4] != _LOCAL_SIG
+            ):
+                raise zipfile.BadZipFile(
+                    f"Bad magic number for file header:"
+                    f" {info.filename}"
+                )
+            name_len = int.from_bytes(header[26:28], "little")
+            extra_len = int.from_bytes(header[28:30], "little")
+            # الاسم في الـ local header = الـ central directory
+            # (زي zipfile): offset مزيف يقرأ عضو تاني
+            name = self._fp.read(name_len).decode(
+                "utf-8" if info.flag_bits & 0x800 else "cp437",
+                "replace"
+            )
+            if name != info.orig_filename:
+                raise zipfile.BadZipFile(
+                    f"File name in directory {info.orig_filename!r}"
+                    f" and header {name!r} differ."
+                )
+            self._fp.seek(extra_len, os.SEEK_CUR)
+        except BaseException:
+            self._fp.close()
+            raise
+
+        self._left = info.compress_size
+        self._crc = 0
+        self._size = 0
+        self._eof = False
+        self._init_inflate(module)
+
+    def _init_inflate(self, module):
+        self._d = module.decompressobj(-15)
+        self._pending = bytearray()
+        # مدخلات مضغوطة: buffer واحد يُعاد استخدامه (readinto)
+        self._inbuf = bytearray(
+            max(1, min(buffer_size(self._left), self._left))
+        )
+
+    def _step(self, limit):
+        """خطوة فك واحدة: حتى limit بايت (flush قد يزيد)"""
+        data = self._d.unconsumed_tail
+        if not data and self._left > 0:
+            view = memoryview(self._inbuf)
+            got = self._fp.readinto(view[:min(len(view), self._left)])
+            if not got:
+                raise EOFError
+            self._left -= got
+            data = view[:got]
+        try:
+            if data:
+                chunk = self._d.decompress(data, limit)
+            else:
+                chunk = self._d.flush()
+        except self._mod.error as e:
+            raise zipfile.BadZipFile(
+                f"{self.info.filename}: {e}"
+            )
+        if chunk:
+            self._crc = self._mod.crc32(chunk, self._crc)
+            self._size += len(chunk)
+        if self._d.eof or (
+            not data and not self._d.unconsumed_tail
+        ):
+            self._finish()
+        return chunk
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = 1 << 62
+        out = self._pending
+        while len(out) < n and not self._eof:
+            out += self._step(n - len(out))
+        # flush() قد يرجع أكثر من المطلوب: الباقي للقراءة التالية
+        self._pending = out[n:]
+        return bytes(out[:n])
+
+    def readinto(self, b):
+        """فك مباشرة في buffer المستدعي (بدون bytes وسيطة للناتج)"""
+        view = memoryview(b).cast("B")
+        n = len(view)
+        pos = min(n, len(self._pending))
+        if pos:
+            view[:pos] = self._pending[:pos]
+            del self._pending[:pos]
+        while pos < n and not self._eof:
+            chunk = self._step(n - pos)
+            k = min(len(chunk), n - pos)
+            view[pos:pos + k] = chunk[:k] if k < len(chunk) else chunk
+            if k < len(chunk):
+                self._pending += chunk[k:]
+            pos += k
+        return pos
+
+    def _finish(self):
+        self._eof = True
+        if self._size != self.info.file_size:
+            raise zipfile.BadZipFile(
+                f"Bad size for file {self.info.filename!r}"
+            )
+        if self._crc != self.info.CRC:
+            raise zipfile.BadZipFile(
+                f"Bad CRC-32 for file {self.info.filename!r}"
+            )
+
+    def close(self):
+        self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class StoredMemberReader(DeflateMemberReader):
+    """عضو مخزن بدون ضغط — نفس التحقق من CRC والحجم"""
+
+    def _init_inflate(self, module):
+        pass  # بدون فك: لا decompressobj ولا buffer مدخلات
+
+    def _account(self, data):
+        if not data and self._left > 0:
+            raise EOFError
+        self._left -= len(data)
+        self._crc = self._mod.crc32(data, self._crc)
+        self._size += len(data)
+        if self._left == 0 and not self._eof:
+            self._finish()
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self._left
+        if not n:
+            return b""
+        data = self._fp.read(min(n, self._left))
+        self._account(data)
+        return data
+
+    def readinto(self, b):
+        """نسخ صفري: القراءة مباشرة من الملف إلى b"""
+        view = memoryview(b).cast("B")
+        if not len(view) or self._eof:
+            return 0
+        got = self._fp.readinto(view[:min(len(view), self._left)])
+        self._account(view[:got])
+        return got
+
+
+def open_raw_member(path, info):
+    """
+    فتح عضو مباشرة من ملف الأرشيف بدون ZipFile
+    (للفهارس المضغوطة): stored أو deflate فقط.
+    """
+    _, module = inflate_backend()
+    if info.compress_type == zipfile.ZIP_DEFLATED:
+        return DeflateMemberReader(path, info, module)
+    if info.compress_type == zipfile.ZIP_STORED:
+        return StoredMemberReader(path, info, module)
+    raise zipfile.BadZipFile(
+        f"{info.filename}: ضغط غير مدعوم ({info.compress_type})"
+    )
+
+
+def open_member(zf, info):
+    """
+    فتح عضو للقراءة بالـ backend المُسرّع لو ينفع،
+    وإلا zf.open العادية (مخزن / مشفر / zlib القياسية).
+    """
+    name, module = inflate_backend()
+    if (
+        name == "zlib"
+        or info.compress_type != zipfile.ZIP_DEFLATED
+        or info.flag_bits & 0x1
+        or not isinstance(zf.filename, str)
+    ):
+        return zf.open(info)
+    return DeflateMemberReader(zf.filename, info, module)
+
+
+def testzip(zf, chunk_size=1024 * 1024):
+    """بديل zf.testzip بالـ backend المُسرّع — أول عضو تالف أو None"""
+    for info in zf.infolist():
+        try:
+            with open_member(zf, info) as f:
+                while f.read(chunk_size):
+                    pass
+        except (zipfile.BadZipFile, EOFError, zlib.error):
+            return info.filename
+    return None
+
+
+# ════════════════════════════════════════════════
+# Benchmark
+# ════════════════════════════════════════════════
+
+def benchmark(paths, repeat=3):
+    """
+    مقارنة الـ backends على أرشيفات حقيقية.
+    يرجع [(backend, bytes_out, best_seconds)] لفك الضغط
+    + ("sha256/<impl>", bytes_in, seconds) للـ hashing.
+    """
+    global _inflate
+    results = []
+    saved = _inflate
+    try:
+        for name in available_inflate():
+            _inflate = (name, _load_inflate(name))
+            best = None
+            total = 0
+            for _ in range(repeat):
+                total = 0
+                start = time.perf_counter()
+                for path in paths:
+                    with zipfile.ZipFile(path) as zf:
+                        for info in zf.infolist():
+                            with open_member(zf, info) as f:
+                                while True:
+                                    chunk = f.read(1024 * 1024)
+                                    if not chunk:
+                                        break
+                                    total += len(chunk)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results.append((name, total, best))
+    finally:
+        _inflate = saved
+
+    size = sum(os.path.getsize(p) for p in paths)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            hash_file(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    results.append((f"sha256/{hash_backend()}", size, best))
+    return results
+
+
+def _alloc_counters():
+    """(gen0 GC collections, minor page faults) — للمقارنة"""
+    import gc
+    try:
+        import resource
+        faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+    except ImportError:
+        faults = 0
+    return gc.get_stats()[0]["collections"], faults
+
+
+def benchmark_copy(paths, repeat=3):
+    """
+    فك كل الأعضاء + SHA-256 بطريقتين على نفس الـ backend:
+    read (bytes جديدة لكل 64 KB) مقابل readinto (buffer
+    مُعاد + حجم متكيف). يرجع
+    [(name, bytes, best_seconds, gc_collections, page_faults)].
+    """
+    from zip_index import ZipIndex
+
+    def via_read(src, info, h):
+        n = 0
+        while True:
+            chunk = src.read(64 * 1024)
+            if not chunk:
+                return n
+            h.update(chunk)
+            n += len(chunk)
+
+    def via_readinto(src, info, h):
+        return copy_stream(
+            src, None, info.file_size, on_chunk=h.update
+        )
+
+    results = []
+    for name, copy in (
+        ("read/64K", via_read), ("readinto", via_readinto)
+    ):
+        best = None
+        total = 0
+        gc_start, faults_start = _alloc_counters()
+        for _ in range(repeat):
+            total = 0
+            start = time.perf_counter()
+            for path in paths:
+                index = ZipIndex(path)
+                for info in index.infolist():
+                    if info.is_dir():
+                        continue
+                    with index.open(info) as src:
+                        total += copy(src, info, hashlib.sha256())
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        gc_end, faults_end = _alloc_counters()
+        results.append((
+            name, total, best,
+            (gc_end - gc_start) // repeat,
+            (faults_end - faults_start) // repeat
+        ))
+    return results
@@ -0,0 +1,157 @@
+import heapq
+import itertools
+import os
+import re
+import threading
+import time
+
+
+# ════════════════════════════════════════════════
+# Bandwidth Limiter (token bucket + weighted fair queuing)
+# ════════════════════════════════════════════════
+
+PRIORITY_WEIGHTS = {
+    "high": 8,     # تحميل تفاعلي من الواجهة
+    "normal": 2,   # مهام الطابور
+    "low": 1,      # مرايا خلفية طويلة
+}
+
+
+def parse_rate(text):
+    """
+    تحويل نص مثل "500K" / "2.5M" / "1G" إلى bytes/s.
+    فارغ أو 0 = بدون حد.
+    """
+    text = (text or "").strip().upper().rstrip("B/S")
+    if not text:
+        return 0
+    m = re.fullmatch(r"([\d.]+)\s*([KMG]?)", text)
+    if not m:
+        raise ValueError(f"invalid rate: {text!r}")
+    mult = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    return int(float(m.group(1)) * mult[m.group(2)])
+
+
+class Flow:
+    """تدفق مهمة واحدة داخل المحدد"""
+
+    def __init__(self, weight):
+        self.weight = max(1, weight)
+        self.finish = 0.0  # آخر virtual finish tag
+
+    def set_priority(self, priority):
+        self.weight = PRIORITY_WEIGHTS.get(priority, 2)
+
+
+class BandwidthLimiter:
+    """
+    محدد سرعة عام لكل التحميلات المتزامنة:
+    - token bucket بمعدل rate (bytes/s) قابل للتغيير أثناء التشغيل
+    - عند الازدحام تُوزع الـ tokens بعدالة موزونة
+      (Start-time Fair Queuing) حسب أولوية كل مهمة
+    rate = 0 → بدون حد ولا أي انتظار.
+    """
+
+    BURST_SECONDS = 0.25
+
+    def __init__(self, rate=0):
+        self._cond = threading.Condition()
+        self._waiting = []  # heap: (tag, seq, start, n)
+        self._seq = itertools.count()
+        self._vtime = 0.0
+        self._tokens = 0.0
+        self._last = time.monotonic()
+        self.rate = 0
+        self.set_rate(rate)
+
+    @property
+    def burst(self):
+        return max(65536, self.rate * self.BURST_SECONDS)
+
+    def set_rate(self, rate):
+        """تغيير الحد أثناء التشغيل (0 = بدون حد)"""
+        with self._cond:
+            self._refill()
+            self.rate = max(0, int(rate))
+            self._tokens = min(self._tokens, self.burst)
+            self._cond.notify_all()
+
+    def flow(self, priority="normal"):
+        return Flow(PRIORITY_WEIGHTS.get(priority, 2))
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate > 0:
+            self._tokens = min(
+                self.burst,
+                self._tokens + (now - self._last) * self.rate
+            )
+        self._last = now
+
+    def acquire(self, flow, n, cancel_event=None):
+        """
+        حجز n bytes للتدفق flow (يُستدعى لكل chunk).
+        يرجع False لو cancel_event اتفعّل أثناء الانتظار.
+        """
+        if self.rate <= 0:
+            return True
+
+        with self._cond:
+            start = max(self._vtime, flow.finish)
+            tag = start + n / flow.weight
+            flow.finish = tag
+            entry = (tag, next(self._seq), start, n)
+            heapq.heappush(self._waiting, entry)
+
+            while True:
+                if cancel_event is not None and (
+                    cancel_event.is_set()
+                ):
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                    return False
+
+                if self.rate <= 0:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                    return True
+
+                self._refill()
+                need = min(n, self.burst)
+                if (
+                    self._waiting[0] is entry
+                    and self._tokens >= need
+                ):
+                    heapq.heappop(self._waiting)
+                    # chunk أكبر من الـ burst يترك رصيداً سالباً
+                    self._tokens -= n
+                    self._vtime = start
+                    self._cond.notify_all()
+                    return True
+
+                if self._waiting[0] is entry:
+                    timeout = (need - self._tokens) / self.rate
+                else:
+                    timeout = 0.1
+                self._cond.wait(min(max(timeout, 0.001), 0.1))
+
+
+_global_limiter = None
+_global_lock = threading.Lock()
+
+
+def get_limiter():
+    """المحدد المشترك لكل المهام (GH_BANDWIDTH_LIMIT للقيمة الأولية)"""
+    global _global_limiter
+    with _global_lock:
+        if _global_limiter is None:
+            try:
+                rate = parse_rate(
+                    os.environ.get("GH_BANDWIDTH_LIMIT", "")
+                )
+            except ValueError:
+                rate = 0
+            _global_limiter = BandwidthLimiter(rate)
+        return _global_limiter
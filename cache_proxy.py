@@ -0,0 +1,718 @@
+import os
+import re
+import hmac
+import json
+import time
+import hashlib
+import logging
+import ipaddress
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from http_abort import CACHE_SECRET_HEADER
+
+logger = logging.getLogger("GitHubDownloader")
+
+
+# ════════════════════════════════════════════════
+# LAN Cache Proxy (serve)
+# ════════════════════════════════════════════════
+#
+# عشرات الأجهزة بتحمّل نفس المستودعات عبر نفس الخط:
+# الـ proxy يقف بينها وبين GitHub ويخزن
+#   - الأرشيفات بمفتاح owner/repo/commit (ثابتة للأبد)
+#   - ملفات الإصدارات بمسارها
+#   - ردود الـ API: trees/commits بـ SHA ثابتة، والباقي
+#     بـ TTL ثم إعادة تحقق بـ ETag (304 ما يستهلكش rate limit)
+# الطلبات المتزامنة لنفس الأرشيف تنتظر نفس التحميل (fill
+# واحد) وتقرأ منه أثناء وصوله، مع دعم Range (pre-flight
+# والاستكمال)، وحذف الأقدم استخداماً (LRU) عند امتلاء المخزن.
+# فكل commit يعبر الـ WAN مرة واحدة بدل مرة لكل جهاز.
+#
+# العملاء: GH_CACHE_PROXY=http://host:port (http_abort.ProxyAdapter)
+#
+# الأمان: السيرفر ما بيستخدمش توكنه للعملاء (إلا بـ share_token)؛
+# كل طلب يروح لـ GitHub بالـ Authorization بتاع العميل نفسه،
+# والـ cache مقسوم بهوية التوكن (hash) — رد خاص بتوكن ما يوصلش
+# لعميل تاني. العملاء من loopback بس، إلا بـ secret و/أو allowlist.
+
+API_UPSTREAM = "https://api.github.com"
+WEB_UPSTREAM = "https://github.com"
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_SIZE = 20 * 1024 ** 3  # 20 GB
+DEFAULT_TTL = 60  # ثواني للبيانات المتغيرة (فروع / إصدارات)
+
+COPY_CHUNK = 256 * 1024
+
+_SHA = re.compile(r"^[0-9a-f]{40}$")
+_ARCHIVE = re.compile(r"^/web/([^/]+)/([^/]+)/archive/(.+)\.zip$")
+_ASSET = re.compile(
+    r"^/web/([^/]+)/([^/]+)/releases/download/([^/]+)/([^/]+)$"
+)
+# ردود API لـ SHA بعينه ما تتغيرش
+_IMMUTABLE_API = re.compile(
+    r"/(?:git/trees|commits)/[0-9a-f]{40}(?:\?|$)"
+)
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_SAFE = re.compile(r"[^A-Za-z0-9._-]")
+
+# headers الـ API اللي تتنقل للعميل كما هي
+META_HEADERS = ("Content-Type", "ETag", "Link")
+
+
+def identity(authorization):
+    """هوية العميل في مفاتيح الـ cache: hash التوكن أو anon"""
+    if not authorization:
+        return "anon"
+    return hashlib.sha256(authorization.encode()).hexdigest()[:16]
+
+
+class UpstreamError(Exception):
+    """فشل جلب من GitHub: status للعميل (404 / 502 ...)"""
+
+    def __init__(self, status, message=""):
+        super().__init__(message or f"upstream {status}")
+        self.status = status
+
+
+# ════════════════════════════════════════════════
+# Store (LRU)
+# ════════════════════════════════════════════════
+
+class CacheStore:
+    """
+    ملفات الـ cache على القرص مع ترتيب LRU في الذاكرة.
+    mtime = آخر استخدام (يعيش بعد إعادة التشغيل).
+    """
+
+    def __init__(self, root, max_size=DEFAULT_MAX_SIZE):
+        self.root = os.path.abspath(root)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()  # path → size (الأقدم أولاً)
+        self.total = 0
+        self.evicted = 0
+        os.makedirs(self.root, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if name.endswith(".part"):
+                    # fill انقطع مع توقف السيرفر
+                    _remove(path)
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, path, st.st_size))
+        entries.sort()
+        for _, path, size in entries:
+            self._lru[path] = size
+            self.total += size
+
+    def path(self, *parts):
+        """مسار آمن داخل المخزن من أجزاء المفتاح"""
+        return os.path.join(
+            self.root, *(_SAFE.sub("_", p) or "_" for p in parts)
+        )
+
+    def touch(self, path):
+        """استخدام جديد: آخر الطابور + mtime"""
+        with self._lock:
+            if path in self._lru:
+                self._lru.move_to_end(path)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def add(self, path, size):
+        with self._lock:
+            self.total += size - self._lru.pop(path, 0)
+            self._lru[path] = size
+        self.evict()
+
+    def discard(self, path):
+        with self._lock:
+            self.total -= self._lru.pop(path, 0)
+
+    def evict(self):
+        """حذف الأقدم استخداماً لحد ما المخزن يرجع تحت الحد"""
+        while True:
+            with self._lock:
+                if self.total <= self.max_size or len(self._lru) <= 1:
+                    return
+                path, size = self._lru.popitem(last=False)
+                self.total -= size
+                self.evicted += 1
+            # القارئ اللي فاتح الملف يكمل (unlink على POSIX)
+            _remove(path)
+            logger.info(f"Cache evict: {path} ({size} bytes)")
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# ════════════════════════════════════════════════
+# Fill (coalescing)
+# ════════════════════════════════════════════════
+
+class _Fill:
+    """
+    تحميل واحد من GitHub لملف في المخزن. أي عدد من العملاء
+    يقرأ من الـ .part أثناء الكتابة (wait_for) بدل ما كل
+    واحد يفتح اتصال WAN خاص بيه.
+    """
+
+    def __init__(self, path, url, auth=None):
+        self.path = path
+        self.part = path + ".part"
+        self.url = url
+        self.auth = auth
+        self.size = 0
+        self.total = None  # Content-Length لو GitHub بعته
+        self.done = False
+        self.error = None
+        self.started = threading.Event()  # وصلت الـ headers
+        self._cond = threading.Condition()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._f = open(self.part, "wb")
+
+    def run(self, session, store, on_done):
+        try:
+            headers = {"Authorization": self.auth} if self.auth else {}
+            with session.get(
+                self.url, headers=headers, stream=True, timeout=30
+            ) as r:
+                if r.status_code != 200:
+                    raise UpstreamError(
+                        r.status_code if r.status_code < 500 else 502
+                    )
+                length = r.headers.get("Content-Length")
+                if length and "Content-Encoding" not in r.headers:
+                    self.total = int(length)
+                self.started.set()
+                for chunk in r.raw.stream(COPY_CHUNK, decode_content=True):
+                    self._f.write(chunk)
+                    self._f.flush()
+                    with self._cond:
+                        self.size += len(chunk)
+                        self._cond.notify_all()
+            self._f.close()
+            if self.total is not None and self.size != self.total:
+                raise UpstreamError(502, "truncated upstream body")
+            os.replace(self.part, self.path)
+            store.add(self.path, self.size)
+            with self._cond:
+                self.total = self.size
+                self.done = True
+                self._cond.notify_all()
+        except Exception as e:
+            self._f.close()
+            _remove(self.part)
+            if not isinstance(e, UpstreamError):
+                logger.warning(f"Cache fill failed: {self.url}: {e}")
+                e = UpstreamError(502, str(e))
+            with self._cond:
+                self.error = e
+                self._cond.notify_all()
+        finally:
+            self.started.set()
+            on_done(self)
+
+    def wait_for(self, n):
+        """ينتظر لحد ما يتوفر n بايت (أو ينتهي) — يرجع المتاح"""
+        with self._cond:
+            while (
+                self.size < n and not self.done
+                and self.error is None
+            ):
+                self._cond.wait(1.0)
+            if self.error is not None:
+                raise self.error
+            return self.size
+
+    def wait_total(self):
+        """الحجم الكلي — ينتظر نهاية التحميل لو مش معروف"""
+        self.started.wait()
+        if self.total is None:
+            self.wait_for(float("inf"))
+        if self.error is not None:
+            raise self.error
+        return self.total
+
+    def open(self):
+        """فتح الملف للقراءة (الـ .part أو النهائي لو اتنقل)"""
+        try:
+            return open(self.part, "rb")
+        except FileNotFoundError:
+            pass
+        try:
+            return open(self.path, "rb")
+        except FileNotFoundError:
+            # الـ fill فشل واتمسح الـ .part (أو LRU مسح النهائي)
+            raise UpstreamError(502, str(self.error or "fill gone"))
+
+
+# ════════════════════════════════════════════════
+# Proxy
+# ════════════════════════════════════════════════
+
+class CacheProxy:
+    """
+    منطق الـ proxy (بدون HTTP): مخزن + fills + ردود API.
+    session: requests.Session لـ GitHub — بدون توكن، إلا لو
+      السيرفر بيشارك توكنه عمداً (share_token) للعملاء بدون توكن.
+    auth في كل الدوال: Authorization بتاع العميل (أو None).
+    """
+
+    def __init__(self, session, root, max_size=DEFAULT_MAX_SIZE,
+                 ttl=DEFAULT_TTL):
+        self.session = session
+        self.store = CacheStore(root, max_size)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._fills = {}  # path → _Fill
+        # key → [Lock, refcount] (طلب API واحد في المرة)؛
+        # يتشال مع آخر طلب عشان الـ dict ما يكبرش مع كل URL
+        self._meta_locks = {}
+        self.stats = {
+            "hits": 0, "misses": 0, "coalesced": 0,
+            "meta_hits": 0, "meta_misses": 0, "revalidated": 0,
+            "passthrough": 0, "bytes_served": 0,
+        }
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update(
+            store_bytes=self.store.total,
+            store_files=len(self.store._lru),
+            evicted=self.store.evicted,
+            filling=len(self._fills),
+        )
+        return stats
+
+    # ─── Blobs (أرشيفات + ملفات إصدارات) ───
+
+    def blob_key(self, path, auth=None):
+        """
+        (مسار التخزين, رابط GitHub) — أو None لو مش ثابت
+        (أرشيف بفرع: المحتوى بيتغير، يعدي بدون cache).
+        المسار تحت هوية التوكن: أرشيف خاص لعميل واحد بس.
+        """
+        who = identity(auth)
+        m = _ARCHIVE.match(path)
+        if m:
+            owner, repo, ref = m.groups()
+            if not _SHA.match(ref):
+                return None
+            return (
+                self.store.path(
+                    "archives", who, owner, repo, ref + ".zip"
+                ),
+                f"{WEB_UPSTREAM}/{owner}/{repo}/archive/{ref}.zip",
+            )
+        m = _ASSET.match(path)
+        if m:
+            owner, repo, tag, name = m.groups()
+            return (
+                self.store.path("assets", who, owner, repo, tag, name),
+                f"{WEB_UPSTREAM}/{owner}/{repo}"
+                f"/releases/download/{tag}/{name}",
+            )
+        return None
+
+    def acquire(self, path, url, auth=None):
+        """
+        ملف جاهز → None (اقرأ من المخزن).
+        غير كده → الـ _Fill الجاري أو واحد جديد.
+        """
+        with self._lock:
+            fill = self._fills.get(path)
+            if fill is not None:
+                self.stats["coalesced"] += 1
+                return fill
+            if os.path.isfile(path):
+                self.stats["hits"] += 1
+                hit = True
+            else:
+                self.stats["misses"] += 1
+                hit = False
+                fill = _Fill(path, url, auth)
+                self._fills[path] = fill
+        if hit:
+            self.store.touch(path)
+            return None
+        logger.info(f"Cache miss: {url}")
+        threading.Thread(
+            target=fill.run,
+            args=(self.session, self.store, self._fill_done),
+            name="cache-fill", daemon=True
+        ).start()
+        return fill
+
+    def _fill_done(self, fill):
+        with self._lock:
+            if self._fills.get(fill.path) is fill:
+                del self._fills[fill.path]
+
+    # ─── API ───
+
+    def meta(self, path_qs, accept, auth=None):
+        """
+        رد API من الـ cache أو GitHub:
+        يرجع (status, headers dict, body bytes).
+        """
+        key = f"{identity(auth)}\n{accept}\n{path_qs}"
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        file = self.store.path("meta", digest[:2], digest)
+        immutable = bool(_IMMUTABLE_API.search(path_qs))
+
+        with self._lock:
+            entry = self._meta_locks.get(key)
+            if entry is None:
+                entry = self._meta_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            # نفس الطلب من عدة أجهزة: واحد بس يروح لـ GitHub
+            with entry[0]:
+                return self._meta_fetch(
+                    file, path_qs, accept, auth, immutable
+                )
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._meta_locks[key]
+
+    def _meta_fetch(self, file, path_qs, accept, auth, immutable):
+        """meta تحت قفل المفتاح: cache ثم GitHub (ETag)"""
+        cached = _read_meta(file)
+        if cached is not None and (
+            immutable or time.time() - cached[0]["time"] < self.ttl
+        ):
+            self.count("meta_hits")
+            self.store.touch(file)
+            return 200, cached[0]["headers"], cached[1]
+
+        headers = {"Accept": accept} if accept else {}
+        if auth:
+            headers["Authorization"] = auth
+        if cached is not None and cached[0]["headers"].get("ETag"):
+            headers["If-None-Match"] = cached[0]["headers"]["ETag"]
+        try:
+            r = self.session.get(
+                API_UPSTREAM + path_qs[len("/api"):],
+                headers=headers, timeout=30
+            )
+        except Exception as e:
+            if cached is not None:
+                # GitHub مش متاح: نسخة قديمة أحسن من لا شيء
+                logger.warning(f"API stale (upstream: {e})")
+                return 200, cached[0]["headers"], cached[1]
+            raise UpstreamError(502, str(e))
+
+        if r.status_code == 304 and cached is not None:
+            self.count("revalidated")
+            _write_meta(file, cached[0]["headers"], cached[1])
+            self.store.touch(file)
+            return 200, cached[0]["headers"], cached[1]
+
+        kept = {
+            h: r.headers[h] for h in META_HEADERS if h in r.headers
+        }
+        if r.status_code != 200:
+            # أخطاء (404 / rate limit) ما تتخزنش
+            return r.status_code, kept, r.content
+
+        self.count("meta_misses")
+        size = _write_meta(file, kept, r.content)
+        self.store.add(file, size)
+        return 200, kept, r.content
+
+
+def _read_meta(path):
+    """({"time", "headers"}, body) — أو None"""
+    try:
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            return header, f.read()
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(path, headers, body):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(json.dumps(
+            {"time": time.time(), "headers": headers}
+        ).encode() + b"\n")
+        f.write(body)
+        size = f.tell()
+    os.replace(tmp, path)
+    return size
+
+
+# ════════════════════════════════════════════════
+# HTTP
+# ════════════════════════════════════════════════
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "GitHubDownloaderCache/1.0"
+    proxy = None  # CacheProxy (يتحدد في make_server)
+    _truncated = False  # الـ fill فشل أثناء بث chunked
+    secret = None  # مشترك مع العملاء (GH_CACHE_SECRET)
+    allow = ()  # شبكات مسموحة (ip_network) — فاضية = loopback
+
+    def log_message(self, fmt, *args):
+        logger.debug(f"{self.address_string()} {fmt % args}")
+
+    def do_GET(self):
+        self._route(head=False)
+
+    def do_HEAD(self):
+        self._route(head=True)
+
+    def _authorized(self):
+        """allowlist (أو loopback بس لو مفيش secret) + الـ secret"""
+        try:
+            ip = ipaddress.ip_address(self.client_address[0])
+        except ValueError:
+            return False
+        if self.allow:
+            if not any(ip in net for net in self.allow):
+                return False
+        elif not self.secret and not ip.is_loopback:
+            return False
+        if self.secret:
+            return hmac.compare_digest(
+                self.headers.get(CACHE_SECRET_HEADER, "").encode(),
+                self.secret.encode()
+            )
+        return True
+
+    def _route(self, head):
+        path = self.path.split("?", 1)[0]
+        auth = self.headers.get("Authorization")
+        try:
+            if not self._authorized():
+                self._send_bytes(403, {}, b"forbidden", head)
+            elif path == "/_stats":
+                self._send_bytes(
+                    200, {"Content-Type": "application/json"},
+                    json.dumps(self.proxy.snapshot()).encode(), head
+                )
+            elif path.startswith("/api/"):
+                status, headers, body = self.proxy.meta(
+                    self.path, self.headers.get("Accept", ""), auth
+                )
+                self._send_bytes(status, headers, body, head)
+            elif path.startswith("/web/"):
+                key = self.proxy.blob_key(path, auth)
+                if key is None:
+                    self._passthrough(head, auth)
+                else:
+                    self._send_blob(*key, auth=auth, head=head)
+            else:
+                self._send_bytes(404, {}, b"not found", head)
+        except UpstreamError as e:
+            self._send_bytes(e.status, {}, str(e).encode(), head)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # العميل قفل (إلغاء)
+
+    def _send_bytes(self, status, headers, body, head):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+            self.proxy.count("bytes_served", len(body))
+
+    def _passthrough(self, head, auth=None):
+        """طلب غير قابل للتخزين: يعدي لـ GitHub كما هو"""
+        self.proxy.count("passthrough")
+        url = WEB_UPSTREAM + self.path[len("/web"):]
+        headers = {"Authorization": auth} if auth else {}
+        if self.headers.get("Range"):
+            headers["Range"] = self.headers["Range"]
+        session = self.proxy.session
+        method = session.head if head else session.get
+        try:
+            r = method(
+                url, headers=headers, stream=True,
+                allow_redirects=True, timeout=30
+            )
+        except Exception as e:
+            raise UpstreamError(502, str(e))
+        with r:
+            self.send_response(r.status_code)
+            for name in ("Content-Type", "Content-Range",
+                         "Accept-Ranges", "ETag"):
+                if name in r.headers:
+                    self.send_header(name, r.headers[name])
+            length = r.headers.get("Content-Length")
+            if length and "Content-Encoding" not in r.headers:
+                self.send_header("Content-Length", length)
+                self.end_headers()
+                if not head:
+                    for chunk in r.raw.stream(COPY_CHUNK):
+                        self.wfile.write(chunk)
+            elif head:
+                # HEAD بدون body: لا chunked ولا chunk أخير
+                # (bytes زيادة تلخبط الاتصال الـ keep-alive)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            else:
+                self._chunked(r.iter_content(COPY_CHUNK))
+
+    def _chunked(self, chunks):
+        """body بطول غير معروف (Transfer-Encoding: chunked)"""
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._truncated = False
+        for chunk in chunks:
+            if chunk:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        # بدون chunk أخير لو الـ fill فشل: العميل يشوف body ناقص
+        # (حتى لو الاتصال كان هيتقفل أصلاً بـ Connection: close)
+        if not self._truncated:
+            self.wfile.write(b"0\r\n\r\n")
+
+    def _send_blob(self, path, url, auth, head):
+        fill = self.proxy.acquire(path, url, auth)
+        if fill is None:
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                # اتحذف (LRU) بين الفحص والفتح: تحميل من جديد
+                fill = self.proxy.acquire(path, url, auth)
+            else:
+                with f:
+                    total = os.fstat(f.fileno()).st_size
+                    self._send_range(
+                        f, total, lambda n: total, head
+                    )
+                return
+
+        fill.started.wait()
+        if fill.error is not None:
+            raise fill.error
+        rng = self.headers.get("Range")
+        if fill.total is None and not rng:
+            # GitHub ما بعتش الحجم: نبث للعميل أثناء الوصول
+            if head:
+                self.send_response(200)
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            with fill.open() as f:
+                self._chunked(self._follow(f, fill.wait_for, 0, None))
+            return
+        total = fill.wait_total()
+        with fill.open() as f:
+            self._send_range(f, total, fill.wait_for, head)
+
+    def _send_range(self, f, total, wait_for, head):
+        """200 كامل أو 206 لـ Range — القراءة تتبع الـ fill"""
+        start, end = 0, total - 1
+        rng = _RANGE.match(self.headers.get("Range", "").strip())
+        status = 200
+        if rng and (rng.group(1) or rng.group(2)):
+            if rng.group(1):
+                start = int(rng.group(1))
+                if rng.group(2):
+                    end = min(int(rng.group(2)), total - 1)
+            else:
+                start = max(0, total - int(rng.group(2)))
+            if start >= total or start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{total}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if status == 206:
+            self.send_header(
+                "Content-Range", f"bytes {start}-{end}/{total}"
+            )
+        self.end_headers()
+        if head:
+            return
+        for chunk in self._follow(f, wait_for, start, end + 1):
+            self.wfile.write(chunk)
+
+    def _follow(self, f, wait_for, start, stop):
+        """
+        قراءة [start, stop) من ملف بيتكتب: wait_for(n) ينتظر
+        لحد ما الـ fill يوصل n بايت ويرجع المتاح.
+        stop=None → لحد نهاية التحميل.
+        """
+        pos = start
+        f.seek(pos)
+        while stop is None or pos < stop:
+            try:
+                avail = wait_for(pos + 1)
+            except UpstreamError:
+                # الـ headers اتبعتت: نقفل الاتصال والعميل يستكمل
+                self.close_connection = True
+                self._truncated = True
+                return
+            if avail <= pos:
+                return  # انتهى التحميل
+            n = min(avail, stop) - pos if stop else avail - pos
+            while n > 0:
+                chunk = f.read(min(n, COPY_CHUNK))
+                if not chunk:
+                    return
+                n -= len(chunk)
+                pos += len(chunk)
+                self.proxy.count("bytes_served", len(chunk))
+                yield chunk
+
+
+def make_server(proxy, host="127.0.0.1", port=DEFAULT_PORT,
+                secret=None, allow=(), ssl_context=None):
+    """
+    ThreadingHTTPServer جاهز لـ serve_forever().
+    secret: العملاء لازم يبعتوه في CACHE_SECRET_HEADER.
+    allow: شبكات CIDR مسموحة (الافتراضي loopback بس لو مفيش secret).
+    ssl_context: https — التوكنات ما تعديش على الشبكة مكشوفة.
+    """
+    handler = type("Handler", (_Handler,), {
+        "proxy": proxy, "secret": secret or None,
+        "allow": tuple(
+            ipaddress.ip_network(net, strict=False) for net in allow
+        ),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    if ssl_context is not None:
+        server.socket = ssl_context.wrap_socket(
+            server.socket, server_side=True
+        )
+    return server
@@ -0,0 +1,353 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import logging
+
+logger = logging.getLogger("GitHubDownloader")
+
+
+# ════════════════════════════════════════════════
+# Download Catalog (SQLite)
+# ════════════════════════════════════════════════
+#
+# سجل لكل مهمة (ناجحة أو فاشلة أو ملغاة) في قاعدة واحدة
+# بدل تقارير متفرقة داخل كل مجلد: المستودع، الـ ref والـ commit،
+# hash الأرشيف، الأحجام، عدد الملفات، زمن كل مرحلة، والوجهة.
+# WAL + busy timeout: عدة threads / عمليات تكتب في نفس الوقت
+# (مرآة -j 8 + طابور الواجهة + CLI) بدون "database is locked".
+
+CATALOG_FILE = "catalog.db"
+SCHEMA_VERSION = 1
+
+COLUMNS = (
+    "repo", "ref", "branch", "commit_sha", "release",
+    "backend", "format", "state", "error",
+    "sha256", "archive_size", "bytes", "files", "dest",
+    "started", "finished", "phases",
+)
+
+
+class Catalog:
+    """
+    اتصال بالكتالوج — اتصال لكل كائن (افتح / سجّل / أغلق)،
+    فكل thread أو عملية تفتح نسختها والـ locking على SQLite.
+    """
+
+    TIMEOUT = 30  # ثواني انتظار الـ lock قبل الفشل
+    WRITE_RETRIES = 5  # لو الـ lock اتكسر برضه (checkpoint مثلاً)
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=self.TIMEOUT)
+        self._db.row_factory = sqlite3.Row
+        # autocommit: المعاملات صريحة بـ BEGIN IMMEDIATE
+        self._db.isolation_level = None
+        self._init_db()
+
+    def _init_db(self):
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        if self._db.execute(
+            "PRAGMA user_version"
+        ).fetchone()[0] == SCHEMA_VERSION:
+            return
+        self._write(script="""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id           INTEGER PRIMARY KEY,
+                repo         TEXT NOT NULL COLLATE NOCASE,
+                ref          TEXT,
+                branch       TEXT,
+                commit_sha   TEXT,
+                release      TEXT,
+                backend      TEXT,
+                format       TEXT,
+                state        TEXT NOT NULL,
+                error        TEXT,
+                sha256       TEXT,
+                archive_size INTEGER,
+                bytes        INTEGER,
+                files        INTEGER,
+                dest         TEXT,
+                started      REAL NOT NULL,
+                finished     REAL NOT NULL,
+                phases       TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_repo
+                ON jobs(repo, finished);
+            CREATE INDEX IF NOT EXISTS jobs_commit
+                ON jobs(commit_sha);
+            CREATE INDEX IF NOT EXISTS jobs_sha256
+                ON jobs(sha256);
+            CREATE INDEX IF NOT EXISTS jobs_dest
+                ON jobs(dest);
+            CREATE INDEX IF NOT EXISTS jobs_finished
+                ON jobs(finished);
+            PRAGMA user_version = %d;
+        """ % SCHEMA_VERSION)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ─── Writes ───
+
+    def _write(self, *statements, script=None):
+        """
+        معاملة كتابة واحدة لكل statements ((sql, params), ...):
+        BEGIN IMMEDIATE ياخد الـ lock من الأول (بدل ترقية
+        read → write اللي ممكن تعمل deadlock بين عمليتين)،
+        مع إعادة محاولة لو SQLite رجّع busy رغم الـ timeout.
+        يرجع cursor آخر statement.
+        """
+        for attempt in range(self.WRITE_RETRIES):
+            try:
+                if script:
+                    self._db.executescript(
+                        f"BEGIN IMMEDIATE;\n{script}\nCOMMIT;"
+                    )
+                    return None
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    for sql, params in statements:
+                        cur = self._db.execute(sql, params)
+                    self._db.execute("COMMIT")
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+                return cur
+            except sqlite3.OperationalError as e:
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+                locked = "locked" in str(e) or "busy" in str(e)
+                if not locked or attempt == self.WRITE_RETRIES - 1:
+                    raise
+                time.sleep(0.05 * (2 ** attempt) * random.random())
+
+    def record(self, job):
+        """
+        تسجيل مهمة منتهية. job: dict بمفاتيح COLUMNS
+        (الناقص = NULL، و phases dict {مرحلة: ثواني}).
+        يرجع id الصف.
+        """
+        values = dict.fromkeys(COLUMNS)
+        values.update((k, job[k]) for k in COLUMNS if k in job)
+        if isinstance(values["phases"], dict):
+            values["phases"] = json.dumps(
+                {k: round(v, 3) for k, v in values["phases"].items()}
+            )
+        cur = self._write((
+            f"INSERT INTO jobs ({', '.join(COLUMNS)})"
+            f" VALUES ({', '.join('?' * len(COLUMNS))})",
+            [values[k] for k in COLUMNS]
+        ))
+        return cur.lastrowid
+
+    def set_dest(self, job_id, dest):
+        """
+        الشجرة اتنقلت بعد التسجيل (staging → مكانها في المرآة).
+        المهام القديمة اللي كانت في نفس المكان اتستبدلت:
+        dest = NULL عشان find_existing ما يرجعهاش.
+        """
+        self._write(
+            ("UPDATE jobs SET dest = NULL WHERE dest = ? AND id != ?",
+             (dest, job_id)),
+            ("UPDATE jobs SET dest = ? WHERE id = ?", (dest, job_id)),
+        )
+
+    # ─── Queries ───
+
+    @staticmethod
+    def _row(row):
+        job = dict(row)
+        job["phases"] = json.loads(job["phases"] or "{}")
+        return job
+
+    @staticmethod
+    def _filters(repo=None, commit=None, state=None, since=None):
+        """شروط WHERE — كلها تستخدم فهرس"""
+        where, params = [], []
+        if repo:
+            if "*" in repo:
+                # owner/* — LIKE case-insensitive زي أسماء GitHub
+                where.append("repo LIKE ? ESCAPE '\\'")
+                params.append(
+                    repo.replace("\\", "\\\\").replace("%", "\\%")
+                    .replace("_", "\\_").replace("*", "%")
+                )
+            else:
+                where.append("repo = ?")
+                params.append(repo)
+        if commit:
+            # بادئة SHA كنطاق (يستخدم الفهرس بدل LIKE)
+            commit = commit.lower()
+            where.append("commit_sha >= ? AND commit_sha < ?")
+            params += [commit, commit + "\uffff"]
+        if state:
+            where.append("state = ?")
+            params.append(state)
+        if since:
+            where.append("finished >= ?")
+            params.append(since)
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        return clause, params
+
+    def query(self, repo=None, commit=None, state=None,
+              since=None, limit=20):
+        """
+        المهام الأحدث أولاً.
+        repo: owner/name أو نمط بـ * (owner/*)
+        commit: SHA كامل أو بادئة
+        since: timestamp (ثواني)
+        """
+        clause, params = self._filters(repo, commit, state, since)
+        sql = f"SELECT * FROM jobs{clause} ORDER BY finished DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._row(r) for r in self._db.execute(sql, params)]
+
+    def find_existing(self, repo, commit, backend=None, fmt=None):
+        """
+        أحدث تحميل ناجح لنفس الـ commit ووجهته لسه موجودة —
+        لقرار التخطي / إعادة الاستخدام بدل التحميل من جديد.
+        """
+        if not commit:
+            return None
+        sql = (
+            "SELECT * FROM jobs WHERE commit_sha = ? AND repo = ?"
+            " AND state = 'done'"
+        )
+        params = [commit.lower(), repo]
+        if backend:
+            sql += " AND backend = ?"
+            params.append(backend)
+        if fmt:
+            sql += " AND format = ?"
+            params.append(fmt)
+        sql += " ORDER BY finished DESC"
+        for row in self._db.execute(sql, params):
+            if row["dest"] and os.path.exists(row["dest"]):
+                return self._row(row)
+        return None
+
+    def find_archive(self, sha256):
+        """كل المهام اللي نزّلت نفس الأرشيف (بالـ hash)"""
+        return [
+            self._row(r) for r in self._db.execute(
+                "SELECT * FROM jobs WHERE sha256 = ?"
+                " ORDER BY finished DESC", (sha256,)
+            )
+        ]
+
+    def throughput(self, backend=None, limit=50):
+        """
+        السرعات المقاسة من آخر المهام الناجحة (لتقدير مهام قادمة):
+        download = bytes الأرشيف / زمن التحميل،
+        extract = bytes الناتج / زمن فك الضغط أو التجميع،
+        overhead = متوسط زمن باقي المراحل لكل مهمة.
+        السرعة None لو ما فيش قياس.
+        """
+        sql = "SELECT archive_size, bytes, phases FROM jobs"
+        sql += " WHERE state = 'done' AND phases IS NOT NULL"
+        params = []
+        if backend:
+            sql += " AND backend = ?"
+            params.append(backend)
+        sql += " ORDER BY finished DESC LIMIT ?"
+        params.append(limit)
+
+        sums = {"download": [0, 0.0], "extract": [0, 0.0]}
+        overhead = 0.0
+        jobs = 0
+        for size, nbytes, phases in self._db.execute(sql, params):
+            phases = json.loads(phases or "{}")
+            if not phases:
+                continue
+            jobs += 1
+            if size and phases.get("download"):
+                sums["download"][0] += size
+                sums["download"][1] += phases["download"]
+            secs = phases.get("extract") or phases.get("repack")
+            if nbytes and secs:
+                sums["extract"][0] += nbytes
+                sums["extract"][1] += secs
+            overhead += sum(
+                v for k, v in phases.items()
+                if k not in ("download", "extract", "repack")
+            )
+        result = {
+            name: (total / secs if secs else None)
+            for name, (total, secs) in sums.items()
+        }
+        result.update(
+            overhead=overhead / jobs if jobs else 0.0, jobs=jobs
+        )
+        return result
+
+    def stats(self, repo=None, since=None, top=10):
+        """
+        إحصائيات مجمعة: عدد المهام لكل حالة، الأحجام،
+        متوسط زمن كل مرحلة، متوسط سرعة التحميل،
+        وأكبر المستودعات حجماً.
+        """
+        clause, params = self._filters(repo=repo, since=since)
+        result = {
+            "states": dict(self._db.execute(
+                f"SELECT state, COUNT(*) FROM jobs{clause}"
+                " GROUP BY state", params
+            ).fetchall()),
+        }
+        row = self._db.execute(
+            "SELECT COUNT(DISTINCT repo), COALESCE(SUM(archive_size), 0),"
+            " COALESCE(SUM(bytes), 0), COALESCE(SUM(files), 0),"
+            " MIN(started), MAX(finished)"
+            f" FROM jobs{clause}{' AND' if clause else ' WHERE'}"
+            " state = 'done'", params
+        ).fetchone()
+        result.update(
+            repos=row[0], archive_bytes=row[1], bytes=row[2],
+            files=row[3], first=row[4], last=row[5],
+        )
+
+        # ─── متوسط المراحل (JSON بيتقرا في Python: مفاتيح متغيرة) ───
+        totals, counts = {}, {}
+        downloaded = download_time = 0.0
+        for size, phases in self._db.execute(
+            f"SELECT archive_size, phases FROM jobs{clause}"
+            f"{' AND' if clause else ' WHERE'} state = 'done'",
+            params
+        ):
+            phases = json.loads(phases or "{}")
+            for name, secs in phases.items():
+                totals[name] = totals.get(name, 0.0) + secs
+                counts[name] = counts.get(name, 0) + 1
+            if size and phases.get("download"):
+                downloaded += size
+                download_time += phases["download"]
+        result["phases"] = {
+            name: totals[name] / counts[name] for name in totals
+        }
+        result["speed"] = (
+            downloaded / download_time if download_time else 0
+        )
+
+        result["top"] = [
+            dict(r) for r in self._db.execute(
+                "SELECT repo, COUNT(*) AS jobs,"
+                " MAX(archive_size) AS archive_size,"
+                " MAX(files) AS files, MAX(finished) AS finished"
+                f" FROM jobs{clause}"
+                f"{' AND' if clause else ' WHERE'} state = 'done'"
+                " GROUP BY repo ORDER BY archive_size DESC LIMIT ?",
+                params + [top]
+            )
+        ]
+        return result
@@ -0,0 +1,492 @@
+import os
+import re
+import mmap
+import zlib
+import struct
+import logging
+from array import array
+
+logger = logging.getLogger("GitHubDownloader")
+
+
+# ════════════════════════════════════════════════
+# Trigram Code-Search Index
+# ════════════════════════════════════════════════
+#
+# grep على مرآة كاملة يقرأ كل بايت في كل مرة. هنا أثناء فك
+# الضغط (والبيانات في الذاكرة أصلاً) كل ملف نصي يتقسم لـ
+# trigrams (3 بايت، lowercase) وتتسجل قائمة أرقام الملفات لكل
+# trigram. البحث = تقاطع القوائم لـ trigrams النص المطلوب،
+# ثم regex على الملفات المرشحة فقط.
+#
+# الـ trigrams من داخل الكلمات (بين المسافات) بعد إزالة تكرار
+# الكلمات في الملف: الكود مكرر جداً فده ~40% من البايتات و
+# أسرع ×2.5. الاستعلام بيتجاهل الـ trigrams اللي فيها مسافة.
+#
+# الملف (_search.idx) — كله little-endian:
+#   MAGIC | header | postings (arrays) | جدول trigrams | الملفات
+#   الجدول: (trigram, offset, count) مرتب → bisect على mmap
+#   الملفات: (size, crc32, flag, path) بترتيب الأرقام
+
+INDEX_FILE = "_search.idx"
+MAGIC = b"GHTRI1\n\0"
+_HEADER = struct.Struct("<IIBQQ")  # files, trigrams, id size, table, files
+_ENTRY = struct.Struct("<IQI")  # trigram, offset, count
+_FILE = struct.Struct("<QIBH")  # size, crc32, flag, path length
+
+# حالة الملف في الفهرس
+INDEXED = 0
+BINARY = 1  # لا يطابق أبداً (مثل grep -I)
+UNINDEXED = 2  # أكبر من الحد: مرشح دائماً ويُفحص كاملاً
+
+MAX_INDEX_FILE = 1024 * 1024
+BINARY_SNIFF = 8192
+
+# findall بدون تداخل: 3 تمريرات (0، 1، 2) = كل المواضع
+_TRIGRAM = re.compile(b"...", re.S)
+# trigrams عابرة للفاصل بين كلمتين (lookahead = متداخلة)
+_JOINED = re.compile(b"(?=(..\n|.\n.|\n..))", re.S)
+
+
+def _trigrams(data, grams):
+    for start in range(3):
+        grams.update(_TRIGRAM.findall(data, start))
+
+
+def _key(gram):
+    return gram[0] << 16 | gram[1] << 8 | gram[2]
+
+
+# ════════════════════════════════════════════════
+# Reader
+# ════════════════════════════════════════════════
+
+class CodeIndex:
+    """
+    قراءة فهرس على القرص (mmap، بدون تحميل القوائم كلها).
+    files: [(path, size, crc, flag)] بترتيب الأرقام.
+    يرمي ValueError لو الملف مش فهرس صالح.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        try:
+            if self._mm[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"not a search index: {path}")
+            (
+                n_files, self._n_grams, id_size,
+                self._table, files_at
+            ) = _HEADER.unpack_from(self._mm, len(MAGIC))
+            self._typecode = "H" if id_size == 2 else "I"
+            self.files = self._read_files(files_at, n_files)
+        except (struct.error, UnicodeDecodeError):
+            self._mm.close()
+            raise ValueError(f"corrupt search index: {path}")
+
+    def _read_files(self, pos, count):
+        files = []
+        for _ in range(count):
+            size, crc, flag, length = _FILE.unpack_from(self._mm, pos)
+            pos += _FILE.size
+            path = self._mm[pos:pos + length].decode("utf-8")
+            pos += length
+            files.append((path, size, crc, flag))
+        return files
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.files)
+
+    def _entry(self, i):
+        return _ENTRY.unpack_from(
+            self._mm, self._table + i * _ENTRY.size
+        )
+
+    def postings(self, gram):
+        """أرقام الملفات اللي فيها الـ trigram (array)"""
+        key = _key(gram)
+        lo, hi = 0, self._n_grams
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        ids = array(self._typecode)
+        if lo < self._n_grams:
+            found, offset, count = self._entry(lo)
+            if found == key:
+                end = offset + count * ids.itemsize
+                ids.frombytes(self._mm[offset:end])
+        return ids
+
+    def entries(self):
+        """(trigram key, ids) لكل trigram — لإعادة الاستخدام"""
+        for i in range(self._n_grams):
+            key, offset, count = self._entry(i)
+            ids = array(self._typecode)
+            ids.frombytes(
+                self._mm[offset:offset + count * ids.itemsize]
+            )
+            yield key, ids
+
+    def candidates(self, grams):
+        """
+        أرقام الملفات المرشحة: تقاطع القوائم (الأقصر أولاً)
+        + الملفات غير المفهرسة. grams فاضية = كل الملفات النصية.
+        """
+        result = None
+        for ids in sorted(
+            (self.postings(g) for g in grams), key=len
+        ):
+            result = set(ids) if result is None else (
+                result.intersection(ids)
+            )
+            if not result:
+                break
+        if result is None:
+            result = {
+                i for i, f in enumerate(self.files)
+                if f[3] == INDEXED
+            }
+        result.update(
+            i for i, f in enumerate(self.files)
+            if f[3] == UNINDEXED
+        )
+        return sorted(result)
+
+
+# ════════════════════════════════════════════════
+# Builder
+# ════════════════════════════════════════════════
+
+class _Feeder:
+    """كلمات ملف واحد من أجزاء متتالية (حدود الأجزاء محسوبة)"""
+
+    def __init__(self, builder, path, size, crc):
+        self._builder = builder
+        self.path = path
+        self.size = size
+        self.crc = crc
+        self.reset()
+
+    def reset(self):
+        """قراءة الملف من الأول (محاولة ثانية لنفس العضو)"""
+        self._words = set()
+        self._tail = b""
+        self._seen = 0
+        self._crc = 0
+        self.binary = False
+
+    def feed(self, chunk):
+        if self.binary:
+            return
+        data = bytes(chunk)
+        if self._seen < BINARY_SNIFF and (
+            b"\0" in data[:BINARY_SNIFF - self._seen]
+        ):
+            self.binary = True
+            self._words = set()
+            return
+        self._seen += len(data)
+        if self.crc is None:
+            self._crc = zlib.crc32(data, self._crc)
+        words = (self._tail + data.lower()).split()
+        # آخر كلمة ممكن تكمل في الجزء التالي
+        self._tail = words.pop() if words and not (
+            data[-1:].isspace()
+        ) else b""
+        self._words.update(words)
+
+    def close(self):
+        crc = self._crc if self.crc is None else self.crc
+        grams = set()
+        if not self.binary:
+            if self._tail:
+                self._words.add(self._tail)
+            text = b"\n".join(self._words)
+            _trigrams(text, grams)
+            # trigrams عابرة بين كلمتين من الـ join نفسه
+            grams.difference_update(_JOINED.findall(text))
+        self._builder._commit(
+            self.path, self.size, crc,
+            BINARY if self.binary else INDEXED, grams
+        )
+
+
+class IndexBuilder:
+    """
+    بناء فهرس أثناء فك الضغط:
+      feeder = builder.add(path, size, crc)
+      feeder.feed(chunk)... ثم feeder.close()
+    add() يرجع None لو الملف مش محتاج قراءة (أكبر من الحد،
+    أو نفس المسار والحجم والـ CRC في فهرس base السابق →
+    trigrams بتاعته تتنقل منه عند write بدون إعادة تقسيم).
+    """
+
+    def __init__(self, base=None):
+        self._files = []
+        self._postings = {}
+        self._reused = {}  # رقم قديم → رقم جديد
+        self._base = None
+        self._base_files = {}
+        if base and os.path.isfile(base):
+            try:
+                self._base = CodeIndex(base)
+                self._base_files = {
+                    f[0]: (i, f) for i, f in enumerate(
+                        self._base.files
+                    )
+                }
+            except (OSError, ValueError) as e:
+                logger.warning(f"Search index base ignored: {e}")
+
+    @property
+    def reused(self):
+        return len(self._reused)
+
+    def __len__(self):
+        return len(self._files)
+
+    def add(self, path, size, crc=None):
+        old = self._base_files.get(path)
+        if old is not None and crc is not None:
+            old_id, (_, old_size, old_crc, flag) = old
+            if old_size == size and old_crc == crc:
+                self._reused[old_id] = len(self._files)
+                self._files.append((path, size, crc, flag))
+                return None
+        if size > MAX_INDEX_FILE:
+            self._files.append((path, size, crc or 0, UNINDEXED))
+            return None
+        return _Feeder(self, path, size, crc)
+
+    def add_file(self, path, full_path, crc=None, chunk_size=65536):
+        """ملف موجود على القرص (استكمال / git backend)"""
+        size = os.path.getsize(full_path)
+        feeder = self.add(path, size, crc)
+        if feeder is None:
+            return
+        with open(full_path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                feeder.feed(chunk)
+        feeder.close()
+
+    def _commit(self, path, size, crc, flag, grams):
+        file_id = len(self._files)
+        self._files.append((path, size, crc, flag))
+        postings = self._postings
+        for gram in grams:
+            ids = postings.get(gram)
+            if ids is None:
+                ids = postings[gram] = array("I")
+            ids.append(file_id)
+
+    def _merged(self):
+        """{key: ids} = الجديد + المنقول من الفهرس السابق"""
+        merged = {
+            _key(gram): ids for gram, ids in self._postings.items()
+        }
+        if self._base is not None and self._reused:
+            reused = self._reused
+            for key, old_ids in self._base.entries():
+                moved = [reused[i] for i in old_ids if i in reused]
+                if not moved:
+                    continue
+                ids = merged.get(key)
+                if ids is None:
+                    merged[key] = array("I", moved)
+                else:
+                    ids.extend(moved)
+        return merged
+
+    def write(self, path):
+        """كتابة ذرية للفهرس — يرجع (ملفات, trigrams, الحجم)"""
+        merged = self._merged()
+        typecode = "H" if len(self._files) <= 0xFFFF else "I"
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(MAGIC)
+                f.write(bytes(_HEADER.size))
+                table = []
+                for key in sorted(merged):
+                    ids = merged[key]
+                    if typecode != "I":
+                        ids = array(typecode, ids)
+                    table.append((key, f.tell(), len(ids)))
+                    ids.tofile(f)
+                table_at = f.tell()
+                for entry in table:
+                    f.write(_ENTRY.pack(*entry))
+                files_at = f.tell()
+                for file_path, size, crc, flag in self._files:
+                    raw = file_path.encode("utf-8")
+                    f.write(_FILE.pack(size, crc, flag, len(raw)))
+                    f.write(raw)
+                f.seek(len(MAGIC))
+                f.write(_HEADER.pack(
+                    len(self._files), len(table),
+                    array(typecode).itemsize, table_at, files_at
+                ))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        finally:
+            self.close()
+        return len(self._files), len(merged), os.path.getsize(path)
+
+    def close(self):
+        if self._base is not None:
+            self._base.close()
+            self._base = None
+
+
+def build_tree(root, base=None, check=None):
+    """فهرس لشجرة موجودة على القرص (بدون أرشيف)"""
+    from manifest import SKIP_NAMES
+    builder = IndexBuilder(base)
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        if dirpath == root and ".git" in dirnames:
+            dirnames.remove(".git")
+        for name in sorted(filenames):
+            if dirpath == root and name in SKIP_NAMES:
+                continue
+            full = os.path.join(dirpath, name)
+            if os.path.islink(full) or not os.path.isfile(full):
+                continue
+            if check is not None:
+                check()
+            rel = os.path.relpath(full, root).replace("\\", "/")
+            builder.add_file(rel, full)
+    return builder
+
+
+# ════════════════════════════════════════════════
+# Search
+# ════════════════════════════════════════════════
+
+def _sre_parse():
+    try:
+        from re import _parser  # Python 3.11+
+        return _parser
+    except ImportError:
+        import sre_parse
+        return sre_parse
+
+
+def required_literals(pattern, flags=0):
+    """
+    نصوص لازم تظهر حرفياً في أي تطابق (من شجرة الـ regex).
+    أي تركيب مش مضمون (بدائل، تكرار اختياري...) يقطع النص.
+    فشل التحليل → [] (فحص كل الملفات).
+    """
+    try:
+        parsed = _sre_parse().parse(pattern, flags)
+    except Exception:
+        return []
+    runs = []
+    current = []
+
+    def flush():
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    def walk(items):
+        for op, av in items:
+            name = str(op)
+            if name == "LITERAL":
+                current.append(chr(av))
+            elif name == "AT":
+                continue  # ^ $ \b: بدون عرض
+            elif name == "SUBPATTERN" and not av[1]:
+                flush()
+                walk(av[-1])
+                flush()
+            elif name in ("MAX_REPEAT", "MIN_REPEAT") and av[0] >= 1:
+                flush()
+                walk(av[2])
+                flush()
+            else:
+                flush()
+
+    walk(parsed)
+    flush()
+    return runs
+
+
+def query_grams(pattern, ignore_case=False):
+    """trigrams مطلوبة لـ pattern (بنفس تطبيع الفهرس)"""
+    grams = set()
+    for run in required_literals(
+        pattern, re.IGNORECASE if ignore_case else 0
+    ):
+        found = set()
+        for word in run.encode("utf-8").lower().split():
+            _trigrams(word, found)
+        if ignore_case:
+            # حالة الأحرف غير ASCII مش مطبّعة في الفهرس
+            found = {g for g in found if max(g) < 0x80}
+        grams |= found
+    return grams
+
+
+def find_indexes(root):
+    """كل الفهارس تحت root (شجرة واحدة أو مرآة كاملة)"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        if INDEX_FILE in filenames:
+            dirnames[:] = []
+            yield dirpath
+
+
+def search(tree, regex, grams, files_only=False, stats=None):
+    """
+    (rel_path, line_no, line) لكل سطر مطابق في شجرة مفهرسة.
+    files_only: (rel_path, 0, "") مرة واحدة لكل ملف.
+    stats: dict يتجمع فيه files / candidates.
+    """
+    with CodeIndex(os.path.join(tree, INDEX_FILE)) as index:
+        ids = index.candidates(grams)
+        if stats is not None:
+            stats["files"] = stats.get("files", 0) + len(index)
+            stats["candidates"] = (
+                stats.get("candidates", 0) + len(ids)
+            )
+        for file_id in ids:
+            rel = index.files[file_id][0]
+            try:
+                with open(os.path.join(tree, rel), "rb") as f:
+                    data = f.read()
+            except OSError:
+                continue
+            if b"\0" in data[:BINARY_SNIFF]:
+                continue
+            text = data.decode("utf-8", errors="replace")
+            if not regex.search(text):
+                continue
+            if files_only:
+                yield rel, 0, ""
+                continue
+            for line_no, line in enumerate(text.splitlines(), 1):
+                if regex.search(line):
+                    yield rel, line_no, line
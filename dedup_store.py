@@ -0,0 +1,336 @@
+import os
+import sys
+import errno
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger("GitHubDownloader")
+
+
+# ════════════════════════════════════════════════
+# Content-Addressed Dedup Store
+# ════════════════════════════════════════════════
+
+class DedupStore:
+    """
+    مخزن محتوى مفهرس بـ SHA256 لإزالة التكرار بين التحميلات:
+    - كل محتوى يُحفظ مرة واحدة في objects/
+    - الملفات المتطابقة تصبح reflink (CoW) أو نسخة عادية
+    - hardlink بطلب صريح بس (mode="hardlink"): نفس الـ inode
+      مع المخزن، فتعديل الملف في الشجرة يفسد الـ object
+    - عداد مراجع لكل object في SQLite
+    - gc يحذف فقط الـ objects اللي مالهاش مراجع
+    """
+
+    DB_NAME = "index.db"
+    MODES = ("auto", "reflink", "hardlink", "copy")
+    TMP_MAX_AGE = 24 * 3600  # ثواني
+    COMMIT_EVERY = 256  # مرجع — crash ما يضيعش مراجع شجرة كاملة
+    _warned = False
+
+    # Linux: ioctl(FICLONE) — btrfs / xfs / ...
+    _FICLONE = 0x40049409
+
+    def __init__(self, root, mode="auto"):
+        if mode not in self.MODES:
+            raise ValueError(f"unknown link mode: {mode}")
+
+        self.root = os.path.abspath(root)
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        self.mode = mode
+        # أول طريقة ربط فشلت لا نعيد تجربتها
+        self._reflink_ok = mode in ("auto", "reflink")
+        self._hardlink_ok = mode == "hardlink"
+        if self._hardlink_ok and not DedupStore._warned:
+            DedupStore._warned = True  # مرة واحدة في العملية
+            logger.warning(
+                "⚠️ dedup hardlink: الملفات تشارك الـ inode مع"
+                " المخزن — عدّلها بنسخة جديدة، مش في مكانها"
+            )
+        self._pending = 0
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(self.root, self.DB_NAME),
+            timeout=30, check_same_thread=False
+        )
+        self._init_db()
+
+    def _init_db(self):
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS objects (
+                    hash TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    crc  INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS objects_size_crc
+                    ON objects(size, crc);
+                CREATE TABLE IF NOT EXISTS refs (
+                    tree TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    PRIMARY KEY (tree, path)
+                );
+                CREATE INDEX IF NOT EXISTS refs_hash
+                    ON refs(hash);
+            """)
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+    # ─── Objects ───
+
+    def object_path(self, digest):
+        """مسار الـ object داخل المخزن"""
+        return os.path.join(
+            self.objects_dir, digest[:2], digest[2:]
+        )
+
+    def lookup(self, size, crc):
+        """
+        مرشحين بنفس الحجم و CRC32 (من الـ ZIP).
+        يسمح بتجنب الكتابة على القرص للمحتوى المكرر.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT hash FROM objects"
+                " WHERE size = ? AND crc = ?",
+                (size, crc)
+            ).fetchall()
+        return [
+            r[0] for r in rows
+            if os.path.exists(self.object_path(r[0]))
+        ]
+
+    def new_temp(self):
+        """مسار مؤقت داخل المخزن (نفس نظام الملفات)"""
+        return os.path.join(
+            self.tmp_dir, f"{uuid.uuid4().hex}.part"
+        )
+
+    def commit(self, tmp_path, digest, size, crc):
+        """
+        نقل ملف مؤقت إلى objects/.
+        لو الـ object موجود أصلاً يُحذف المؤقت.
+        """
+        obj = self.object_path(digest)
+        if os.path.exists(obj):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            # للقراءة فقط: الـ hardlink يشارك نفس الـ inode
+            os.chmod(tmp_path, 0o444)
+            os.replace(tmp_path, obj)
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO objects"
+                " (hash, size, crc) VALUES (?, ?, ?)",
+                (digest, size, crc)
+            )
+        return obj
+
+    # ─── Linking ───
+
+    def _reflink(self, src, dst):
+        """نسخ CoW — يرمي OSError لو غير مدعوم"""
+        if sys.platform.startswith("linux"):
+            import fcntl
+            with (
+                open(src, "rb") as s,
+                open(dst, "wb") as d
+            ):
+                try:
+                    fcntl.ioctl(
+                        d.fileno(), self._FICLONE, s.fileno()
+                    )
+                except OSError:
+                    d.close()
+                    os.remove(dst)
+                    raise
+            return
+
+        if sys.platform == "darwin":
+            import ctypes
+            libc = ctypes.CDLL(None, use_errno=True)
+            if libc.clonefile(
+                os.fsencode(src), os.fsencode(dst), 0
+            ) != 0:
+                err = ctypes.get_errno()
+                raise OSError(err, os.strerror(err))
+            return
+
+        raise OSError(errno.EOPNOTSUPP, "reflink unsupported")
+
+    def link(self, digest, target):
+        """
+        ربط الـ object بالمسار الهدف.
+        يرجع الطريقة المستخدمة: reflink / hardlink / copy
+        """
+        src = self.object_path(digest)
+        if os.path.lexists(target):
+            os.remove(target)
+
+        if self._reflink_ok:
+            try:
+                self._reflink(src, target)
+                os.chmod(target, 0o644)
+                return "reflink"
+            except OSError as e:
+                if self.mode == "reflink":
+                    raise
+                logger.info(f"reflink unavailable: {e}")
+                self._reflink_ok = False
+
+        if self._hardlink_ok:
+            try:
+                os.link(src, target)
+                return "hardlink"
+            except OSError as e:
+                if self.mode == "hardlink":
+                    raise
+                logger.info(f"hardlink unavailable: {e}")
+                self._hardlink_ok = False
+
+        shutil.copyfile(src, target)
+        return "copy"
+
+    # ─── Reference Counting ───
+
+    def add_ref(self, tree, path, digest):
+        """تسجيل أن الشجرة tree تستخدم الـ object في path"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO refs"
+                " (tree, path, hash) VALUES (?, ?, ?)",
+                (os.path.abspath(tree), path, digest)
+            )
+            self._pending += 1
+            if self._pending >= self.COMMIT_EVERY:
+                self._db.commit()
+                self._pending = 0
+
+    def move_tree(self, old, new):
+        """
+        الشجرة اتنقلت على القرص (staging → مكانها النهائي):
+        المراجع تتبعها، والأشجار المتداخلة تحتها كمان.
+        مراجع النسخة القديمة في new اتشالت معاها.
+        """
+        old = os.path.abspath(old)
+        new = os.path.abspath(new)
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM refs WHERE tree = ?"
+                " OR substr(tree, 1, ?) = ?",
+                (new, len(new) + 1, new + os.sep)
+            )
+            cur = self._db.execute(
+                "UPDATE refs SET tree = ? || substr(tree, ?)"
+                " WHERE tree = ? OR substr(tree, 1, ?) = ?",
+                (new, len(old) + 1, old, len(old) + 1, old + os.sep)
+            )
+            self._db.commit()
+            return cur.rowcount
+
+    def flush(self):
+        """حفظ التغييرات المعلقة في قاعدة البيانات"""
+        with self._lock:
+            self._db.commit()
+            self._pending = 0
+
+    def refcount(self, digest):
+        """عدد المراجع لـ object"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM refs WHERE hash = ?",
+                (digest,)
+            ).fetchone()[0]
+
+    def release_tree(self, tree):
+        """
+        إزالة كل مراجع شجرة (عند حذفها أو فشل فك الضغط).
+        الـ objects نفسها لا تُحذف هنا — هذا دور gc.
+        """
+        with self._lock:
+            cur = self._db.execute(
+                "DELETE FROM refs WHERE tree = ?",
+                (os.path.abspath(tree),)
+            )
+            self._db.commit()
+            return cur.rowcount
+
+    def gc(self):
+        """
+        تنظيف المخزن:
+        - حذف مراجع الأشجار اللي اتمسحت من القرص
+        - حذف الـ objects بدون مراجع
+        - حذف الملفات المؤقتة اليتيمة
+        يرجع (عدد الـ objects المحذوفة, الحجم المحرر)
+        """
+        with self._lock:
+            # قفل كتابة لمنع عملية أخرى من إضافة مراجع أثناء الفحص
+            self._db.execute("BEGIN IMMEDIATE")
+            trees = [
+                r[0] for r in self._db.execute(
+                    "SELECT DISTINCT tree FROM refs"
+                )
+            ]
+            for tree in trees:
+                if not os.path.isdir(tree):
+                    self._db.execute(
+                        "DELETE FROM refs WHERE tree = ?",
+                        (tree,)
+                    )
+
+            orphans = self._db.execute(
+                "SELECT hash, size FROM objects"
+                " WHERE hash NOT IN"
+                " (SELECT DISTINCT hash FROM refs)"
+            ).fetchall()
+
+            removed = 0
+            freed = 0
+            for digest, size in orphans:
+                try:
+                    os.remove(self.object_path(digest))
+                    freed += size
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(
+                        f"gc: cannot remove {digest}: {e}"
+                    )
+                    continue
+                self._db.execute(
+                    "DELETE FROM objects WHERE hash = ?",
+                    (digest,)
+                )
+                removed += 1
+
+            self._db.commit()
+
+        # المؤقتات الحديثة قد تخص تحميلاً شغالاً الآن
+        cutoff = time.time() - self.TMP_MAX_AGE
+        for name in os.listdir(self.tmp_dir):
+            tmp = os.path.join(self.tmp_dir, name)
+            try:
+                if os.path.getmtime(tmp) < cutoff:
+                    os.remove(tmp)
+            except OSError:
+                pass
+
+        return removed, freed
@@ -0,0 +1,182 @@
+import os
+import re
+import logging
+
+logger = logging.getLogger("GitHubDownloader")
+
+
+# ════════════════════════════════════════════════
+# Extraction Journal
+# ════════════════════════════════════════════════
+
+class ExtractJournal:
+    """
+    سجل append-only للأعضاء اللي اكتمل فكها (الحجم + CRC).
+    يُحفظ بجانب المجلد الهدف: <dest>.extracting
+    عند إعادة التشغيل بعد crash يتم تخطي الأعضاء المكتملة
+    وإعادة فك اللي كانت قيد الكتابة فقط.
+    السطور تتجمع في الذاكرة وتتكتب بعد fsync بيانات الدفعة:
+    سطر في السجل على القرص = ملف كامل على القرص
+    (crash = إعادة فك آخر دفعة بس).
+    """
+
+    SUFFIX = ".extracting"
+    HEADER = "# gh-extract-journal v1 "
+    FSYNC_EVERY = 256  # عضو
+
+    def __init__(self, dest, archive_id):
+        self.dest = dest
+        self.archive_id = archive_id
+        self.path = dest + self.SUFFIX
+        self.entries = {}  # name → (size, crc)
+        self._fh = None
+        self._unsynced = []  # ملفات اتسجلت من آخر fsync
+        self._lines = []  # سطورها — تتكتب بعد الـ fsync
+
+    @classmethod
+    def find(cls, base, name, archive_id):
+        """
+        البحث عن فك ضغط غير مكتمل لنفس الأرشيف في base
+        (name أو name_1, name_2, ...) — يرجع المسار أو None.
+        """
+        pattern = re.compile(
+            re.escape(name) + r"(_\d+)?"
+            + re.escape(cls.SUFFIX) + r"$"
+        )
+        try:
+            names = sorted(os.listdir(base))
+        except OSError:
+            return None
+
+        for entry in names:
+            if not pattern.match(entry):
+                continue
+            journal = os.path.join(base, entry)
+            dest = journal[:-len(cls.SUFFIX)]
+            if not os.path.isdir(dest):
+                continue
+            if cls._read_header(journal) == archive_id:
+                return dest
+        return None
+
+    @classmethod
+    def _read_header(cls, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                line = f.readline().rstrip("\n")
+        except OSError:
+            return None
+        if line.startswith(cls.HEADER):
+            return line[len(cls.HEADER):]
+        return None
+
+    # ─── Open / Load ───
+
+    def open(self):
+        """تحميل السجل الموجود (لو مطابق) وفتحه للإضافة"""
+        if self._read_header(self.path) == self.archive_id:
+            self._load()
+        else:
+            self.entries = {}
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(self.HEADER + self.archive_id + "\n")
+
+        self._fh = open(self.path, "a", encoding="utf-8")
+        return len(self.entries)
+
+    def _load(self):
+        """قراءة السجل مع تجاهل آخر سطر لو انقطع أثناء الكتابة"""
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        cut = data.rfind(b"\n") + 1
+        if cut < len(data):
+            # سطر مبتور من crash → قص الملف عند آخر سطر كامل
+            with open(self.path, "r+b") as f:
+                f.truncate(cut)
+            data = data[:cut]
+
+        self.entries = {}
+        for raw in data.decode("utf-8", "replace").splitlines()[1:]:
+            parts = raw.split("\t", 2)
+            if len(parts) != 3:
+                continue
+            try:
+                crc = int(parts[0], 16)
+                size = int(parts[1])
+            except ValueError:
+                continue
+            self.entries[parts[2]] = (size, crc)
+
+    # ─── Records ───
+
+    def is_done(self, name, size, crc, target):
+        """
+        العضو اكتمل في تشغيل سابق؟
+        يقارن الحجم و CRC مع السجل، والحجم مع الملف على القرص.
+        """
+        if self.entries.get(name) != (size, crc):
+            return False
+        try:
+            if name.endswith("/"):
+                return os.path.isdir(target)
+            return os.path.getsize(target) == size
+        except OSError:
+            return False
+
+    def record(self, name, size, crc, target=None):
+        """
+        تسجيل عضو اكتمل (بعد إغلاق ملفه).
+        target: مسار الملف — يتعمل له fsync مع الدفعة الجاية،
+        والسطر يتكتب في السجل بعدها.
+        """
+        self._lines.append(f"{crc:08x}\t{size}\t{name}\n")
+        self._unsynced.append(target)
+        if len(self._unsynced) >= self.FSYNC_EVERY:
+            self._sync()
+
+    def _sync(self):
+        # الملفات الأول: السجل ما يسبقش البيانات على القرص
+        for target in self._unsynced:
+            if target:
+                _fsync_path(target)
+        self._unsynced = []
+        if not self._lines:
+            return
+        self._fh.writelines(self._lines)
+        self._lines = []
+        self._fh.flush()
+        try:
+            os.fsync(self._fh.fileno())
+        except OSError:
+            pass
+
+    def close(self):
+        """إغلاق مع الإبقاء على السجل للاستكمال"""
+        if self._fh is not None:
+            self._sync()
+            self._fh.close()
+            self._fh = None
+
+    def remove(self):
+        """فك الضغط اكتمل أو أُلغي نهائياً"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Cannot remove journal: {e}")
+
+
+def _fsync_path(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,616 @@
+import os
+import stat
+import hashlib
+import mmap
+import logging
+from collections import OrderedDict
+
+from accel import inflate_backend
+
+logger = logging.getLogger("GitHubDownloader")
+
+
+# ════════════════════════════════════════════════
+# Git Smart HTTP (protocol v2) — shallow fetch بدون git
+# ════════════════════════════════════════════════
+
+class GitProtocolError(Exception):
+    """استجابة غير متوقعة من خادم git"""
+    pass
+
+
+FLUSH = b"0000"
+DELIM = b"0001"
+
+OBJ_COMMIT = 1
+OBJ_TREE = 2
+OBJ_BLOB = 3
+OBJ_TAG = 4
+OBJ_OFS_DELTA = 6
+OBJ_REF_DELTA = 7
+
+TYPE_NAMES = {
+    OBJ_COMMIT: b"commit",
+    OBJ_TREE: b"tree",
+    OBJ_BLOB: b"blob",
+    OBJ_TAG: b"tag",
+}
+
+
+def pkt_line(data):
+    """ترميز pkt-line: 4 hex للطول (شامل الـ 4 نفسها) + البيانات"""
+    if isinstance(data, str):
+        data = data.encode()
+    return b"%04x" % (len(data) + 4) + data
+
+
+def _read_exact(stream, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = stream.read(n - len(buf))
+        if not chunk:
+            raise GitProtocolError("اتصال مقطوع أثناء القراءة")
+        buf += chunk
+    return bytes(buf)
+
+
+def read_pkt(stream):
+    """
+    قراءة pkt-line واحدة.
+    يرجع bytes، أو FLUSH / DELIM كقيم خاصة.
+    """
+    head = _read_exact(stream, 4)
+    if head in (FLUSH, DELIM, b"0002"):
+        return head
+    try:
+        length = int(head, 16)
+    except ValueError:
+        raise GitProtocolError(f"pkt-line غير صالح: {head!r}")
+    if length < 4:
+        raise GitProtocolError(f"طول pkt غير صالح: {length}")
+    return _read_exact(stream, length - 4)
+
+
+class SmartHTTPClient:
+    """
+    عميل upload-pack بالبروتوكول v2 فوق HTTP:
+    ls-refs ثم fetch بعمق 1 (shallow) مع sideband.
+    """
+
+    AGENT = "agent=GitHubDownloader/2.0"
+
+    def __init__(self, session, url, auth=None, timeout=30):
+        self.session = session
+        self.url = url.rstrip("/")
+        self.auth = auth
+        self.timeout = timeout
+        self.capabilities = {}
+        self.response = None  # استجابة الـ fetch الجارية
+
+    def _headers(self):
+        return {
+            "Git-Protocol": "version=2",
+            "Accept": "application/x-git-upload-pack-result",
+        }
+
+    def handshake(self):
+        """التحقق من دعم الخادم للبروتوكول v2"""
+        r = self.session.get(
+            f"{self.url}/info/refs?service=git-upload-pack",
+            headers={"Git-Protocol": "version=2"},
+            auth=self.auth, timeout=self.timeout, stream=True
+        )
+        try:
+            if r.status_code != 200:
+                raise GitProtocolError(
+                    f"خطأ HTTP {r.status_code} من خادم git"
+                )
+            r.raw.decode_content = True
+            stream = r.raw
+            lines = []
+            while True:
+                pkt = read_pkt(stream)
+                if pkt == FLUSH:
+                    if lines and lines[0] == b"version 2":
+                        break
+                    if lines and lines[0].startswith(b"# service"):
+                        lines = []  # ترويسة smart HTTP
+                        continue
+                    break
+                lines.append(pkt.rstrip(b"\n"))
+        finally:
+            r.close()
+
+        if not lines or lines[0] != b"version 2":
+            raise GitProtocolError(
+                "الخادم لا يدعم git protocol v2"
+            )
+        for cap in lines[1:]:
+            key, _, value = cap.decode().partition("=")
+            self.capabilities[key] = value
+        if "fetch" not in self.capabilities:
+            raise GitProtocolError("الخادم لا يدعم fetch")
+
+    def _command(self, command, args):
+        body = bytearray()
+        body += pkt_line(f"command={command}\n")
+        body += pkt_line(self.AGENT + "\n")
+        if "object-format" in self.capabilities:
+            body += pkt_line("object-format=sha1\n")
+        body += DELIM
+        for arg in args:
+            body += pkt_line(arg + "\n")
+        body += FLUSH
+
+        r = self.session.post(
+            f"{self.url}/git-upload-pack",
+            data=bytes(body),
+            headers={
+                **self._headers(),
+                "Content-Type":
+                    "application/x-git-upload-pack-request",
+            },
+            auth=self.auth, timeout=self.timeout, stream=True
+        )
+        if r.status_code != 200:
+            r.close()
+            raise GitProtocolError(
+                f"خطأ HTTP {r.status_code} ({command})"
+            )
+        r.raw.decode_content = True
+        return r
+
+    def ls_refs(self, prefixes=("HEAD", "refs/heads/", "refs/tags/")):
+        """يرجع {refname: oid} — الـ tags المُقشّرة تُضاف كـ ^{}"""
+        args = ["symrefs", "peel"] + [
+            f"ref-prefix {p}" for p in prefixes
+        ]
+        r = self._command("ls-refs", args)
+        refs = {}
+        try:
+            while True:
+                pkt = read_pkt(r.raw)
+                if pkt == FLUSH:
+                    break
+                parts = pkt.rstrip(b"\n").decode().split(" ")
+                oid, name = parts[0], parts[1]
+                refs[name] = oid
+                for attr in parts[2:]:
+                    if attr.startswith("peeled:"):
+                        refs[name + "^{}"] = attr[7:]
+        finally:
+            r.close()
+        return refs
+
+    def resolve(self, ref):
+        """تحويل ref (فرع / tag / SHA / HEAD) إلى oid الـ commit"""
+        if len(ref) == 40 and all(
+            c in "0123456789abcdef" for c in ref
+        ):
+            return ref
+        refs = self.ls_refs()
+        for name in (
+            ref, f"refs/heads/{ref}", f"refs/tags/{ref}"
+        ):
+            # tag annotated → الـ commit المُقشّر
+            if name + "^{}" in refs:
+                return refs[name + "^{}"]
+            if name in refs:
+                return refs[name]
+        raise GitProtocolError(f"ref غير موجود: {ref}")
+
+    def fetch_pack(self, want, out, on_data=None, check=None):
+        """
+        fetch بعمق 1 وكتابة الـ packfile في out.
+        on_data(n): بعد كل جزء (للتقدم وحد السرعة)
+        check(): يُستدعى بين الأجزاء (للإلغاء)
+        """
+        args = [
+            f"want {want}",
+            "deepen 1",
+            "ofs-delta",
+            "no-progress",
+            "done",
+        ]
+        r = self._command("fetch", args)
+        self.response = r
+        try:
+            stream = r.raw
+            while True:
+                pkt = read_pkt(stream)
+                if pkt == FLUSH:
+                    raise GitProtocolError("لا يوجد packfile")
+                section = pkt.rstrip(b"\n")
+                if section == b"packfile":
+                    break
+                # shallow-info / wanted-refs / acknowledgments
+                while True:
+                    pkt = read_pkt(stream)
+                    if pkt in (DELIM, FLUSH):
+                        break
+                    if pkt.startswith(b"ERR "):
+                        raise GitProtocolError(pkt[4:].decode())
+
+            while True:
+                if check is not None:
+                    check()
+                pkt = read_pkt(stream)
+                if pkt == FLUSH:
+                    break
+                band, data = pkt[0], pkt[1:]
+                if band == 1:
+                    out.write(data)
+                    if on_data is not None:
+                        on_data(len(data))
+                elif band == 3:
+                    raise GitProtocolError(
+                        data.decode("utf-8", "replace").strip()
+                    )
+        finally:
+            self.response = None
+            r.close()
+
+
+# ════════════════════════════════════════════════
+# Packfile Reader
+# ════════════════════════════════════════════════
+
+class PackReader:
+    """
+    قراءة packfile (v2/v3) من القرص عبر mmap:
+    - فهرسة كل الكائنات بالـ offset وحساب الـ oid (SHA-1)
+    - حل ofs-delta و ref-delta مع cache محدود
+    - التحقق من checksum نهاية الـ pack
+    """
+
+    CACHE_BYTES = 64 * 1024 * 1024
+    INFLATE_CHUNK = 65536
+    HASH_CHUNK = 1024 * 1024
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(
+            self._file.fileno(), 0, access=mmap.ACCESS_READ
+        )
+        self.entries = {}  # offset → (type, size, data_pos, base)
+        self.oids = {}     # oid (bytes) → offset
+        self._cache = OrderedDict()
+        self._cache_size = 0
+        self._zlib = inflate_backend()[1]
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    # ─── Parsing ───
+
+    def _header(self, pos):
+        mm = self._mm
+        c = mm[pos]
+        pos += 1
+        obj_type = (c >> 4) & 7
+        size = c & 0x0F
+        shift = 4
+        while c & 0x80:
+            c = mm[pos]
+            pos += 1
+            size |= (c & 0x7F) << shift
+            shift += 7
+
+        base = None
+        if obj_type == OBJ_OFS_DELTA:
+            c = mm[pos]
+            pos += 1
+            neg = c & 0x7F
+            while c & 0x80:
+                c = mm[pos]
+                pos += 1
+                neg = ((neg + 1) << 7) | (c & 0x7F)
+            base = neg  # يُطرح من offset الكائن
+        elif obj_type == OBJ_REF_DELTA:
+            base = bytes(mm[pos:pos + 20])
+            pos += 20
+        return obj_type, size, pos, base
+
+    def _inflate_iter(self, pos):
+        """فك zlib تدريجياً — يرجع (chunks, end_pos) عبر generator"""
+        d = self._zlib.decompressobj()
+        p = pos
+        mm = self._mm
+        while not d.eof:
+            chunk = mm[p:p + self.INFLATE_CHUNK]
+            if not chunk:
+                raise GitProtocolError("packfile مقطوع")
+            p += len(chunk)
+            try:
+                out = d.decompress(chunk)
+            except self._zlib.error as e:
+                raise GitProtocolError(f"zlib: {e}")
+            if out:
+                yield out
+        self._last_end = p - len(d.unused_data)
+
+    def _inflate(self, pos):
+        return b"".join(self._inflate_iter(pos))
+
+    def index(self, check=None):
+        """فهرسة الـ pack بالكامل — يرجع عدد الكائنات"""
+        mm = self._mm
+        if mm[:4] != b"PACK":
+            raise GitProtocolError("ليس packfile")
+        version = int.from_bytes(mm[4:8], "big")
+        if version not in (2, 3):
+            raise GitProtocolError(f"إصدار pack غير مدعوم: {version}")
+        count = int.from_bytes(mm[8:12], "big")
+
+        pos = 12
+        deltas = []
+        for i in range(count):
+            if check is not None and i % 256 == 0:
+                check()
+            offset = pos
+            obj_type, size, data_pos, base = self._header(pos)
+            if obj_type in TYPE_NAMES:
+                sha = hashlib.sha1(
+                    TYPE_NAMES[obj_type] + b" %d\0" % size
+                )
+                for chunk in self._inflate_iter(data_pos):
+                    sha.update(chunk)
+                self.oids[sha.digest()] = offset
+            elif obj_type == OBJ_OFS_DELTA:
+                base = offset - base
+                for _ in self._inflate_iter(data_pos):
+                    pass
+                deltas.append(offset)
+            elif obj_type == OBJ_REF_DELTA:
+                for _ in self._inflate_iter(data_pos):
+                    pass
+                deltas.append(offset)
+            else:
+                raise GitProtocolError(f"نوع كائن غير معروف: {obj_type}")
+            self.entries[offset] = (obj_type, size, data_pos, base)
+            pos = self._last_end
+
+        # ─── checksum نهاية الـ pack (أجزاء: بدون نسخ الـ pack) ───
+        sha = hashlib.sha1()
+        with memoryview(mm) as view:
+            for start in range(0, pos, self.HASH_CHUNK):
+                sha.update(view[start:min(start + self.HASH_CHUNK, pos)])
+        if sha.digest() != mm[pos:pos + 20]:
+            raise GitProtocolError("checksum الـ packfile غير مطابق!")
+
+        # ─── حساب oid للـ deltas (ref-delta قد يعتمد على delta لاحق) ───
+        pending = deltas
+        while pending:
+            remaining = []
+            for offset in pending:
+                try:
+                    obj_type, data = self._resolve(offset)
+                except KeyError:
+                    remaining.append(offset)
+                    continue
+                oid = hashlib.sha1(
+                    TYPE_NAMES[obj_type]
+                    + b" %d\0" % len(data) + data
+                ).digest()
+                self.oids[oid] = offset
+            if len(remaining) == len(pending):
+                raise GitProtocolError(
+                    "packfile ناقص: delta بدون base (thin pack؟)"
+                )
+            pending = remaining
+        return count
+
+    # ─── Objects ───
+
+    def _cache_put(self, offset, value):
+        size = len(value[1])
+        if size > self.CACHE_BYTES // 4:
+            return
+        self._cache[offset] = value
+        self._cache_size += size
+        while self._cache_size > self.CACHE_BYTES:
+            _, old = self._cache.popitem(last=False)
+            self._cache_size -= len(old[1])
+
+    def _resolve(self, offset):
+        """
+        يرجع (type, data) مع تطبيق سلسلة الـ deltas —
+        بدون recursion: السلسلة ممكن تكون آلاف الـ deltas.
+        """
+        chain = []  # (offset, data_pos) من الطرف لحد الـ base
+        while True:
+            cached = self._cache.get(offset)
+            if cached is not None:
+                self._cache.move_to_end(offset)
+                value = cached
+                break
+            obj_type, size, data_pos, base = self.entries[offset]
+            if obj_type in TYPE_NAMES:
+                value = (obj_type, self._inflate(data_pos))
+                self._cache_put(offset, value)
+                break
+            if obj_type == OBJ_REF_DELTA:
+                base = self.oids[base]  # KeyError لو لسه مش معروف
+            chain.append((offset, data_pos))
+            if len(chain) > len(self.entries):
+                raise GitProtocolError("سلسلة delta دائرية")
+            offset = base
+
+        for offset, data_pos in reversed(chain):
+            value = (
+                value[0],
+                apply_delta(value[1], self._inflate(data_pos))
+            )
+            self._cache_put(offset, value)
+        return value
+
+    def has(self, oid_hex):
+        return bytes.fromhex(oid_hex) in self.oids
+
+    def read(self, oid_hex):
+        """قراءة كائن بالـ oid — يرجع (type, data)"""
+        offset = self.oids.get(bytes.fromhex(oid_hex))
+        if offset is None:
+            raise GitProtocolError(f"كائن غير موجود: {oid_hex}")
+        return self._resolve(offset)
+
+    def write_blob(self, oid_hex, fileobj):
+        """
+        كتابة blob في ملف — بدون تحميل كامل في الذاكرة
+        لو الكائن غير مضغوط بـ delta. يرجع الحجم.
+        """
+        offset = self.oids.get(bytes.fromhex(oid_hex))
+        if offset is None:
+            raise GitProtocolError(f"كائن غير موجود: {oid_hex}")
+        obj_type, size, data_pos, _ = self.entries[offset]
+        if obj_type == OBJ_BLOB and offset not in self._cache:
+            written = 0
+            for chunk in self._inflate_iter(data_pos):
+                fileobj.write(chunk)
+                written += len(chunk)
+            return written
+        obj_type, data = self._resolve(offset)
+        if obj_type != OBJ_BLOB:
+            raise GitProtocolError(f"{oid_hex} ليس blob")
+        fileobj.write(data)
+        return len(data)
+
+
+def _delta_varint(delta, pos):
+    value = 0
+    shift = 0
+    while True:
+        c = delta[pos]
+        pos += 1
+        value |= (c & 0x7F) << shift
+        shift += 7
+        if not c & 0x80:
+            return value, pos
+
+
+def apply_delta(base, delta):
+    """تطبيق git delta (copy / insert) على base"""
+    src_size, pos = _delta_varint(delta, 0)
+    dst_size, pos = _delta_varint(delta, pos)
+    if src_size != len(base):
+        raise GitProtocolError("delta: حجم base غير مطابق")
+
+    out = bytearray()
+    end = len(delta)
+    while pos < end:
+        op = delta[pos]
+        pos += 1
+        if op & 0x80:
+            offset = 0
+            size = 0
+            for i in range(4):
+                if op & (1 << i):
+                    offset |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if op & (0x10 << i):
+                    size |= delta[pos] << (8 * i)
+                    pos += 1
+            if size == 0:
+                size = 0x10000
+            out += base[offset:offset + size]
+        elif op:
+            out += delta[pos:pos + op]
+            pos += op
+        else:
+            raise GitProtocolError("delta: تعليمة غير صالحة")
+
+    if len(out) != dst_size:
+        raise GitProtocolError("delta: حجم الناتج غير مطابق")
+    return bytes(out)
+
+
+# ════════════════════════════════════════════════
+# Checkout
+# ════════════════════════════════════════════════
+
+def parse_tree(data):
+    """يرجع [(mode, name, oid_hex)]"""
+    entries = []
+    pos = 0
+    end = len(data)
+    while pos < end:
+        sp = data.index(b" ", pos)
+        nul = data.index(b"\0", sp)
+        mode = int(data[pos:sp], 8)
+        name = data[sp + 1:nul].decode("utf-8", "surrogateescape")
+        oid = data[nul + 1:nul + 21].hex()
+        entries.append((mode, name, oid))
+        pos = nul + 21
+    return entries
+
+
+def commit_tree(data):
+    """استخراج oid الشجرة من كائن commit"""
+    for line in data.split(b"\n"):
+        if line.startswith(b"tree "):
+            return line[5:].decode()
+        if not line:
+            break
+    raise GitProtocolError("commit بدون tree")
+
+
+def checkout(
+    pack, commit_oid, dest, is_safe_path, on_entry=None, gitlinks=None
+):
+    """
+    كتابة شجرة الـ commit في dest.
+    - symlinks و submodules (gitlinks) تُتخطى مثل مسار الـ ZIP
+    - أي مسار غير آمن يُتخطى
+    on_entry(rel_path, kind, size): kind = file / symlink /
+      gitlink / unsafe — يُستدعى لكل عنصر
+    gitlinks: dict يتملأ {rel_path: commit} للـ submodules
+    يرجع عدد الملفات المكتوبة.
+    """
+    obj_type, data = pack.read(commit_oid)
+    if obj_type != OBJ_COMMIT:
+        raise GitProtocolError(f"{commit_oid} ليس commit")
+
+    written = 0
+    stack = [(commit_tree(data), "")]
+    while stack:
+        tree_oid, prefix = stack.pop()
+        obj_type, data = pack.read(tree_oid)
+        if obj_type != OBJ_TREE:
+            raise GitProtocolError(f"{tree_oid} ليس tree")
+
+        for mode, name, oid in parse_tree(data):
+            rel = prefix + name
+            target = os.path.join(dest, rel)
+            if (
+                name in (".", "..", ".git")
+                or "/" in name or "\\" in name
+                or not is_safe_path(dest, target)
+            ):
+                if on_entry:
+                    on_entry(rel, "unsafe", 0)
+                continue
+
+            kind = stat.S_IFMT(mode)
+            if mode == 0o160000:
+                if gitlinks is not None:
+                    gitlinks[rel] = oid  # الـ commit المثبت
+                if on_entry:
+                    on_entry(rel, "gitlink", 0)
+            elif kind == stat.S_IFDIR:
+                os.makedirs(target, exist_ok=True)
+                stack.append((oid, rel + "/"))
+            elif kind == stat.S_IFLNK:
+                if on_entry:
+                    on_entry(rel, "symlink", 0)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, "wb") as f:
+                    size = pack.write_blob(oid, f)
+                if mode & 0o111:
+                    os.chmod(target, 0o755)
+                written += 1
+                if on_entry:
+                    on_entry(rel, "file", size)
+    return written
@@ -1,25 +1,68 @@
 import os
 import sys
-import requests
-import zipfile
-import hashlib
 import json
 import threading
 import time
-import tempfile
-import shutil
 import stat
 import logging
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+import importlib
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s"
-)
 logger = logging.getLogger("GitHubDownloader")
 
 
+# ════════════════════════════════════════════════
+# Lazy Imports
+# ════════════════════════════════════════════════
+
+class _LazyModule:
+    """
+    وحدة تُستورد فعلياً عند أول وصول لخاصية فيها.
+    أوامر سريعة (gc / bench / --help) ما تحمّلش requests
+    ولا tkinter، وتشتغل على أجهزة بدون Tk.
+    """
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        value = getattr(importlib.import_module(self._name), attr)
+        self.__dict__[attr] = value  # الوصول التالي مباشر
+        return value
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}>"
+
+
+class _PhaseTimer:
+    """with engine._phase("extract"): يضيف زمن المرحلة لـ phases"""
+
+    __slots__ = ("phases", "name", "start")
+
+    def __init__(self, phases, name):
+        self.phases = phases
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.phases[self.name] = self.phases.get(self.name, 0.0) + (
+            time.perf_counter() - self.start
+        )
+
+
+requests = _LazyModule("requests")
+zipfile = _LazyModule("zipfile")
+hashlib = _LazyModule("hashlib")
+tempfile = _LazyModule("tempfile")
+shutil = _LazyModule("shutil")
+tk = _LazyModule("tkinter")
+ttk = _LazyModule("tkinter.ttk")
+filedialog = _LazyModule("tkinter.filedialog")
+messagebox = _LazyModule("tkinter.messagebox")
+
+
 # ════════════════════════════════════════════════
 # Custom Exceptions
 # ════════════════════════════════════════════════
@@ -29,6 +72,11 @@ class DownloadError(Exception):
     pass
 
 
+class StallError(IOError):
+    """الاتصال شغال لكن أبطأ من حد الـ watchdog — يُعاد فوراً"""
+    pass
+
+
 class CancelledError(Exception):
     """المستخدم ألغى العملية"""
     pass
@@ -46,6 +94,7 @@ class GitHubDownloader:
     - تحقق متعدد المراحل (حجم + ZIP + ملفات)
     - حماية أمنية (ZIP bomb / path traversal / symlinks)
     - واجهة رسومية كاملة
+    - وضع بدون واجهة (root=None) لطابور التحميل
     """
 
     MAX_EXTRACT_SIZE = 10 * 1024 * 1024 * 1024  # 10 GB
@@ -54,34 +103,177 @@ class GitHubDownloader:
     UI_UPDATE_INTERVAL = 0.3
     MAX_RETRIES = 3
     RETRY_BASE_WAIT = 5  # ثواني
-
-    def __init__(self, root):
+    RELEASE_WORKERS = 4  # تحميل متوازي لملفات الإصدار
+    SUBMODULE_WORKERS = 4  # submodules متوازية في كل مستوى
+    SUBMODULE_DEPTH = 3  # أقصى عمق submodules متداخلة
+    STALL_RATE = 1024  # bytes/s — أبطأ من كده = اتصال معلّق
+    STALL_SECONDS = 20  # لمدة كده متواصلة من انتظار الشبكة
+    MAX_STALL_RECONNECTS = 5  # إعادة اتصال فورية قبل احتسابها محاولة
+    PIPELINE_DEPTH = 8  # أجزاء منتظرة لكل مرحلة (كتابة / hash)
+
+    def __init__(self, root=None, on_event=None, priority=None):
+        """
+        root: نافذة Tk — أو None لتشغيل المحرك بدون واجهة.
+        on_event: callback(kind, *args) لأحداث التقدم
+          (log / status / speed / progress / transfer)
+        priority: high / normal / low لتوزيع حد السرعة
+          (الافتراضي high للواجهة و normal بدونها)
+        """
         self.root = root
-        self.root.title("GitHub Downloader Pro")
-        self.root.geometry("720x620")
-        self.root.resizable(False, False)
-        self.root.configure(bg="#1e1e2e")
+        self._on_event = on_event
 
         # ─── State ───
         self._cancel_event = threading.Event()
         self._download_lock = threading.Lock()
         self.is_downloading = False
         self.temp_zip_path = None
+        self._partial = None  # (PartialStore, path) لو الملف المؤقت دائم
         self._worker_thread = None
+        self.last_report = None  # آخر تقرير محفوظ
+        self._artifact_info = None  # آخر ملف tar مُجمّع
+        self._search_builder = None  # فهرس البحث أثناء فك الضغط
+        self._index_info = None  # آخر فهرس بحث مكتوب
+        # SHA256 من فك الضغط للـ manifest (manifest.DigestSpill)
+        self._digests = None
+        self._job = {}  # بيانات المهمة الحالية للكتالوج
+        self._lfs_pointers = {}  # rel → (oid, size) من فك الضغط
+        self._lfs_sizes = {}  # rel → الحجم الحقيقي بعد الاستبدال
+        self._lfs_info = None  # آخر ملخص LFS للتقرير
+        self._gitlinks = {}  # submodules الشجرة: {path: commit}
+        self._submodule_info = None  # آخر submodules للتقرير
+        self.last_job_id = None  # id آخر مهمة في الكتالوج
+
+        # ─── الأرشيفات الجزئية (استكمال بعد إعادة التشغيل) ───
+        self.partial_dir = os.environ.get("GH_PARTIAL_DIR")
+
+        # ─── حد السرعة المشترك (GH_BANDWIDTH_LIMIT) ───
+        from bandwidth import get_limiter
+        self._limiter = get_limiter()
+        self._flow = self._limiter.flow(
+            priority or ("high" if root is not None else "normal")
+        )
 
-        # ─── HTTP Session ───
-        self.session = requests.Session()
-        self.session.headers.update({
-            "User-Agent": "GitHubDownloader/2.0",
-            "Accept": "application/vnd.github.v3+json"
-        })
-        gh_token = os.environ.get("GITHUB_TOKEN")
-        if gh_token:
-            self.session.headers["Authorization"] = (
-                f"token {gh_token}"
+        # ─── Dedup Store (اختياري) ───
+        self.dedup_store_path = os.environ.get(
+            "GH_DEDUP_STORE"
+        )
+        self.dedup_mode = os.environ.get(
+            "GH_DEDUP_MODE", "auto"
+        )
+
+        # ─── طريقة الجلب: zip (أرشيف) أو git (shallow fetch) ───
+        self.backend = os.environ.get("GH_BACKEND", "zip")
+        # ─── فهرس بحث trigrams للشجرة (GH_SEARCH_INDEX=1) ───
+        self.search_index = os.environ.get(
+            "GH_SEARCH_INDEX", ""
+        ) not in ("", "0")
+        # شجرة سابقة لنفس المستودع: إعادة استخدام فهرسها (المرآة)
+        self.index_base = None
+        # ─── الناتج: tree (ملفات) أو ملف واحد tar / tar.gz / tar.zst ───
+        self.output_format = os.environ.get(
+            "GH_OUTPUT_FORMAT", "tree"
+        )
+        # ─── حدود الحماية (قابلة للتعديل لكل مهمة، 0 = بدون حد) ───
+        self.max_file_count = self.MAX_FILE_COUNT
+        self.max_extract_size = self.MAX_EXTRACT_SIZE
+        try:
+            self.set_limits(
+                os.environ.get("GH_MAX_FILES"),
+                os.environ.get("GH_MAX_EXTRACT_SIZE")
             )
+        except DownloadError as e:
+            logger.warning(f"{e} — استخدام الحدود الافتراضية")
+        # ─── Watchdog الاتصال البطيء (GH_STALL_RATE=0 يعطله) ───
+        self.stall_rate = self.STALL_RATE
+        self.stall_seconds = self.STALL_SECONDS
+        try:
+            if os.environ.get("GH_STALL_RATE"):
+                self.stall_rate = self._parse_size(
+                    os.environ["GH_STALL_RATE"]
+                )
+            if os.environ.get("GH_STALL_SECONDS"):
+                self.stall_seconds = float(
+                    os.environ["GH_STALL_SECONDS"]
+                )
+        except ValueError:
+            logger.warning("GH_STALL_* غير صالح — الافتراضي")
+        # ─── مراحل الكتابة / الـ hash (GH_PIPELINE_DEPTH=0 يعطلها) ───
+        self.pipeline_depth = self.PIPELINE_DEPTH
+        try:
+            if os.environ.get("GH_PIPELINE_DEPTH"):
+                self.pipeline_depth = int(
+                    os.environ["GH_PIPELINE_DEPTH"]
+                )
+        except ValueError:
+            logger.warning("GH_PIPELINE_DEPTH غير صالح — الافتراضي")
+        # ─── Git LFS: استبدال الـ pointers بالملفات (GH_LFS=0 يعطله) ───
+        self.lfs = os.environ.get("GH_LFS", "1") not in ("", "0")
+        self.lfs_cache = os.environ.get("GH_LFS_CACHE")
+        # ─── Submodules عند الـ commit المثبت (GH_SUBMODULES=1) ───
+        self.submodules = os.environ.get(
+            "GH_SUBMODULES", ""
+        ) not in ("", "0")
+        self.submodule_depth = self.SUBMODULE_DEPTH
+        try:
+            if os.environ.get("GH_SUBMODULE_DEPTH"):
+                self.submodule_depth = int(
+                    os.environ["GH_SUBMODULE_DEPTH"]
+                )
+        except ValueError:
+            logger.warning("GH_SUBMODULE_DEPTH غير صالح — الافتراضي")
+        # submodule داخل شجرة أب: الـ manifest والتقرير للأب
+        self._nested = False
+        # ─── كتالوج المهام SQLite (GH_CATALOG=مسار، 0 يعطله) ───
+        self.catalog_path = os.environ.get("GH_CATALOG")
+        # تخطي commit محمّل سابقاً ووجهته موجودة (حسب الكتالوج)
+        self.skip_existing = False
+        # ─── HTTP Session (تُنشأ عند أول طلب) ───
+        self._session = None
+
+        if self.root is not None:
+            self.root.title("GitHub Downloader Pro")
+            self.root.geometry("720x620")
+            self.root.resizable(False, False)
+            self.root.configure(bg="#1e1e2e")
+
+            # ─── طابور التحميل ───
+            from job_queue import DownloadQueue
+            self.queue = DownloadQueue(
+                os.path.join(
+                    self._get_data_dir(), "queue.json"
+                ),
+                lambda on_event: GitHubDownloader(
+                    on_event=on_event
+                )
+            )
+            self._queue_panel = None
+
+            self._build_ui()
 
-        self._build_ui()
+    @property
+    def session(self):
+        """HTTP session — requests تُستورد مع أول طلب فقط"""
+        with self._download_lock:
+            if self._session is None:
+                session = requests.Session()
+                session.headers.update({
+                    "User-Agent": "GitHubDownloader/2.0",
+                    "Accept": "application/vnd.github.v3+json"
+                })
+                gh_token = os.environ.get("GITHUB_TOKEN")
+                if gh_token:
+                    session.headers["Authorization"] = (
+                        f"token {gh_token}"
+                    )
+                # ─── الإلغاء يقطع الـ sockets فوراً ───
+                from http_abort import install
+                # GH_CACHE_PROXY: أرشيفات و API من cache محلي (serve)
+                install(
+                    session, os.environ.get("GH_CACHE_PROXY"),
+                    os.environ.get("GH_CACHE_SECRET")
+                )
+                self._session = session
+            return self._session
 
     # ════════════════════════════════════════════════
     # UI Construction
@@ -245,10 +437,39 @@ class GitHubDownloader:
         )
         self.cancel_btn.pack(side="right", padx=5)
 
+        tk.Button(
+            bf, text="📋 الطابور",
+            font=("Segoe UI", 13, "bold"),
+            bg="#45475a", fg="#cdd6f4", relief="flat",
+            cursor="hand2",
+            command=self._open_queue, width=10
+        ).pack(side="right", padx=5)
+
     # ════════════════════════════════════════════════
     # UI Helpers (thread-safe)
     # ════════════════════════════════════════════════
 
+    def _open_queue(self):
+        """فتح لوحة طابور التحميل"""
+        from job_queue import QueuePanel
+        if (
+            self._queue_panel is not None
+            and self._queue_panel.winfo_exists()
+        ):
+            self._queue_panel.lift()
+            return
+        self._queue_panel = QueuePanel(
+            self, self.path_entry.get().strip()
+        )
+
+    def _emit(self, kind, *args):
+        """إرسال حدث للـ callback (وضع بدون واجهة)"""
+        if self._on_event is not None:
+            try:
+                self._on_event(kind, *args)
+            except Exception:
+                logger.exception("on_event failed")
+
     def _browse_folder(self):
         """فتح نافذة اختيار مجلد"""
         folder = filedialog.askdirectory()
@@ -262,6 +483,9 @@ class GitHubDownloader:
         المستويات: info, success, warning, error
         """
         logger.info(msg)
+        self._emit("log", msg, level)
+        if self.root is None:
+            return
 
         def _update():
             self.verify_text.configure(state="normal")
@@ -275,6 +499,9 @@ class GitHubDownloader:
 
     def _clear_log(self):
         """مسح اللوج"""
+        if self.root is None:
+            return
+
         def _clear():
             self.verify_text.configure(state="normal")
             self.verify_text.delete("1.0", "end")
@@ -284,6 +511,9 @@ class GitHubDownloader:
 
     def _set_status(self, text, color="#cdd6f4"):
         """تحديث نص الحالة"""
+        self._emit("status", text)
+        if self.root is None:
+            return
         self.root.after(
             0,
             lambda: self.status_label.configure(
@@ -293,6 +523,9 @@ class GitHubDownloader:
 
     def _set_speed(self, text):
         """تحديث نص السرعة"""
+        self._emit("speed", text)
+        if self.root is None:
+            return
         self.root.after(
             0,
             lambda: self.speed_label.configure(text=text)
@@ -300,6 +533,9 @@ class GitHubDownloader:
 
     def _set_progress(self, val):
         """تحديث شريط التقدم (0-100)"""
+        self._emit("progress", val)
+        if self.root is None:
+            return
         self.root.after(
             0,
             lambda: self.progress.configure(
@@ -339,6 +575,17 @@ class GitHubDownloader:
             return desktop
         return os.path.expanduser("~")
 
+    @staticmethod
+    def _get_data_dir():
+        """مجلد بيانات الأداة (GH_DOWNLOADER_HOME أو ~/.github_downloader)"""
+        path = os.environ.get("GH_DOWNLOADER_HOME") or (
+            os.path.join(
+                os.path.expanduser("~"), ".github_downloader"
+            )
+        )
+        os.makedirs(path, exist_ok=True)
+        return path
+
     @staticmethod
     def _format_size(b):
         """تنسيق حجم الملف بوحدات مقروءة"""
@@ -354,6 +601,17 @@ class GitHubDownloader:
             return f"{int(size)} {units[idx]}"
         return f"{size:.1f} {units[idx]}"
 
+    @staticmethod
+    def _parse_size(text):
+        """تحويل "500M" / "2G" / "1024" إلى bytes"""
+        text = str(text).strip().upper().rstrip("B")
+        units = {"K": 1, "M": 2, "G": 3, "T": 4}
+        if text and text[-1] in units:
+            return int(
+                float(text[:-1]) * 1024 ** units[text[-1]]
+            )
+        return int(float(text))
+
     @staticmethod
     def _format_time(sec):
         """تنسيق الوقت بصيغة مقروءة"""
@@ -386,6 +644,39 @@ class GitHubDownloader:
             return parts[0], parts[1]
         return None, None
 
+    @classmethod
+    def _parse_target(cls, url):
+        """
+        تحليل الرابط إلى (owner, repo, ref, release):
+          github.com/o/r/tree/<ref>        → ref
+          github.com/o/r/commit/<sha>      → ref
+          github.com/o/r/releases/tag/<t>  → release
+          github.com/o/r/releases/latest   → release="latest"
+          o/r@<ref>                        → ref
+        """
+        owner, repo = cls._parse_url(url)
+        if not owner:
+            return None, None, None, None
+
+        ref = None
+        if "@" in repo:
+            repo, _, ref = repo.partition("@")
+
+        path = url.strip().rstrip("/")
+        marker = f"{owner}/{repo}/"
+        rest = path.split(marker, 1)[1] if marker in path else ""
+        parts = rest.split("/") if rest else []
+
+        if len(parts) >= 2 and parts[0] in ("tree", "commit"):
+            ref = "/".join(parts[1:])
+        elif parts[:1] == ["releases"]:
+            if parts[1:2] == ["latest"]:
+                return owner, repo, None, "latest"
+            if parts[1:2] == ["tag"] and len(parts) >= 3:
+                return owner, repo, None, "/".join(parts[2:])
+
+        return owner, repo, ref or None, None
+
     @staticmethod
     def _is_safe_path(base, target):
         """التحقق من أن المسار آمن ضد path traversal"""
@@ -408,21 +699,80 @@ class GitHubDownloader:
         except (OSError, AttributeError):
             return float('inf')
 
+    def set_priority(self, priority):
+        """تغيير أولوية هذه المهمة أثناء التحميل"""
+        self._flow.set_priority(priority)
+
+    def set_limits(self, max_files=None, max_size=None):
+        """
+        حدود هذه المهمة: عدد الملفات والحجم بعد الفك
+        (رقم أو نص مثل "50G"؛ None = بدون تغيير، 0 = بدون حد).
+        """
+        try:
+            if max_files not in (None, ""):
+                self.max_file_count = max(0, int(max_files))
+            if max_size not in (None, ""):
+                self.max_extract_size = max(
+                    0, self._parse_size(max_size)
+                )
+        except ValueError:
+            raise DownloadError(
+                f"حد غير صالح: {max_files or max_size}"
+            )
+
     def _check_cancelled(self):
         """فحص إذا تم الإلغاء — يرمي CancelledError"""
         if self._cancel_event.is_set():
             raise CancelledError("تم الإلغاء")
 
+    def cancel(self):
+        """
+        إلغاء فوري من أي thread: الإشارة + قطع كل اتصالات
+        الـ session (القراءة المحبوسة ترجع بدل انتظار الـ
+        timeout) — وانتظار الـ backoff يصحى معها.
+        """
+        self._cancel_event.set()
+        session = self._session
+        if session is None:
+            return
+        for adapter in list(session.adapters.values()):
+            abort = getattr(adapter, "abort", None)
+            if abort is not None:
+                try:
+                    abort()
+                except Exception as e:
+                    logger.debug(f"abort failed: {e}")
+
     def _cancel_download(self):
         """إلغاء التحميل الحالي"""
-        self._cancel_event.set()
+        self.cancel()
         self._set_status(
             "⛔ جاري الإلغاء...", "#f38ba8"
         )
 
-    def _cleanup_temp(self):
-        """حذف الملف المؤقت بشكل آمن"""
+    def _cleanup_temp(self, force=False):
+        """
+        حذف الملف المؤقت بشكل آمن.
+        الأرشيف الجزئي الدائم يُترك للاستكمال لاحقاً
+        إلا لو force (نجاح التحميل أو ملف تالف).
+        """
         with self._download_lock:
+            partial = self._partial
+            self._partial = None
+
+            if partial is not None:
+                store, path = partial
+                self.temp_zip_path = None
+                if force:
+                    store.discard(path)
+                    logger.info(f"Cleaned partial: {path}")
+                elif os.path.exists(path):
+                    logger.info(
+                        f"Kept partial for resume: {path}"
+                    )
+                store.release(path)
+                return
+
             if (
                 self.temp_zip_path
                 and os.path.exists(self.temp_zip_path)
@@ -507,47 +857,63 @@ class GitHubDownloader:
 
         return None
 
+    def _resolve_commit(self, owner, repo, ref):
+        """تحويل فرع/tag إلى SHA الـ commit — أو None"""
+        try:
+            r = self.session.get(
+                f"https://api.github.com/repos"
+                f"/{owner}/{repo}/commits/{ref}",
+                headers={
+                    "Accept": "application/vnd.github.sha"
+                },
+                timeout=10
+            )
+        except requests.RequestException:
+            return None
+        sha = r.text.strip() if r.status_code == 200 else ""
+        if len(sha) == 40 and all(
+            c in "0123456789abcdef" for c in sha
+        ):
+            return sha
+        return None
+
     def _get_api_files(self, owner, repo, branch):
-        """جلب قائمة الملفات من GitHub API"""
+        """
+        جلب قائمة الملفات من GitHub API.
+        الاستجابة تُفك بالتدريج إلى TreeMap مضغوط
+        (مهم للمستودعات ذات مئات الآلاف من المسارات).
+        """
+        import tree_map
         url = (
             f"https://api.github.com/repos"
             f"/{owner}/{repo}"
             f"/git/trees/{branch}?recursive=1"
         )
         try:
-            r = self.session.get(url, timeout=15)
+            r = self.session.get(url, timeout=15, stream=True)
 
-            if r.status_code == 403:
-                self._log(
-                    "⚠️ API rate limit!"
-                    " جرب GITHUB_TOKEN",
-                    "warning"
-                )
-                return None, False
+            with r:
+                if r.status_code == 403:
+                    self._log(
+                        "⚠️ API rate limit!"
+                        " جرب GITHUB_TOKEN",
+                        "warning"
+                    )
+                    return None, False
 
-            if r.status_code != 200:
-                return None, False
+                if r.status_code != 200:
+                    return None, False
 
-            try:
-                data = r.json()
-            except (
-                json.JSONDecodeError, ValueError
-            ):
-                self._log(
-                    "⚠️ استجابة غير صالحة من API",
-                    "warning"
-                )
-                return None, False
-
-            truncated = data.get("truncated", False)
-            files = {}
-            for item in data.get("tree", []):
-                if item.get("type") == "blob":
-                    files[item["path"]] = {
-                        "size": item.get("size", 0),
-                        "sha": item.get("sha", "")
-                    }
-            return files, truncated
+                try:
+                    return tree_map.load(
+                        r.iter_content(self.CHUNK_SIZE)
+                    )
+                except (ValueError, KeyError, TypeError):
+                    self._log(
+                        "⚠️ استجابة غير صالحة من API",
+                        "warning"
+                    )
+                    return None, False
 
         except requests.RequestException:
             return None, False
@@ -579,28 +945,86 @@ class GitHubDownloader:
 
     def _worker(self):
         """Worker thread رئيسي"""
+        result = {"state": "cancelled"}
         try:
-            self._do_download()
+            result = self._do_download()
         except CancelledError:
             self._finish_cancelled()
-        except DownloadError as e:
-            self._finish_error(str(e))
         except Exception as e:
-            logger.exception("Unexpected error")
-            self._finish_error(
-                f"خطأ غير متوقع: {e}"
-            )
+            # خطأ ناتج عن قطع الاتصال بعد الإلغاء = إلغاء
+            if self._cancel_event.is_set():
+                self._finish_cancelled()
+            elif isinstance(e, DownloadError):
+                result = {"state": "failed", "error": str(e)}
+                self._finish_error(str(e))
+            else:
+                logger.exception("Unexpected error")
+                result = {
+                    "state": "failed",
+                    "error": f"خطأ غير متوقع: {e}"
+                }
+                self._finish_error(result["error"])
         finally:
             self.is_downloading = False
             self._cleanup_temp()
+            self._drop_digests()
+        self._record_job(result)
 
-    def _do_download(self):
+    def _run_job(self, url, save, ref=None, release=None):
         """
-        تدفق التحميل الرئيسي.
-        يرمي DownloadError أو CancelledError.
+        تشغيل تحميل كامل بدون واجهة (للطابور والـ CLI).
+        يرجع dict: state (done/failed/cancelled)
+        + dest و files أو error.
         """
+        try:
+            dest, file_count = self._download_repo(
+                url, save, ref, release
+            )
+            result = {
+                "state": "done",
+                "dest": dest, "files": file_count
+            }
+        except CancelledError:
+            result = {"state": "cancelled"}
+        except Exception as e:
+            # خطأ ناتج عن قطع الاتصال بعد الإلغاء = إلغاء
+            if self._cancel_event.is_set():
+                result = {"state": "cancelled"}
+            elif isinstance(e, DownloadError):
+                result = {"state": "failed", "error": str(e)}
+            else:
+                logger.exception("Unexpected error")
+                result = {
+                    "state": "failed",
+                    "error": f"خطأ غير متوقع: {e}"
+                }
+        finally:
+            self._cleanup_temp()
+            self._drop_digests()
+        self._record_job(result)
+        return result
+
+    def _do_download(self):
+        """تحميل من مدخلات الواجهة ثم عرض النتيجة"""
         url = self.url_entry.get().strip()
         save = self.path_entry.get().strip()
+        dest, file_count = self._download_repo(url, save)
+        self._finish_success(dest, file_count)
+        return {"state": "done", "dest": dest, "files": file_count}
+
+    def _download_repo(self, url, save, ref=None, release=None):
+        """
+        تدفق التحميل الرئيسي (بدون أي اعتماد على الواجهة).
+        ref: فرع / tag / SHA (أو من الرابط، وإلا الفرع الافتراضي)
+        release: tag إصدار أو "latest" لتحميل ملفات الإصدار
+        يرجع (dest, file_count).
+        يرمي DownloadError أو CancelledError.
+        """
+        self._job = {
+            "ref": ref, "release": release,
+            "started": time.time(), "phases": {},
+        }
+        self.last_report = None
 
         # ─── تحقق من المدخلات ───
         if not url:
@@ -610,7 +1034,9 @@ class GitHubDownloader:
                 "مجلد الحفظ غير صحيح!"
             )
 
-        owner, repo = self._parse_url(url)
+        owner, repo, url_ref, url_release = (
+            self._parse_target(url)
+        )
         if not owner:
             raise DownloadError(
                 "رابط غير صحيح!\n"
@@ -618,36 +1044,73 @@ class GitHubDownloader:
                 "https://github.com/owner/repo"
             )
 
-        # ─── اكتشاف الفرع ───
+        self._search_builder = None
+        self._index_info = None
+        self._drop_digests()
+        self._lfs_pointers = {}
+        self._lfs_sizes = {}
+        self._lfs_info = None
+        self._gitlinks = {}
+        self._submodule_info = None
+        self._job.update(repo=f"{owner}/{repo}")
+
+        release = release or url_release
+        if release:
+            self._job.update(release=release)
+            return self._download_release(
+                owner, repo, release, save
+            )
+        self._job.update(
+            backend=self.backend, format=self.output_format
+        )
+
+        # ─── اكتشاف الفرع (لو ما اتحددش ref) ───
         self._set_status(
             "🔍 بحث عن المستودع...", "#89b4fa"
         )
-        branch = self._detect_branch(owner, repo)
-        if not branch:
-            raise DownloadError(
-                "مستودع غير موجود أو خاص!\n"
-                f"{owner}/{repo}"
+        ref = ref or url_ref
+        with self._phase("resolve"):
+            branch = ref or self._detect_branch(owner, repo)
+            if not branch:
+                raise DownloadError(
+                    "مستودع غير موجود أو خاص!\n"
+                    f"{owner}/{repo}"
+                )
+
+            self._log(
+                f"📂 {owner}/{repo} 🌿 {branch}",
+                "info"
             )
 
-        self._log(
-            f"📂 {owner}/{repo} 🌿 {branch}",
-            "info"
-        )
+            # ─── تثبيت الـ commit (أرشيف حتمي للاستكمال) ───
+            commit = self._resolve_commit(owner, repo, branch)
+        self._job.update(ref=ref, branch=branch, commit_sha=commit)
+        if commit:
+            self._log(f"🔖 commit: {commit[:12]}", "info")
+
+            # ─── نفس الـ commit محمّل سابقاً؟ (الكتالوج) ───
+            existing = self._find_existing(f"{owner}/{repo}", commit)
+            if existing:
+                self._log(
+                    f"♻️ نفس الـ commit محمّل سابقاً:"
+                    f" {existing['dest']}", "info"
+                )
+                if self.skip_existing:
+                    self._job = {}  # ما اتحملش شيء: بدون سجل جديد
+                    return existing["dest"], existing["files"]
 
         # ─── جلب معلومات API ───
         self._set_status(
             "🔍 فحص الملفات...", "#89b4fa"
         )
-        api_files, truncated = self._get_api_files(
-            owner, repo, branch
-        )
-        if api_files:
-            total_size = sum(
-                f["size"] for f in api_files.values()
+        with self._phase("api"):
+            api_files, truncated = self._get_api_files(
+                owner, repo, commit or branch
             )
+        if api_files:
             msg = (
                 f"✅ API: {len(api_files)} ملف"
-                f" ({self._format_size(total_size)})"
+                f" ({self._format_size(api_files.total_size)})"
             )
             if truncated:
                 msg += " ⚠️ قائمة جزئية"
@@ -657,15 +1120,94 @@ class GitHubDownloader:
                 "⚠️ API غير متاح، متابعة...",
                 "warning"
             )
+        if api_files is not None:
+            self._gitlinks = dict(api_files.gitlinks)
 
         self._check_cancelled()
 
+        local_files = None  # None = الملفات على القرص في dest
+        if self.backend == "git":
+            if self.output_format != "tree":
+                raise DownloadError(
+                    f"صيغة {self.output_format} تتطلب backend zip"
+                )
+            dest, actual_size, zip_hash = self._download_git(
+                owner, repo, commit or branch, save
+            )
+        else:
+            dest, actual_size, zip_hash, local_files = (
+                self._download_archive(
+                    owner, repo, commit, branch, ref, save
+                )
+            )
+        self._job.update(
+            dest=dest, sha256=zip_hash, archive_size=actual_size
+        )
+
+        # ─── Git LFS: الملفات الحقيقية بدل الـ pointers ───
+        if self._lfs_pointers:
+            with self._phase("lfs"):
+                self._fetch_lfs(owner, repo, dest)
+
+        # ─── تحقق ③+④ ملفات ───
+        with self._phase("verify_files"):
+            self._verify_extracted_files(
+                dest, api_files, truncated, local_files
+            )
+
+        if self._nested:
+            # submodule: الـ manifest والفهرس والتقرير في شجرة الأب
+            return dest, self._count_files(dest)
+
+        # ─── Submodules عند الـ commit المثبت في الشجرة ───
+        if self._gitlinks:
+            if not self.submodules or local_files is not None:
+                self._log(
+                    f"ℹ️ {len(self._gitlinks)} submodule"
+                    " بدون تحميل (--recurse-submodules، شجرة فقط)",
+                    "info"
+                )
+            else:
+                with self._phase("submodules"):
+                    self._fetch_submodules(owner, repo, dest)
+
+        # ─── تقرير + manifest لكل ملف ───
+        if local_files is None:
+            file_count = self._count_files(dest)
+            with self._phase("manifest"):
+                manifest = self._write_manifest(dest)
+            if self.search_index:
+                with self._phase("index"):
+                    self._write_search_index(dest)
+            if manifest:
+                self._job.update(bytes=manifest["bytes"])
+        else:
+            file_count = len(local_files)
+            manifest = None
+            self._job.update(bytes=sum(local_files.values()))
+        self._save_report(
+            dest, owner, repo, branch,
+            zip_hash, actual_size, file_count, commit,
+            manifest
+        )
+
+        return dest, file_count
+
+    def _download_archive(
+        self, owner, repo, commit, branch, ref, save
+    ):
+        """
+        تحميل أرشيف ZIP + تحقق ①② + فك الضغط
+        (أو إعادة تجميعه في ملف tar واحد).
+        يرجع (dest, zip_size, sha256, local_files) —
+        local_files = {path: size} للـ tar، أو None للمجلد.
+        """
         # ─── حجم ZIP ───
-        zip_url = (
-            f"https://github.com/{owner}/{repo}"
-            f"/archive/refs/heads/{branch}.zip"
+        zip_url = self._archive_url(
+            owner, repo, commit, branch, ref
         )
-        expected_size = self._get_remote_size(zip_url)
+        with self._phase("preflight"):
+            expected_size = self._get_remote_size(zip_url)
 
         if expected_size > 0:
             self._log(
@@ -684,23 +1226,25 @@ class GitHubDownloader:
                     f" {self._format_size(free)}"
                 )
 
+            # ─── pre-flight: الحدود قبل تحميل أي بايت ───
+            with self._phase("preflight"):
+                self._preflight_zip(zip_url, expected_size)
+
         self._check_cancelled()
 
         # ─── تحميل ZIP ───
         self._set_status(
             "📥 جاري التحميل...", "#89b4fa"
         )
-        fd, tmp_path = tempfile.mkstemp(
-            suffix=".zip", prefix=f"gh_{repo}_"
+        tmp_path, meta = self._open_partial(
+            owner, repo, commit, branch,
+            zip_url, expected_size
         )
-        os.close(fd)
-
-        with self._download_lock:
-            self.temp_zip_path = tmp_path
 
-        actual_size, zip_hash = self._download_zip(
-            zip_url, tmp_path, expected_size
-        )
+        with self._phase("download"):
+            actual_size, zip_hash = self._download_zip(
+                zip_url, tmp_path, expected_size, meta
+            )
 
         # ─── تحقق ① حجم ───
         if expected_size > 0:
@@ -711,6 +1255,8 @@ class GitHubDownloader:
                     "success"
                 )
             else:
+                if actual_size > expected_size:
+                    self._cleanup_temp(force=True)
                 raise DownloadError(
                     f"تحميل غير مكتمل!\n"
                     f"متوقع:"
@@ -725,11 +1271,26 @@ class GitHubDownloader:
         self._set_status(
             "🔍 فحص سلامة ZIP...", "#f9e2af"
         )
-        self._verify_zip_integrity(tmp_path)
+        try:
+            with self._phase("verify_zip"):
+                self._verify_zip_integrity(tmp_path)
+        except DownloadError:
+            # أرشيف تالف لا يصلح للاستكمال
+            self._cleanup_temp(force=True)
+            raise
         self._log("✅ ②: ZIP سليم", "success")
 
         self._check_cancelled()
 
+        # ─── ملف واحد بدل شجرة ملفات ───
+        if self.output_format != "tree":
+            with self._phase("repack"):
+                dest, local_files = self._repack_zip(
+                    tmp_path, save, repo
+                )
+            self._cleanup_temp(force=True)
+            return dest, actual_size, zip_hash, local_files
+
         # ─── فك الضغط ───
         self._set_status(
             "📂 فك الضغط...", "#f9e2af"
@@ -737,51 +1298,1192 @@ class GitHubDownloader:
         self._set_speed("")
         self._set_progress(0)
 
-        dest = self._unique_path(save, repo)
-        self._extract_zip(tmp_path, dest)
+        # ─── استكمال فك ضغط انقطع لنفس الأرشيف ───
+        from extract_journal import ExtractJournal
+        dest = ExtractJournal.find(save, repo, zip_hash)
+        if dest:
+            self._log(
+                f"♻️ فك ضغط غير مكتمل: {dest}", "info"
+            )
+        else:
+            dest = self._unique_path(save, repo)
+        with self._phase("extract"):
+            self._extract_zip(
+                tmp_path, dest, ExtractJournal(dest, zip_hash)
+            )
+
+        self._cleanup_temp(force=True)
 
-        self._cleanup_temp()
+        return dest, actual_size, zip_hash, None
 
-        # ─── تحقق ③+④ ملفات ───
-        self._verify_extracted_files(
-            dest, api_files, truncated
+    def _download_git(self, owner, repo, ref, save):
+        """
+        جلب shallow (عمق 1) عبر git smart HTTP بدل ZIP:
+        packfile واحد → فهرسة في الذاكرة → كتابة الشجرة.
+        كل كائن متحقق منه بالـ SHA-1 الخاص به.
+        يرجع (dest, pack_size, sha256 الـ pack).
+        """
+        from git_fetch import (
+            SmartHTTPClient, PackReader, GitProtocolError,
+            checkout
         )
 
-        # ─── تقرير ───
-        file_count = self._count_files(dest)
-        self._save_report(
-            dest, owner, repo, branch,
-            zip_hash, actual_size, file_count
+        client = SmartHTTPClient(
+            self.session,
+            f"https://github.com/{owner}/{repo}.git",
+            auth=self._git_auth()
+        )
+        try:
+            client.handshake()
+            want = client.resolve(ref)
+        except GitProtocolError as e:
+            raise DownloadError(f"git: {e}")
+        except requests.RequestException as e:
+            raise DownloadError(f"خطأ اتصال: {e}")
+        self._log(
+            f"🔗 git v2: {want[:12]} (depth 1)", "info"
         )
 
-        self._finish_success(dest, file_count)
+        # ─── تحميل الـ packfile ───
+        self._set_status(
+            "📥 جاري التحميل (git)...", "#89b4fa"
+        )
+        fd, tmp_path = tempfile.mkstemp(
+            prefix="gh_", suffix=".pack"
+        )
+        with self._download_lock:
+            self.temp_zip_path = tmp_path
+        sha256 = hashlib.sha256()
+        state = {"size": 0, "ui": time.time()}
 
-    # ════════════════════════════════════════════════
-    # Remote Size
-    # ════════════════════════════════════════════════
+        from throughput import ThroughputMeter, StallWatchdog
+        from http_abort import abort_response
+        meter = ThroughputMeter()
 
-    def _get_remote_size(self, url):
-        """الحصول على حجم الملف من الخادم"""
-        try:
-            resp = self.session.head(
-                url, allow_redirects=True, timeout=15
-            )
-            return int(
-                resp.headers.get("content-length", 0)
-            )
-        except (
-            requests.RequestException, ValueError
-        ):
-            return 0
+        def on_data(n):
+            meter.add(n)
+            # ─── حد السرعة + توزيع عادل بين المهام ───
+            if not self._limiter.acquire(
+                self._flow, n, self._cancel_event
+            ):
+                self._check_cancelled()
+            state["size"] += n
+            now = time.time()
+            if now - state["ui"] >= self.UI_UPDATE_INTERVAL:
+                state["ui"] = now
+                self._update_download_ui(
+                    state["size"], 0, meter.rate()
+                )
+            meter.begin_wait()  # انتظار الشبكة للجزء التالي
 
-    # ════════════════════════════════════════════════
-    # Download with Resume + Retry
-    # ════════════════════════════════════════════════
+        def on_stall(rate):
+            logger.info(f"git stall detected: {rate:.0f} B/s")
+            if client.response is not None:
+                abort_response(client.response)
 
-    def _download_zip(self, url, dest, expected):
-        """
-        تحميل مع دعم الاستكمال وإعادة المحاولة.
-        يرجع (actual_size, sha256_hex).
+        watchdog = StallWatchdog(
+            meter, self.stall_rate, self.stall_seconds, on_stall
+        )
+
+        class _HashingWriter:
+            def __init__(self, f):
+                self.f = f
+
+            def write(self, data):
+                sha256.update(data)
+                self.f.write(data)
+
+        try:
+            meter.begin_wait()
+            with self._phase("download"), watchdog, \
+                    os.fdopen(fd, "wb") as f:
+                client.fetch_pack(
+                    want, _HashingWriter(f), on_data,
+                    self._check_cancelled
+                )
+        except (GitProtocolError, requests.RequestException) as e:
+            self._check_cancelled()
+            if watchdog.stalled:
+                # fetch الـ pack ما يتستكملش: فشل سريع بدل التعليق
+                raise DownloadError(
+                    f"git: {self._stall_message()}"
+                )
+            if isinstance(e, GitProtocolError):
+                raise DownloadError(f"git: {e}")
+            raise DownloadError(f"خطأ اتصال: {e}")
+
+        pack_size = state["size"]
+        self._set_progress(100)
+        self._log(
+            f"📦 pack: {self._format_size(pack_size)}",
+            "info"
+        )
+
+        # ─── تحقق ② فهرسة الـ pack ───
+        self._set_status(
+            "🔍 فحص الـ packfile...", "#f9e2af"
+        )
+        try:
+            pack = PackReader(tmp_path)
+        except (OSError, ValueError) as e:
+            raise DownloadError(f"packfile تالف: {e}")
+        try:
+            try:
+                with self._phase("verify_pack"):
+                    count = pack.index(self._check_cancelled)
+            except GitProtocolError as e:
+                raise DownloadError(f"packfile تالف: {e}")
+            self._log(
+                f"✅ ②: pack سليم ({count} كائن)", "success"
+            )
+
+            # ─── كتابة الشجرة ───
+            self._set_status(
+                "📂 كتابة الملفات...", "#f9e2af"
+            )
+            self._set_speed("")
+            dest = self._unique_path(save, repo)
+            os.makedirs(dest)
+            totals = {"files": 0, "bytes": 0, "skipped": 0}
+            gitlinks = {}
+            lfs_candidates = []
+            if self.lfs:
+                import lfs
+                lfs_sizes = range(lfs.POINTER_MIN, lfs.POINTER_MAX)
+            else:
+                lfs_sizes = ()
+
+            def on_entry(rel, kind, size):
+                self._check_cancelled()
+                if kind == "gitlink":
+                    return  # submodule: يتحمل لوحده (gitlinks)
+                if kind != "file":
+                    totals["skipped"] += 1
+                    logger.info(f"Skipped {kind}: {rel}")
+                    return
+                totals["files"] += 1
+                totals["bytes"] += size
+                if size in lfs_sizes:
+                    lfs_candidates.append(rel)
+                self._check_zip_limits(
+                    totals["bytes"], totals["files"]
+                )
+                if totals["files"] % 100 == 0:
+                    self._set_status(
+                        f"📂 {totals['files']} ملف", "#f9e2af"
+                    )
+
+            try:
+                with self._phase("extract"):
+                    checkout(
+                        pack, want, dest,
+                        self._is_safe_path, on_entry, gitlinks
+                    )
+            except (CancelledError, DownloadError):
+                shutil.rmtree(dest, ignore_errors=True)
+                raise
+            except (GitProtocolError, OSError) as e:
+                shutil.rmtree(dest, ignore_errors=True)
+                raise DownloadError(f"فشل كتابة الملفات: {e}")
+        finally:
+            pack.close()
+
+        for rel in lfs_candidates:
+            pointer = lfs.read_pointer(os.path.join(dest, rel))
+            if pointer is not None:
+                self._lfs_pointers[rel] = pointer
+        self._gitlinks = gitlinks
+
+        if totals["skipped"]:
+            self._log(
+                f"⚠️ تم تخطي {totals['skipped']} عنصر"
+                " (symlinks / مسارات غير آمنة)",
+                "warning"
+            )
+        self._log(
+            f"✅ {totals['files']} ملف"
+            f" ({self._format_size(totals['bytes'])})",
+            "success"
+        )
+        self._set_progress(100)
+        self._cleanup_temp(force=True)
+        return dest, pack_size, sha256.hexdigest()
+
+    def _git_auth(self):
+        """GITHUB_TOKEN كـ Basic auth (المطلوب لنقل git عبر HTTP)"""
+        token = os.environ.get("GITHUB_TOKEN")
+        if token:
+            return ("x-access-token", token)
+        return None
+
+    # ════════════════════════════════════════════════
+    # Release Assets
+    # ════════════════════════════════════════════════
+
+    def _get_release(self, owner, repo, tag):
+        """جلب بيانات إصدار (tag أو latest) من API"""
+        path = (
+            "releases/latest" if tag == "latest"
+            else f"releases/tags/{tag}"
+        )
+        try:
+            r = self.session.get(
+                f"https://api.github.com/repos"
+                f"/{owner}/{repo}/{path}",
+                timeout=15
+            )
+        except requests.RequestException as e:
+            raise DownloadError(f"فشل جلب الإصدار: {e}")
+
+        if r.status_code == 404:
+            raise DownloadError(
+                f"الإصدار غير موجود!\n"
+                f"{owner}/{repo} @ {tag}"
+            )
+        if r.status_code == 403:
+            raise DownloadError(
+                "⚠️ GitHub API rate limit!"
+                " جرب تضيف GITHUB_TOKEN"
+            )
+        if r.status_code != 200:
+            raise DownloadError(
+                f"خطأ HTTP {r.status_code}"
+            )
+        try:
+            return r.json()
+        except (json.JSONDecodeError, ValueError):
+            raise DownloadError("استجابة غير صالحة من API")
+
+    def _download_release(self, owner, repo, tag, save):
+        """
+        تحميل كل ملفات إصدار بالتوازي.
+        كل ملف يمر بنفس الاستكمال وإعادة المحاولة و SHA256
+        ويُطابق حجمه (و digest لو متاح) مع API.
+        يرجع (dest, file_count).
+        """
+        self._set_status("🔍 جلب الإصدار...", "#89b4fa")
+        release = self._get_release(owner, repo, tag)
+        tag_name = release.get("tag_name") or tag
+        assets = [
+            a for a in release.get("assets", [])
+            if a.get("state", "uploaded") == "uploaded"
+        ]
+        if not assets:
+            raise DownloadError(
+                f"الإصدار {tag_name} بدون ملفات!"
+            )
+
+        total = sum(a.get("size", 0) for a in assets)
+        self._log(
+            f"🏷️ {owner}/{repo} @ {tag_name}:"
+            f" {len(assets)} ملف"
+            f" ({self._format_size(total)})",
+            "info"
+        )
+
+        free = self._get_free_space(save)
+        if free < total * 2:
+            raise DownloadError(
+                f"مساحة غير كافية!\n"
+                f"مطلوب: ~{self._format_size(total * 2)}\n"
+                f"متاح: {self._format_size(free)}"
+            )
+
+        dest = self._unique_path(save, f"{repo}-{tag_name}")
+        os.makedirs(dest, exist_ok=True)
+        store = self._open_partial_store()
+        self._job.update(
+            release=tag_name, dest=dest,
+            archive_size=total, bytes=total
+        )
+
+        make_hook = self._progress_hooks(total)
+        self._set_status("📥 جاري التحميل...", "#89b4fa")
+        results = []
+        errors = []
+        from concurrent.futures import (
+            ThreadPoolExecutor, as_completed
+        )
+        with self._phase("download"), ThreadPoolExecutor(
+            max_workers=self.RELEASE_WORKERS
+        ) as pool:
+            futures = {
+                pool.submit(
+                    self._download_asset, store, owner, repo,
+                    asset, dest, make_hook(asset["id"])
+                ): asset
+                for asset in assets
+            }
+            for future in as_completed(futures):
+                asset = futures[future]
+                try:
+                    results.append(future.result())
+                except CancelledError:
+                    errors.append((asset["name"], None))
+                except DownloadError as e:
+                    errors.append((asset["name"], str(e)))
+                    self._log(
+                        f"❌ {asset['name']}: {e}", "error"
+                    )
+
+        self._check_cancelled()
+        if errors:
+            raise DownloadError(
+                f"فشل تحميل {len(errors)} من"
+                f" {len(assets)} ملف"
+                f" (الأجزاء محفوظة للاستكمال)"
+            )
+
+        self._set_progress(100)
+        results.sort(key=lambda r: r["name"])
+        with self._phase("manifest"):
+            manifest = self._write_manifest(dest)
+        self._write_report(dest, {
+            "repo": f"{owner}/{repo}",
+            "release": tag_name,
+            "assets": results,
+            "total_size": total,
+            "manifest": manifest,
+            "download_time": time.strftime(
+                "%Y-%m-%d %H:%M:%S"
+            ),
+            "tool": "GitHubDownloader/2.0",
+        })
+        return dest, len(results)
+
+    def _progress_hooks(self, total):
+        """
+        تقدم مجمّع لعدة تحميلات متوازية: يرجع make_hook(key)
+        اللي يعمل on_progress لكل تحميل.
+        """
+        from throughput import ThroughputMeter
+        progress = {}
+        progress_lock = threading.Lock()
+        meter = ThroughputMeter()
+        last_ui = [time.time()]
+
+        def make_hook(key):
+            def hook(downloaded):
+                with progress_lock:
+                    # أول قيمة قد تكون offset استكمال — مش سرعة
+                    if key in progress:
+                        delta = downloaded - progress[key]
+                        if delta > 0:
+                            meter.add(delta)
+                    progress[key] = downloaded
+                    now = time.time()
+                    if now - last_ui[0] < self.UI_UPDATE_INTERVAL:
+                        return
+                    last_ui[0] = now
+                    done = sum(progress.values())
+                self._update_download_ui(done, total, meter.rate())
+            return hook
+        return make_hook
+
+    def _download_asset(
+        self, store, owner, repo, asset, dest, on_progress
+    ):
+        """تحميل ملف إصدار واحد (يعمل في thread)"""
+        name = os.path.basename(asset["name"])
+        target = os.path.join(dest, name)
+        if not name or not self._is_safe_path(dest, target):
+            raise DownloadError(f"اسم ملف غير آمن: {name!r}")
+
+        size = asset.get("size", 0)
+        url = asset["browser_download_url"]
+        path, meta = self._acquire_partial(
+            store, owner, repo, f"asset-{asset['id']}",
+            url, size, suffix=".part"
+        )
+        try:
+            actual, sha = self._download_zip(
+                url, path, size, meta, on_progress
+            )
+
+            # ─── مطابقة الحجم و digest مع API ───
+            if size and actual != size:
+                store.discard(path)
+                raise DownloadError(
+                    f"{name}: حجم غير مطابق"
+                    f" ({actual} ≠ {size})"
+                )
+            digest = asset.get("digest") or ""
+            if digest.startswith("sha256:") and (
+                digest[7:] != sha
+            ):
+                store.discard(path)
+                raise DownloadError(f"{name}: SHA256 غير مطابق!")
+
+            shutil.move(path, target)
+            store.discard(path)  # بيانات الـ meta فقط
+        finally:
+            store.release(path)
+
+        self._log(f"✅ {name} ({self._format_size(actual)})", "success")
+        return {"name": name, "size": actual, "sha256": sha}
+
+    # ════════════════════════════════════════════════
+    # Git LFS
+    # ════════════════════════════════════════════════
+
+    def _fetch_lfs(self, owner, repo, dest):
+        """
+        استبدال LFS pointers اللي اتلقطت أثناء فك الضغط
+        بالملفات الحقيقية: الموجود في cache الـ OID يُنسخ فوراً،
+        والباقي من batch API ثم تحميل متوازي بنفس الاستكمال
+        وإعادة المحاولة، والتحقق SHA-256 = OID قبل الاستبدال.
+        """
+        import lfs
+        pointers = self._lfs_pointers
+        if self.output_format != "tree":
+            # الـ pointers جوه الـ tar — ما فيش ملفات نستبدلها
+            self._log(
+                f"ℹ️ LFS: {len(pointers)} pointer محفوظ كما هو"
+                f" (ناتج {self.output_format})",
+                "info"
+            )
+            return
+        if self._search_builder is not None:
+            # الفهرس اتغذى بمحتوى الـ pointers — يتبني من القرص
+            self._search_builder.close()
+            self._search_builder = None
+
+        cache = lfs.LFSCache(
+            self.lfs_cache or os.path.join(
+                self._get_data_dir(), "lfs"
+            )
+        )
+        objects = dict(pointers.values())
+        need = {
+            oid: size for oid, size in objects.items()
+            if not cache.has(oid, size)
+        }
+        total = sum(need.values())
+        self._log(
+            f"📦 LFS: {len(pointers)} ملف"
+            f" ({len(objects) - len(need)} من الـ cache،"
+            f" {len(need)} للتحميل"
+            f" {self._format_size(total)})",
+            "info"
+        )
+
+        if need:
+            self._set_status("📦 جلب ملفات LFS...", "#89b4fa")
+            try:
+                actions, rejected = lfs.batch(
+                    self.session,
+                    f"https://github.com/{owner}/{repo}.git",
+                    need, self._git_auth()
+                )
+            except (lfs.LFSError, requests.RequestException) as e:
+                raise DownloadError(f"LFS: {e}")
+            for oid, message in rejected.items():
+                self._log(f"❌ LFS {oid[:12]}: {message}", "error")
+
+            store = self._open_partial_store()
+            make_hook = self._progress_hooks(total)
+            errors = len(rejected)
+            from concurrent.futures import (
+                ThreadPoolExecutor, as_completed
+            )
+            with ThreadPoolExecutor(
+                max_workers=self.RELEASE_WORKERS
+            ) as pool:
+                futures = {
+                    pool.submit(
+                        self._download_lfs_object, store, cache,
+                        owner, repo, oid, need[oid], action,
+                        make_hook(oid)
+                    ): oid
+                    for oid, action in actions.items()
+                }
+                for future in as_completed(futures):
+                    oid = futures[future]
+                    try:
+                        future.result()
+                    except CancelledError:
+                        errors += 1
+                    except DownloadError as e:
+                        errors += 1
+                        self._log(f"❌ LFS {oid[:12]}: {e}", "error")
+
+            self._check_cancelled()
+            if errors:
+                raise DownloadError(
+                    f"LFS: فشل {errors} من {len(need)} ملف"
+                    f" (الأجزاء محفوظة للاستكمال)"
+                )
+
+        # ─── الاستبدال: pointer → محتوى (os.replace ذري) ───
+        for rel, (oid, size) in sorted(pointers.items()):
+            target = os.path.join(dest, rel)
+            if not self._is_safe_path(dest, target):
+                continue
+            cache.materialize(oid, target)
+            self._lfs_sizes[rel] = size
+
+        self._lfs_info = {
+            "files": len(pointers),
+            "objects": len(objects),
+            "downloaded": len(need),
+            "bytes": sum(objects.values()),
+        }
+        self._log(
+            f"✅ LFS: {len(pointers)} ملف"
+            f" ({self._format_size(self._lfs_info['bytes'])})",
+            "success"
+        )
+
+    def _download_lfs_object(
+        self, store, cache, owner, repo, oid, size, action,
+        on_progress
+    ):
+        """تحميل object واحد إلى الـ cache (يعمل في thread)"""
+        # href موقّع ومتغير — المفتاح الثابت هو الـ OID
+        path, meta = self._acquire_partial(
+            store, owner, repo, f"lfs-{oid}",
+            f"lfs:{oid}", size, suffix=".part"
+        )
+        # headers الـ action بدل توكن الـ session (S3 يرفضه)
+        headers = {"Authorization": None}
+        headers.update(action.get("header") or {})
+        try:
+            actual, sha = self._download_zip(
+                action["href"], path, size, meta, on_progress,
+                headers
+            )
+            if actual != size or sha != oid:
+                store.discard(path)
+                raise DownloadError(
+                    f"محتوى غير مطابق للـ OID ({actual} بايت)"
+                )
+            cache.commit(path, oid)
+            store.discard(path)  # بيانات الـ meta فقط
+        finally:
+            store.release(path)
+
+    # ════════════════════════════════════════════════
+    # Submodules
+    # ════════════════════════════════════════════════
+
+    def _fetch_submodules(self, owner, repo, dest):
+        """
+        تحميل الـ submodules مستوى مستوى (لحد submodule_depth)
+        عند الـ commit المثبت في الشجرة، وكل مستوى بالتوازي.
+        نفس (المستودع، commit) في أكتر من مكان يتحمل مرة واحدة
+        ويتنسخ لباقي المواضع في الآخر.
+        """
+        import submodules
+        from concurrent.futures import (
+            ThreadPoolExecutor, as_completed
+        )
+        seen = {}  # (repo, commit) → أول مكان اتحمل فيه
+        copies = []  # (depth, key, target, path)
+        info = []
+        failed = 0
+        stage_root = os.path.dirname(dest)
+        level = [(owner, repo, dest, "", self._gitlinks)]
+        depth = 0
+        while level:
+            if depth >= self.submodule_depth:
+                pending = sum(len(links) for *_, links in level)
+                self._log(
+                    f"⚠️ {pending} submodule أعمق من"
+                    f" {self.submodule_depth} مستوى — اتخطت",
+                    "warning"
+                )
+                break
+            depth += 1
+
+            # ─── submodules المستوى: URL من .gitmodules ───
+            jobs = {}
+            for parent_owner, parent_repo, root, prefix, links in level:
+                urls = submodules.parse_gitmodules(root)
+                for rel, commit in sorted(links.items()):
+                    path = prefix + rel
+                    target = os.path.join(root, rel)
+                    url = urls.get(rel)
+                    if not self._is_safe_path(dest, target):
+                        self._log(f"⚠️ {path}: مسار غير آمن", "warning")
+                        continue
+                    name = url and submodules.resolve_url(
+                        url, parent_owner, parent_repo
+                    )
+                    if not name:
+                        self._log(
+                            f"⚠️ {path}: مش على GitHub"
+                            f" ({url or 'بدون .gitmodules'}) — اتخطى",
+                            "warning"
+                        )
+                        continue
+                    key = (f"{name[0]}/{name[1]}".lower(), commit)
+                    if key in seen or key in jobs:
+                        copies.append((depth, key, target, path))
+                        continue
+                    jobs[key] = (*name, commit, target, path)
+            if not jobs:
+                break
+
+            self._set_status(
+                f"🧩 submodules: مستوى {depth} ({len(jobs)})",
+                "#89b4fa"
+            )
+            level = []
+            with ThreadPoolExecutor(
+                max_workers=self.SUBMODULE_WORKERS
+            ) as pool:
+                futures = {
+                    pool.submit(
+                        self._download_submodule, *job, stage_root
+                    ): key
+                    for key, job in jobs.items()
+                }
+                for future in as_completed(futures):
+                    key = futures[future]
+                    sub_owner, sub_repo, commit, target, path = (
+                        jobs[key]
+                    )
+                    try:
+                        files, links = future.result()
+                    except CancelledError:
+                        failed += 1
+                        continue
+                    except DownloadError as e:
+                        failed += 1
+                        self._log(f"❌ {path}: {e}", "error")
+                        continue
+                    seen[key] = target
+                    info.append({
+                        "path": path,
+                        "repo": f"{sub_owner}/{sub_repo}",
+                        "commit": commit, "files": files,
+                    })
+                    self._log(
+                        f"🧩 {path} → {sub_owner}/{sub_repo}"
+                        f" @ {commit[:12]} ({files} ملف)",
+                        "success"
+                    )
+                    if links:
+                        level.append((
+                            sub_owner, sub_repo, target,
+                            path + "/", links
+                        ))
+            self._check_cancelled()
+
+        # ─── التكرارات: نسخة من أول تحميل (الأعمق أولاً) ───
+        for _, key, target, path in sorted(
+            copies, key=lambda c: -c[0]
+        ):
+            source = seen.get(key)
+            if source is None:
+                continue  # التحميل الأصلي فشل (محسوب)
+            self._check_cancelled()
+            try:
+                shutil.copytree(
+                    source, target, symlinks=True,
+                    dirs_exist_ok=True
+                )
+            except OSError as e:
+                failed += 1
+                self._log(f"❌ {path}: {e}", "error")
+                continue
+            info.append({
+                "path": path, "repo": key[0], "commit": key[1],
+                "copy_of": os.path.relpath(
+                    source, dest
+                ).replace("\\", "/"),
+            })
+            self._log(f"♻️ {path}: نسخة من تحميل سابق", "info")
+
+        self._submodule_info = sorted(
+            info, key=lambda s: s["path"]
+        )
+        if info and self._search_builder is not None:
+            # الفهرس يتبني من القرص عشان يشمل الـ submodules
+            self._search_builder.close()
+            self._search_builder = None
+        if failed:
+            raise DownloadError(
+                f"فشل {failed} submodule"
+                f" (الشجرة الأساسية في {dest})"
+            )
+
+    def _download_submodule(
+        self, owner, repo, commit, target, path, stage_root
+    ):
+        """
+        submodule واحد بنفس مسار التحميل (يعمل في thread):
+        مجلد مؤقت جنب الشجرة ثم os.replace مكان الـ gitlink.
+        يرجع (عدد الملفات، gitlinks الـ submodule نفسه).
+        """
+        engine = self._submodule_engine(path)
+        stage = tempfile.mkdtemp(prefix=".gh-sub-", dir=stage_root)
+        try:
+            sub_dest, files = engine._download_repo(
+                f"{owner}/{repo}", stage, ref=commit
+            )
+            if os.path.isdir(target) and not os.listdir(target):
+                os.rmdir(target)  # مكان الـ gitlink الفاضي
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(sub_dest, target)
+            self._move_dedup_tree(sub_dest, target)
+        except OSError as e:
+            raise DownloadError(str(e))
+        finally:
+            engine._cleanup_temp()
+            shutil.rmtree(stage, ignore_errors=True)
+        return files, engine._gitlinks
+
+    def _submodule_engine(self, path):
+        """
+        محرك لـ submodule: نفس الإعدادات والـ session (الإلغاء
+        يقطع اتصالاته) وحصة السرعة، وتحذيراته في لوج الأب.
+        """
+        def on_event(kind, *args):
+            if kind == "log" and args[1] in ("warning", "error"):
+                self._log(f"   {path}: {args[0]}", args[1])
+
+        engine = GitHubDownloader(on_event=on_event)
+        engine._nested = True
+        engine._cancel_event = self._cancel_event
+        engine._session = self.session
+        engine._flow = self._flow
+        engine.output_format = "tree"
+        engine.search_index = False  # فهرس الأب يشمل الشجرة كلها
+        for attr in (
+            "backend", "lfs", "lfs_cache", "partial_dir",
+            "dedup_store_path", "dedup_mode", "catalog_path",
+            "max_file_count", "max_extract_size",
+            "stall_rate", "stall_seconds", "pipeline_depth",
+        ):
+            setattr(engine, attr, getattr(self, attr))
+        return engine
+
+    # ════════════════════════════════════════════════
+    # Plan (dry-run)
+    # ════════════════════════════════════════════════
+
+    def plan(self, url, save=".", ref=None, release=None):
+        """
+        تقدير مهمة بدون تحميل أي ملف: الـ ref والـ commit،
+        bytes التحميل، الحجم بعد الفك، عدد الملفات، أقصى مساحة
+        قرص لصيغة الناتج، والزمن من السرعة المقاسة في الكتالوج.
+        المصادر بالترتيب: الكتالوج (نفس الـ commit اتحمل قبل كده)
+        ثم شجرة API ثم الـ central directory (طلبات Range صغيرة).
+        يرمي DownloadError لو المستودع أو الإصدار مش موجود.
+        """
+        owner, repo, url_ref, url_release = self._parse_target(url)
+        if not owner:
+            raise DownloadError(
+                "رابط غير صحيح!\n"
+                "الصيغة: "
+                "https://github.com/owner/repo"
+            )
+        release = release or url_release
+        if release:
+            plan = self._plan_release(owner, repo, release)
+        else:
+            plan = self._plan_repo(owner, repo, ref or url_ref)
+        plan["repo"] = f"{owner}/{repo}"
+        if plan.get("existing") and self.skip_existing:
+            plan.update(download=0, output=0, peak=0, needed=0)
+        else:
+            self._plan_disk(plan)
+        free = self._get_free_space(save)
+        plan["free"] = None if free == float("inf") else free
+        plan["fits"] = plan["needed"] is None or free >= plan["needed"]
+        self._plan_duration(plan)
+        return plan
+
+    def _plan_repo(self, owner, repo, ref):
+        full = f"{owner}/{repo}"
+        branch = ref or self._detect_branch(owner, repo)
+        if not branch:
+            raise DownloadError(
+                "مستودع غير موجود أو خاص!\n"
+                f"{full}"
+            )
+        commit = self._resolve_commit(owner, repo, branch)
+        plan = {
+            "ref": ref, "branch": branch, "commit": commit,
+            "backend": self.backend, "format": self.output_format,
+            "estimated": False, "warnings": [],
+        }
+        if self.backend == "git" and self.output_format != "tree":
+            plan["warnings"].append(
+                f"صيغة {self.output_format} تتطلب backend zip"
+            )
+
+        # ─── نفس الـ commit في الكتالوج: أحجام مقاسة فعلاً ───
+        known = None
+        if commit:
+            existing = self._find_existing(full, commit)
+            if existing:
+                plan["existing"] = existing["dest"]
+            known = self._catalog_job(full, commit)
+        if known:
+            plan.update(
+                archive=known["archive_size"],
+                uncompressed=known["bytes"],
+                files=known["files"], source="catalog",
+            )
+        else:
+            zip_url = self._archive_url(
+                owner, repo, commit, branch, ref
+            )
+            archive = self._get_remote_size(zip_url)
+            plan.update(archive=archive or None)
+            # شجرة API (الـ cache proxy بيخزنها بالـ commit) ثم
+            # الـ central directory بطلبات Range لو القائمة ناقصة
+            api_files, truncated = self._get_api_files(
+                owner, repo, commit or branch
+            )
+            if api_files and not truncated:
+                plan.update(
+                    uncompressed=api_files.total_size,
+                    files=len(api_files), source="api",
+                )
+                if api_files.gitlinks:
+                    plan["warnings"].append(
+                        f"{len(api_files.gitlinks)} submodule"
+                        " خارج التقدير"
+                    )
+            else:
+                info = None
+                if archive > 0:
+                    from remote_zip import (
+                        RemoteZip, RangeNotSupported
+                    )
+                    try:
+                        with RemoteZip(
+                            self.session, zip_url, archive
+                        ) as rz:
+                            info = rz.summary()
+                    except (
+                        RangeNotSupported, zipfile.BadZipFile,
+                        requests.RequestException
+                    ) as e:
+                        logger.info(f"Plan: no central directory: {e}")
+                if info:
+                    plan.update(
+                        uncompressed=info["uncompressed"],
+                        files=info["files"], source="zip",
+                    )
+                else:
+                    plan.update(
+                        uncompressed=(
+                            api_files.total_size if api_files
+                            else None
+                        ),
+                        files=len(api_files) if api_files else None,
+                        source="api" if api_files else None,
+                    )
+                    if truncated:
+                        plan["warnings"].append("قائمة API جزئية")
+            if not (commit or archive or api_files):
+                raise DownloadError(
+                    "مستودع أو ref غير موجود!\n"
+                    f"{full} @ {branch}"
+                )
+            # الـ packfile مش معروف قبل الـ fetch: حجم الأرشيف تقريباً
+            plan["estimated"] = self.backend == "git"
+
+        if plan["uncompressed"] is not None:
+            try:
+                self._check_zip_limits(
+                    plan["uncompressed"], plan["files"] or 0
+                )
+            except DownloadError as e:
+                plan["warnings"].append(
+                    str(e).replace("\n", " ")
+                )
+
+        # ─── أرشيف جزئي محفوظ: الباقي بس هو اللي هيتحمل ───
+        plan["resume"] = 0
+        if commit and self.backend == "zip":
+            store = self._open_partial_store()
+            try:
+                plan["resume"] = os.path.getsize(
+                    store.path_for(owner, repo, commit)
+                )
+            except OSError:
+                pass
+        return plan
+
+    def _plan_release(self, owner, repo, tag):
+        release = self._get_release(owner, repo, tag)
+        assets = [
+            a for a in release.get("assets", [])
+            if a.get("state", "uploaded") == "uploaded"
+        ]
+        total = sum(a.get("size", 0) for a in assets)
+        store = self._open_partial_store()
+        resume = 0
+        for asset in assets:
+            try:
+                resume += os.path.getsize(store.path_for(
+                    owner, repo, f"asset-{asset['id']}", ".part"
+                ))
+            except OSError:
+                pass
+        return {
+            "release": release.get("tag_name") or tag,
+            "format": "assets", "source": "api",
+            "archive": total, "uncompressed": total,
+            "files": len(assets), "resume": resume,
+            "estimated": False, "warnings": [],
+        }
+
+    def _catalog_job(self, full_name, commit):
+        """آخر مهمة ناجحة لنفس الـ commit والـ backend (بأحجامها)"""
+        import sqlite3
+        try:
+            catalog = self._open_catalog()
+            if catalog is None:
+                return None
+            with catalog:
+                jobs = catalog.query(
+                    full_name, commit=commit, state="done"
+                )
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Catalog lookup failed: {e}")
+            return None
+        for job in jobs:
+            if (
+                job["backend"] == self.backend and job["release"]
+                is None and job["archive_size"] and job["bytes"]
+            ):
+                return job
+        return None
+
+    def _plan_disk(self, plan):
+        """
+        output: الحجم النهائي حسب الصيغة، peak: الأرشيف + الناتج
+        (الأرشيف بيتمسح بعد الفك / التجميع)، needed: الناقص منه.
+        """
+        archive = plan.get("archive") or 0
+        size = plan.get("uncompressed")
+        files = plan.get("files") or 0
+        fmt = plan["format"]
+        if size is None:
+            output = None
+        elif fmt in ("tree", "assets"):
+            output = size
+        elif fmt == "tar":
+            # header 512 + padding لحد 512 لكل ملف + نهاية الأرشيف
+            output = size + files * 1024 + 1024
+        else:
+            # gzip / zstd ≈ نسبة ضغط الـ ZIP (deflate)
+            output = archive or None
+        resume = plan.get("resume", 0)
+        plan["download"] = (
+            max(0, archive - resume) if plan.get("archive") else None
+        )
+        plan["output"] = output
+        if output is None:
+            plan["peak"] = plan["needed"] = None
+        elif fmt == "assets":
+            # ملفات الإصدار تتنقل من الـ partials مكانها
+            plan["peak"] = output
+            plan["needed"] = output - resume
+        else:
+            plan["peak"] = archive + output
+            plan["needed"] = archive + output - resume
+
+    def _plan_duration(self, plan):
+        """
+        الزمن من آخر المهام في الكتالوج: التحميل بالسرعة المقاسة
+        (وحد GH_BANDWIDTH_LIMIT لو أقل) + فك الضغط + باقي المراحل.
+        """
+        import sqlite3
+        speeds = None
+        try:
+            catalog = self._open_catalog()
+            if catalog is not None:
+                with catalog:
+                    speeds = catalog.throughput(self.backend)
+                    if speeds["download"] is None:
+                        speeds = catalog.throughput()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Catalog lookup failed: {e}")
+        speed = speeds and speeds["download"]
+        if speed and self._limiter.rate > 0:
+            speed = min(speed, self._limiter.rate)
+        plan["speed"] = speed or None
+        plan["duration"] = None
+        if plan["download"] == 0:
+            plan["duration"] = 0.0
+        elif speed and plan["download"]:
+            secs = plan["download"] / speed + speeds["overhead"]
+            if (
+                speeds["extract"] and plan["uncompressed"]
+                and plan["format"] != "assets"
+            ):
+                secs += plan["uncompressed"] / speeds["extract"]
+            plan["duration"] = secs
+
+    # ════════════════════════════════════════════════
+    # Remote Size
+    # ════════════════════════════════════════════════
+
+    @staticmethod
+    def _archive_url(owner, repo, commit, branch, ref=None):
+        """رابط أرشيف ZIP: commit مثبت، أو ref، أو الفرع"""
+        if commit:
+            return (
+                f"https://github.com/{owner}/{repo}"
+                f"/archive/{commit}.zip"
+            )
+        if ref:
+            # فرع أو tag أو SHA — GitHub يقبل الثلاثة هنا
+            return (
+                f"https://github.com/{owner}/{repo}"
+                f"/archive/{ref}.zip"
+            )
+        return (
+            f"https://github.com/{owner}/{repo}"
+            f"/archive/refs/heads/{branch}.zip"
+        )
+
+    def _preflight_zip(self, url, size):
+        """
+        قراءة الـ central directory عن بُعد (HTTP Range)
+        وتطبيق حدود الحجم والعدد قبل التحميل.
+        لو الخادم ما يدعمش Range: يتأجل الفحص لما بعد التحميل.
+        """
+        from remote_zip import RemoteZip, RangeNotSupported
+        try:
+            with RemoteZip(self.session, url, size) as rz:
+                info = rz.summary()
+                requests_used = rz.requests
+        except (
+            RangeNotSupported, zipfile.BadZipFile,
+            requests.RequestException
+        ) as e:
+            logger.info(f"Pre-flight skipped: {e}")
+            return None
+
+        self._log(
+            f"🛰️ pre-flight: {info['files']} ملف،"
+            f" {self._format_size(info['uncompressed'])}"
+            f" بعد الفك ({requests_used} طلب Range)",
+            "info"
+        )
+        self._check_zip_limits(
+            info["uncompressed"], info["files"]
+        )
+        return info
+
+    def _get_remote_size(self, url):
+        """الحصول على حجم الملف من الخادم"""
+        try:
+            resp = self.session.head(
+                url, allow_redirects=True, timeout=15
+            )
+            return int(
+                resp.headers.get("content-length", 0)
+            )
+        except (
+            requests.RequestException, ValueError
+        ):
+            return 0
+
+    # ════════════════════════════════════════════════
+    # Persistent Partials
+    # ════════════════════════════════════════════════
+
+    def _open_partial_store(self):
+        from partial_store import PartialStore
+        return PartialStore(
+            self.partial_dir or os.path.join(
+                self._get_data_dir(), "partials"
+            )
+        )
+
+    def _open_partial(
+        self, owner, repo, commit, branch, url, expected
+    ):
+        """
+        تجهيز مسار ثابت للأرشيف (owner/repo/commit)
+        بدل mkstemp عشوائي، عشان الاستكمال يعيش بعد crash.
+        يرجع (path, PartialMeta) — أو (path, None) لملف مؤقت عادي.
+        """
+        store = self._open_partial_store()
+        path, meta = self._acquire_partial(
+            store, owner, repo, commit or branch,
+            url, expected, pinned=bool(commit)
+        )
+
+        with self._download_lock:
+            self.temp_zip_path = path
+            if meta is not None:
+                self._partial = (store, path)
+        return path, meta
+
+    def _acquire_partial(
+        self, store, owner, repo, key, url, expected,
+        pinned=True, suffix=".zip"
+    ):
+        """
+        قفل وتجهيز ملف جزئي في المخزن.
+        pinned: المحتوى ثابت للمفتاح (commit / asset id)
+        يرجع (path, PartialMeta) — أو (مسار مؤقت, None)
+        لو عملية أخرى ماسكة نفس الملف.
+        """
+        path = store.path_for(owner, repo, key, suffix)
+
+        removed, freed = store.gc(keep=[path])
+        if removed:
+            logger.info(
+                f"Partial gc: {removed} files,"
+                f" {self._format_size(freed)}"
+            )
+
+        if not store.acquire(path):
+            # عملية أخرى تحمّل نفس الأرشيف الآن
+            fd, tmp_path = tempfile.mkstemp(
+                suffix=suffix, prefix=f"gh_{repo}_",
+                dir=store.root
+            )
+            os.close(fd)
+            return tmp_path, None
+
+        meta = store.load_meta(path)
+        if os.path.exists(path):
+            # محتوى غير مثبت بدون validator → لا يمكن ضمان نفس المحتوى
+            if meta.url != url or (
+                not pinned and not meta.validator
+            ):
+                store.discard(path)
+                meta = store.load_meta(path)
+            else:
+                self._log(
+                    f"♻️ تحميل جزئي سابق:"
+                    f" {self._format_size(os.path.getsize(path))}",
+                    "info"
+                )
+
+        meta.url = url
+        meta.commit = key if pinned else ""
+        meta.expected = expected
+        meta.save()
+        return path, meta
+
+    # ════════════════════════════════════════════════
+    # Download with Resume + Retry
+    # ════════════════════════════════════════════════
+
+    def _download_zip(
+        self, url, dest, expected, meta=None, on_progress=None,
+        headers=None
+    ):
+        """
+        تحميل مع دعم الاستكمال وإعادة المحاولة.
+        meta (PartialMeta): ETag للتحقق بـ If-Range عند الاستكمال.
+        on_progress(downloaded): بدل تحديث الواجهة مباشرة
+          (تجميع تقدم عدة تحميلات متوازية).
+        headers: headers إضافية (None = حذف header الـ session).
+        يرجع (actual_size, sha256_hex).
         يرمي DownloadError أو CancelledError.
         """
         retry = 0
@@ -794,15 +2496,34 @@ class GitHubDownloader:
             if existing > 0:
                 downloaded = existing
                 sha256 = self._hash_file(dest)
+                # اكتمل قبل الانقطاع → لا حاجة لأي طلب
+                if expected > 0 and existing == expected:
+                    return existing, sha256.hexdigest()
 
+        stalls = 0
         while retry <= self.MAX_RETRIES:
             try:
                 return self._download_attempt(
                     url, dest, expected,
-                    downloaded, sha256
+                    downloaded, sha256, meta, on_progress, headers
                 )
             except CancelledError:
                 raise
+            except StallError as e:
+                self._check_cancelled()
+                stalls += 1
+                if stalls > self.MAX_STALL_RECONNECTS:
+                    raise DownloadError(
+                        f"الاتصال بطيء جداً باستمرار!\n{e}"
+                    )
+                self._log(
+                    f"🐢 {e} — إعادة الاتصال"
+                    f" ({stalls}/{self.MAX_STALL_RECONNECTS})",
+                    "warning"
+                )
+                # استكمال فوري من آخر offset بدون backoff
+                downloaded = os.path.getsize(dest)
+                sha256 = self._hash_file(dest)
             except (
                 requests.exceptions.ConnectionError,
                 requests.exceptions.Timeout,
@@ -810,6 +2531,7 @@ class GitHubDownloader:
                 .ChunkedEncodingError,
                 IOError
             ) as e:
+                self._check_cancelled()  # الاتصال اتقطع بسبب الإلغاء
                 retry += 1
                 if retry > self.MAX_RETRIES:
                     raise DownloadError(
@@ -828,9 +2550,9 @@ class GitHubDownloader:
                     "warning"
                 )
 
-                for _ in range(wait):
+                # الإلغاء يصحّي الانتظار فوراً
+                if self._cancel_event.wait(wait):
                     self._check_cancelled()
-                    time.sleep(1)
 
                 if os.path.exists(dest):
                     downloaded = os.path.getsize(dest)
@@ -843,17 +2565,19 @@ class GitHubDownloader:
 
     def _download_attempt(
         self, url, dest, expected,
-        downloaded, sha256
+        downloaded, sha256, meta=None, on_progress=None,
+        extra_headers=None
     ):
         """محاولة تحميل واحدة مع أو بدون استكمال"""
-        headers = {}
+        headers = dict(extra_headers or {})
         mode = "wb"
-        start_offset = 0
 
         if downloaded > 0:
             headers["Range"] = f"bytes={downloaded}-"
+            # لو المحتوى اتغير الخادم يرجع 200 بالملف كامل
+            if meta is not None and meta.validator:
+                headers["If-Range"] = meta.validator
             mode = "ab"
-            start_offset = downloaded
             self._log(
                 f"🔄 استكمال من:"
                 f" {self._format_size(downloaded)}",
@@ -868,39 +2592,99 @@ class GitHubDownloader:
         # ─── الخادم ما يدعمش الاستكمال ───
         if resp.status_code == 200 and downloaded > 0:
             self._log(
+                "⚠️ الأرشيف تغيّر على الخادم،"
+                " إعادة من الصفر"
+                if "If-Range" in headers else
                 "⚠️ الخادم لا يدعم الاستكمال،"
                 " إعادة من الصفر",
                 "warning"
             )
             downloaded = 0
-            start_offset = 0
             sha256 = hashlib.sha256()
             mode = "wb"
         elif resp.status_code == 206:
             pass  # استكمال ناجح
         elif resp.status_code == 200:
             pass  # تحميل جديد
+        elif resp.status_code == 416 and downloaded > 0:
+            # الملف الجزئي كامل أصلاً أو أكبر من الأصل
+            resp.close()
+            total = resp.headers.get(
+                "Content-Range", ""
+            ).rpartition("/")[2]
+            if total.isdigit() and int(total) == downloaded:
+                return downloaded, sha256.hexdigest()
+            os.remove(dest)
+            raise IOError("Range not satisfiable")
         else:
             raise DownloadError(
                 f"خطأ HTTP {resp.status_code}"
             )
 
-        start_time = time.time()
-        last_ui_update = start_time
+        if mode == "wb" and meta is not None:
+            meta.etag = resp.headers.get("ETag", "")
+            meta.last_modified = resp.headers.get(
+                "Last-Modified", ""
+            )
+            meta.save()
 
-        with open(dest, mode) as f:
-            for chunk in resp.iter_content(
-                chunk_size=self.CHUNK_SIZE
-            ):
+        from throughput import ThroughputMeter, StallWatchdog
+        from http_abort import abort_response
+
+        meter = ThroughputMeter()
+        last_ui_update = time.time()
+
+        def on_stall(rate):
+            logger.info(f"Stall detected: {rate:.0f} B/s")
+            abort_response(resp)
+
+        chunks = self._iter_body(resp, meter)
+        watchdog = StallWatchdog(
+            meter, self.stall_rate, self.stall_seconds, on_stall
+        )
+        from pipeline import DownloadPipeline
+
+        with resp, watchdog, open(dest, mode) as f, DownloadPipeline(
+            f, sha256, self.pipeline_depth,
+            check=self._check_cancelled,
+            discard_on=(CancelledError,)
+        ) as pipe:
+            while True:
+                meter.begin_wait()
+                try:
+                    chunk = next(chunks, None)
+                except (
+                    requests.exceptions.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError,
+                    IOError
+                ):
+                    self._check_cancelled()
+                    if watchdog.stalled:
+                        raise StallError(self._stall_message())
+                    raise
+                if chunk is None:
+                    break
                 self._check_cancelled()
 
                 if not chunk:
                     continue
+                meter.add(len(chunk))
 
-                f.write(chunk)
-                sha256.update(chunk)
+                # ─── حد السرعة + توزيع عادل بين المهام ───
+                if not self._limiter.acquire(
+                    self._flow, len(chunk),
+                    self._cancel_event
+                ):
+                    self._check_cancelled()
+
+                # كتابة + hash على threads منفصلة (ضغط عكسي لو امتلأت)
+                pipe.put(chunk)
                 downloaded += len(chunk)
 
+                if on_progress is not None:
+                    on_progress(downloaded)
+                    continue
+
                 now = time.time()
                 if (
                     now - last_ui_update
@@ -908,39 +2692,89 @@ class GitHubDownloader:
                 ):
                     last_ui_update = now
                     self._update_download_ui(
-                        downloaded, expected,
-                        start_time, now,
-                        start_offset
+                        downloaded, expected, meter.rate()
                     )
 
+        # ─── كل الأجزاء اتكتبت واتحسبت (الـ with ينتظر المراحل) ───
+        times = pipe.stats()
+        if times["blocked"] >= 1:
+            logger.info(
+                "Pipeline: "
+                + ", ".join(f"{k} {v:.1f}s" for k, v in times.items())
+            )
+
+        # الـ socket المقطوع قد ينهي الـ body بدون استثناء
+        self._check_cancelled()
+        if watchdog.stalled:
+            raise StallError(self._stall_message())
         return downloaded, sha256.hexdigest()
 
-    def _hash_file(self, path):
+    def _iter_body(self, resp, meter=None):
         """
-        حساب SHA256 لملف موجود.
-        يرجع كائن hashlib.sha256 قابل للتحديث
-        لاستكمال الحساب عند إضافة بيانات جديدة.
+        أجزاء الـ body فور وصولها (read1) بدل انتظار
+        CHUNK_SIZE كامل — عشان الـ meter يشوف الاتصال البطيء
+        كما هو (2 KB/s مش "صفر لمدة 32 ثانية").
+        حد القراءة يكبر مع السرعة (أجزاء أقل على الروابط
+        السريعة). أخطاء urllib3 تتحول لنفس استثناءات requests.
+        القراءة من resp.raw مباشرة، والـ response يتقفل في الآخر
+        (الاتصال يرجع للـ pool بعد body كامل).
+        bytes لكل جزء مقصودة: readinto في urllib3 = read(n) ثم
+        نسخ في الـ buffer (نفس التخصيص + نسخة زيادة)، وبتستنى
+        n كامل بدل المتاح. الـ buffers المُعادة في فك الضغط
+        والـ hashing (accel.copy_stream)، مش هنا.
         """
-        sha256 = hashlib.sha256()
-        with open(path, "rb") as f:
+        raw = resp.raw
+        if not hasattr(raw, "read1"):  # urllib3 < 2
+            yield from resp.iter_content(self.CHUNK_SIZE)
+            return
+        from urllib3.exceptions import (
+            ProtocolError, ReadTimeoutError, DecodeError
+        )
+        import accel
+        amt = self.CHUNK_SIZE
+        resize_at = time.monotonic() + 0.25
+        try:
             while True:
-                chunk = f.read(self.CHUNK_SIZE)
+                chunk = raw.read1(amt, decode_content=True)
                 if not chunk:
                     break
-                sha256.update(chunk)
-        return sha256
+                yield chunk
+                if meter is not None and time.monotonic() >= resize_at:
+                    resize_at = time.monotonic() + 0.25
+                    amt = accel.buffer_size(rate=meter.rate())
+        except ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e)
+        except ReadTimeoutError as e:
+            raise requests.exceptions.ConnectionError(e)
+        except DecodeError as e:
+            raise requests.exceptions.ContentDecodingError(e)
+        finally:
+            resp.close()
 
-    def _update_download_ui(
-        self, downloaded, expected,
-        start_time, now, offset
-    ):
-        """تحديث واجهة التحميل"""
-        elapsed = now - start_time
-        new_bytes = downloaded - offset
-        speed = (
-            new_bytes / elapsed if elapsed > 0 else 0
+    def _stall_message(self):
+        return (
+            f"السرعة أقل من"
+            f" {self._format_size(self.stall_rate)}/s"
+            f" لمدة {self.stall_seconds:g}s"
         )
 
+    def _hash_file(self, path):
+        """
+        حساب SHA256 لملف موجود.
+        يرجع كائن hashlib.sha256 قابل للتحديث
+        لاستكمال الحساب عند إضافة بيانات جديدة.
+        """
+        import accel
+        return accel.hash_file(path)
+
+    def _update_download_ui(self, downloaded, expected, speed):
+        """
+        تحديث واجهة التحميل.
+        speed: من ThroughputMeter (نافذة منزلقة) فالـ ETA
+        يتبع السرعة الحالية مش متوسط التحميل كله.
+        """
+        self._emit("transfer", downloaded, expected, speed)
+
         if expected > 0:
             pct = (downloaded / expected) * 100
             remaining = expected - downloaded
@@ -987,45 +2821,46 @@ class GitHubDownloader:
                 "الملف المحمل ليس ZIP صالح!"
             )
 
+        import accel
+        from zip_index import ZipIndex
         try:
-            with zipfile.ZipFile(path, 'r') as zf:
-                bad = zf.testzip()
+            with ZipIndex(path) as zf:
+                # الحدود أولاً: من الفهرس بدون فك أي شيء
+                self._check_zip_limits(
+                    zf.total_size(), zf.file_count()
+                )
+                bad = accel.testzip(zf)
                 if bad:
                     raise DownloadError(
                         f"ZIP تالف! ملف معطوب: {bad}"
                     )
 
-                total_uncompressed = sum(
-                    info.file_size
-                    for info in zf.infolist()
-                )
-                if (
-                    total_uncompressed
-                    > self.MAX_EXTRACT_SIZE
-                ):
-                    raise DownloadError(
-                        f"ZIP كبير جداً!\n"
-                        f"الحجم بعد الفك:"
-                        f" {self._format_size(total_uncompressed)}\n"
-                        f"الحد الأقصى:"
-                        f" {self._format_size(self.MAX_EXTRACT_SIZE)}"
-                    )
-
-                file_count = len([
-                    i for i in zf.infolist()
-                    if not i.is_dir()
-                ])
-                if file_count > self.MAX_FILE_COUNT:
-                    raise DownloadError(
-                        f"عدد ملفات كبير جداً!"
-                        f" {file_count:,} ملف\n"
-                        f"الحد الأقصى:"
-                        f" {self.MAX_FILE_COUNT:,}"
-                    )
-
         except zipfile.BadZipFile:
             raise DownloadError("ZIP تالف!")
 
+    def _check_zip_limits(self, total_uncompressed, file_count):
+        """حماية ZIP bomb: الحجم بعد الفك وعدد الملفات"""
+        if (
+            self.max_extract_size
+            and total_uncompressed > self.max_extract_size
+        ):
+            raise DownloadError(
+                f"ZIP كبير جداً!\n"
+                f"الحجم بعد الفك:"
+                f" {self._format_size(total_uncompressed)}\n"
+                f"الحد الأقصى:"
+                f" {self._format_size(self.max_extract_size)}"
+                f" (GH_MAX_EXTRACT_SIZE / --max-extract)"
+            )
+        if self.max_file_count and file_count > self.max_file_count:
+            raise DownloadError(
+                f"عدد ملفات كبير جداً!"
+                f" {file_count:,} ملف\n"
+                f"الحد الأقصى:"
+                f" {self.max_file_count:,}"
+                f" (GH_MAX_FILES / --max-files)"
+            )
+
     # ════════════════════════════════════════════════
     # Extract
     # ════════════════════════════════════════════════
@@ -1053,53 +2888,76 @@ class GitHubDownloader:
           "repo-main"         (مستوى واحد)
           "repo-main/subdir"  (مستويات متعددة)
         """
-        if not names:
-            return ""
-
-        parts_list = []
+        # names: أي iterable (generator من الفهرس) —
+        # البادئة تُقصّ تدريجياً بدون الاحتفاظ بالأسماء
+        common = None
         for name in names:
             name = name.replace("\\", "/").strip("/")
             if not name:
                 continue
-            parts_list.append(name.split("/"))
-
-        if not parts_list:
-            return ""
-
-        common = []
-        for level_parts in zip(*parts_list):
-            if all(
-                p == level_parts[0]
-                for p in level_parts
-            ):
-                common.append(level_parts[0])
-            else:
+            parts = name.split("/")
+            if common is None:
+                common = parts
+                continue
+            i = 0
+            limit = min(len(common), len(parts))
+            while i < limit and common[i] == parts[i]:
+                i += 1
+            del common[i:]
+            if not common:
                 break
 
         # ✅ إرجاع المسار الكامل المشترك
         return "/".join(common) if common else ""
 
-    def _extract_zip(self, zip_path, dest):
+    def _extract_zip(self, zip_path, dest, journal=None):
         """
         فك ضغط ZIP مع حماية أمنية.
+        journal (ExtractJournal): تخطي الأعضاء المكتملة من
+        تشغيل سابق وتسجيل كل عضو يكتمل.
         يرمي DownloadError أو CancelledError.
         """
+        import accel
+        from zip_index import ZipIndex
+        self._log(
+            f"⚙️ inflate: {accel.inflate_backend()[0]}"
+            f" | sha256: {accel.hash_backend()}",
+            "info"
+        )
+
+        store = self._open_dedup_store()
+        dedup_stats = {}
+        saved = 0
+        resumed = 0
+        indexer = self._open_search_builder()
+        # ─── SHA256 للـ manifest على القرص (الشجرة المتداخلة بدون manifest) ───
+        self._drop_digests()
+        if not self._nested:
+            import manifest
+            self._digests = manifest.DigestSpill()
+        digests = self._digests
+        if self.lfs:
+            import lfs
+            lfs_sizes = range(lfs.POINTER_MIN, lfs.POINTER_MAX)
+        else:
+            lfs_sizes = ()
+
         try:
             os.makedirs(dest, exist_ok=True)
+            if journal is not None and journal.open():
+                self._log(
+                    f"♻️ استكمال فك الضغط:"
+                    f" {len(journal.entries)} عنصر مكتمل",
+                    "info"
+                )
 
-            with zipfile.ZipFile(zip_path, 'r') as zf:
-                members = zf.infolist()
-                if not members:
+            with ZipIndex(zip_path) as zf:
+                total = len(zf)
+                if not total:
                     raise DownloadError("ZIP فارغ!")
 
-                total = len(members)
-                names = [m.filename for m in members]
                 root_folder = self._detect_root_folder(
-                    names
-                )
-                prefix = (
-                    root_folder + "/"
-                    if root_folder else ""
+                    zf.names()
                 )
 
                 if root_folder:
@@ -1113,116 +2971,568 @@ class GitHubDownloader:
                 ui_step = max(1, total // 100)
                 skipped = 0
 
-                for i, member in enumerate(members):
+                for i, member in enumerate(zf.infolist()):
                     self._check_cancelled()
 
-                    # ─── المسار النسبي ───
+                    # ─── المسار النسبي + الحماية ───
                     filename = member.filename
-                    if (
-                        prefix
-                        and filename.startswith(prefix)
-                    ):
-                        rel_path = filename[len(prefix):]
-                    elif (
-                        filename.rstrip("/")
-                        == root_folder
-                    ):
-                        continue
-                    else:
-                        rel_path = filename
-
-                    if not rel_path or rel_path == "/":
+                    rel_path = self._member_path(
+                        member, root_folder, dest
+                    )
+                    if not rel_path:
+                        skipped += rel_path is False
                         continue
-
                     target = os.path.join(
                         dest, rel_path
                     )
 
-                    # ─── حماية path traversal ───
-                    if not self._is_safe_path(
-                        dest, target
+                    # ─── فك الضغط ───
+                    if journal is not None and journal.is_done(
+                        filename, member.file_size,
+                        member.CRC, target
                     ):
-                        self._log(
-                            f"⚠️ تخطي"
-                            f" (path traversal):"
-                            f" {rel_path}",
-                            "warning"
+                        resumed += 1  # اكتمل في تشغيل سابق
+                        if store is not None and not member.is_dir():
+                            self._resume_ref(
+                                store, member, target, dest,
+                                rel_path, digests
+                            )
+                        if indexer is not None and not member.is_dir():
+                            indexer.add_file(
+                                rel_path, target, member.CRC
+                            )
+                    elif member.is_dir():
+                        os.makedirs(
+                            target, exist_ok=True
                         )
-                        skipped += 1
-                        continue
+                    else:
+                        parent = os.path.dirname(
+                            target
+                        )
+                        if parent:
+                            os.makedirs(
+                                parent, exist_ok=True
+                            )
 
-                    # ─── حماية symlink ───
-                    unix_attrs = (
-                        member.external_attr >> 16
-                    )
+                        # ─── trigrams من نفس الأجزاء المفكوكة ───
+                        feeder = (
+                            indexer.add(
+                                rel_path, member.file_size,
+                                member.CRC
+                            )
+                            if indexer is not None else None
+                        )
+
+                        if store is not None:
+                            how, digest = self._extract_member_dedup(
+                                store, zf, member,
+                                target, dest, rel_path, feeder
+                            )
+                            dedup_stats[how] = (
+                                dedup_stats.get(how, 0) + 1
+                            )
+                            if how != "new":
+                                saved += member.file_size
+                        else:
+                            digest = self._copy_member(
+                                zf, member, target, feeder
+                            )
+                        if feeder is not None:
+                            feeder.close()
+                        # ─── SHA256 للـ manifest (بدون قراءة ثانية) ───
+                        if digests is not None:
+                            st = os.stat(target)
+                            digests.add(
+                                rel_path, st.st_size,
+                                st.st_mtime_ns, digest
+                            )
+
+                    # ─── LFS pointer؟ (ملف صغير، لسه في الـ cache) ───
+                    if member.file_size in lfs_sizes:
+                        pointer = lfs.read_pointer(target)
+                        if pointer is not None:
+                            self._lfs_pointers[rel_path] = pointer
+
+                    if journal is not None and (
+                        filename not in journal.entries
+                    ):
+                        journal.record(
+                            filename, member.file_size,
+                            member.CRC,
+                            None if member.is_dir() else target
+                        )
+
+                    # ─── تحديث التقدم ───
                     if (
-                        unix_attrs
-                        and stat.S_ISLNK(unix_attrs)
+                        i % ui_step == 0
+                        or i == total - 1
                     ):
-                        self._log(
-                            f"⚠️ تخطي (symlink):"
-                            f" {rel_path}",
-                            "warning"
+                        pct = (
+                            (i + 1) / total
+                        ) * 100
+                        self._set_progress(pct)
+                        self._set_status(
+                            f"📂 فك الضغط"
+                            f" {pct:.0f}%"
+                            f" ({i + 1}/{total})",
+                            "#f9e2af"
                         )
-                        skipped += 1
+
+                if skipped > 0:
+                    self._log(
+                        f"⚠️ تم تخطي {skipped}"
+                        f" عنصر غير آمن",
+                        "warning"
+                    )
+                if resumed > 0:
+                    self._log(
+                        f"♻️ تم تخطي {resumed}"
+                        f" عنصر مكتمل سابقاً",
+                        "info"
+                    )
+
+                if store is not None:
+                    store.flush()
+                    reused = sum(
+                        n for how, n in dedup_stats.items()
+                        if how != "new"
+                    )
+                    self._log(
+                        f"♻️ Dedup: {reused} ملف مكرر"
+                        f" (وفّر {self._format_size(saved)})"
+                        f" | جديد: {dedup_stats.get('new', 0)}",
+                        "info"
+                    )
+
+            if journal is not None:
+                journal.remove()
+            # يُكتب بعد التحقق (الملف نفسه مش من المستودع)
+            self._search_builder, indexer = indexer, None
+
+        except CancelledError:
+            # مع السجل: الإبقاء على ما اكتمل للاستكمال
+            if journal is not None:
+                journal.close()
+            else:
+                self._discard_tree(store, dest)
+            raise
+        except DownloadError:
+            self._discard_tree(store, dest, journal)
+            raise
+        except OSError as e:
+            # قرص ممتلئ / صلاحيات: يمكن الاستكمال بعد الإصلاح
+            if journal is not None:
+                journal.close()
+            else:
+                self._discard_tree(store, dest)
+            raise DownloadError(
+                f"فشل فك الضغط: {e}"
+            )
+        except Exception as e:
+            self._discard_tree(store, dest, journal)
+            raise DownloadError(
+                f"فشل فك الضغط: {e}"
+            )
+        finally:
+            if store is not None:
+                store.close()
+            if indexer is not None:
+                indexer.close()
+
+    # ─── Repack ───
+
+    ARTIFACT_FORMATS = {
+        "tar": ".tar",
+        "tar.gz": ".tar.gz",
+        "tar.zst": ".tar.zst",
+    }
+
+    def _member_path(self, member, root_folder, base):
+        """
+        المسار النسبي لعضو ZIP بعد حذف المجلد الجذري — فلتر
+        واحد لفك الضغط وتجميع tar. None: الجذر نفسه (تجاهل)،
+        False: مرفوض (path traversal / symlink) بعد تحذير.
+        """
+        filename = member.filename
+        prefix = root_folder + "/" if root_folder else ""
+        if prefix and filename.startswith(prefix):
+            rel_path = filename[len(prefix):]
+        elif root_folder and filename.rstrip("/") == root_folder:
+            return None
+        else:
+            rel_path = filename
+        rel_path = rel_path.rstrip("/")
+        if not rel_path:
+            return None
+
+        # ─── حماية path traversal ───
+        if rel_path.startswith("/") or not self._is_safe_path(
+            base, os.path.join(base, rel_path)
+        ):
+            self._log(
+                f"⚠️ تخطي (path traversal): {rel_path}", "warning"
+            )
+            return False
+
+        # ─── حماية symlink ───
+        unix_attrs = member.external_attr >> 16
+        if unix_attrs and stat.S_ISLNK(unix_attrs):
+            self._log(f"⚠️ تخطي (symlink): {rel_path}", "warning")
+            return False
+        return rel_path
+
+    def _repack_zip(self, zip_path, save, repo):
+        """
+        بث أعضاء الـ ZIP مباشرة إلى ملف tar واحد
+        (اختيارياً gzip أو zstd) بدون كتابة أي ملف منفرد.
+        نفس الحماية: حذف المجلد الجذري، path traversal، symlinks.
+        يرجع (artifact_path, {rel_path: size}).
+        """
+        import tarfile
+        import accel
+        from zip_index import ZipIndex
+
+        ext = self.ARTIFACT_FORMATS.get(self.output_format)
+        if ext is None:
+            raise DownloadError(
+                f"صيغة غير معروفة: {self.output_format}"
+            )
+        name = repo
+        counter = 0
+        while os.path.exists(os.path.join(save, name + ext)):
+            counter += 1
+            name = f"{repo}_{counter}"
+        artifact = os.path.join(save, name + ext)
+        part = artifact + ".part"
+        base = os.path.join(save, name)  # للتحقق من المسارات فقط
+
+        self._set_status(
+            f"📦 تجميع {name}{ext}...", "#f9e2af"
+        )
+        self._set_speed("")
+        self._set_progress(0)
+
+        local_files = {}
+        skipped = 0
+        sha256 = hashlib.sha256()
+        self._artifact_info = None
+
+        class _HashingWriter:
+            def __init__(self, f):
+                self.f = f
+
+            def write(self, data):
+                sha256.update(data)
+                return self.f.write(data)
+
+            def flush(self):
+                self.f.flush()
+
+        check = self._check_cancelled
+
+        class _CheckedReader:
+            """الإلغاء بين أجزاء العضو الواحد داخل tar.addfile"""
+            def __init__(self, f):
+                self.f = f
+
+            def read(self, n=-1):
+                check()
+                return self.f.read(n)
+
+        try:
+            with (
+                ZipIndex(zip_path) as zf,
+                open(part, "wb") as raw,
+                self._open_artifact_stream(
+                    _HashingWriter(raw)
+                ) as (stream, mode),
+                tarfile.open(
+                    fileobj=stream, mode=mode,
+                    format=tarfile.PAX_FORMAT
+                ) as tar
+            ):
+                root_folder = self._detect_root_folder(zf.names())
+                total = len(zf)
+                ui_step = max(1, total // 100)
+
+                for i, member in enumerate(zf.infolist()):
+                    self._check_cancelled()
+                    rel_path = self._member_path(
+                        member, root_folder, base
+                    )
+                    if not rel_path:
+                        skipped += rel_path is False
                         continue
+                    unix_attrs = member.external_attr >> 16
 
-                    # ─── فك الضغط ───
+                    info = tarfile.TarInfo(rel_path)
+                    info.mtime = time.mktime(
+                        member.date_time + (0, 0, -1)
+                    )
                     if member.is_dir():
-                        os.makedirs(
-                            target, exist_ok=True
-                        )
+                        info.type = tarfile.DIRTYPE
+                        info.mode = 0o755
+                        tar.addfile(info)
                     else:
-                        parent = os.path.dirname(
-                            target
+                        info.size = member.file_size
+                        info.mode = (
+                            0o755 if unix_attrs & 0o111
+                            else 0o644
                         )
-                        if parent:
-                            os.makedirs(
-                                parent, exist_ok=True
-                            )
-
-                        with (
-                            zf.open(member) as src,
-                            open(target, "wb") as dst
-                        ):
-                            while True:
-                                chunk = src.read(
-                                    self.CHUNK_SIZE
+                        with accel.open_member(zf, member) as src:
+                            tar.addfile(info, _CheckedReader(src))
+                            # يكمّل القراءة للتحقق من CRC
+                            if src.read(1):
+                                raise zipfile.BadZipFile(
+                                    f"Bad size: {member.filename}"
                                 )
-                                if not chunk:
-                                    break
-                                dst.write(chunk)
+                        local_files[rel_path] = member.file_size
 
-                    # ─── تحديث التقدم ───
-                    if (
-                        i % ui_step == 0
-                        or i == total - 1
-                    ):
-                        pct = (
-                            (i + 1) / total
-                        ) * 100
+                    if i % ui_step == 0 or i == total - 1:
+                        pct = (i + 1) / total * 100
                         self._set_progress(pct)
                         self._set_status(
-                            f"📂 فك الضغط"
-                            f" {pct:.0f}%"
+                            f"📦 تجميع {pct:.0f}%"
                             f" ({i + 1}/{total})",
                             "#f9e2af"
                         )
 
-                if skipped > 0:
-                    self._log(
-                        f"⚠️ تم تخطي {skipped}"
-                        f" عنصر غير آمن",
-                        "warning"
-                    )
-
-        except (CancelledError, DownloadError):
-            shutil.rmtree(dest, ignore_errors=True)
+            os.replace(part, artifact)
+        except CancelledError:
+            self._remove_quietly(part)
+            raise
+        except DownloadError:
+            self._remove_quietly(part)
             raise
         except Exception as e:
-            shutil.rmtree(dest, ignore_errors=True)
-            raise DownloadError(
-                f"فشل فك الضغط: {e}"
+            self._remove_quietly(part)
+            raise DownloadError(f"فشل التجميع: {e}")
+
+        if skipped:
+            self._log(
+                f"⚠️ تم تخطي {skipped} عنصر غير آمن",
+                "warning"
+            )
+        self._artifact_info = {
+            "format": self.output_format,
+            "size": os.path.getsize(artifact),
+            "sha256": sha256.hexdigest(),
+        }
+        self._log(
+            f"📦 {os.path.basename(artifact)}:"
+            f" {len(local_files)} ملف"
+            f" ({self._format_size(self._artifact_info['size'])})",
+            "success"
+        )
+        return artifact, local_files
+
+    def _open_artifact_stream(self, raw):
+        """
+        context manager يرجع (fileobj, tar_mode) حسب الصيغة.
+        zstd: compression.zstd (3.14+) أو مكتبة zstandard.
+        """
+        import contextlib
+
+        @contextlib.contextmanager
+        def plain(mode):
+            yield raw, mode
+
+        if self.output_format == "tar":
+            return plain("w|")
+        if self.output_format == "tar.gz":
+            return plain("w|gz")
+
+        @contextlib.contextmanager
+        def zstd():
+            try:
+                from compression import zstd as zstd_std
+            except ImportError:
+                zstd_std = None
+            if zstd_std is not None:
+                with zstd_std.ZstdFile(raw, "w") as zf:
+                    yield zf, "w|"
+                return
+            try:
+                import zstandard
+            except ImportError:
+                raise DownloadError(
+                    "صيغة tar.zst تتطلب: pip install zstandard"
+                )
+            cctx = zstandard.ZstdCompressor(level=3, threads=-1)
+            with cctx.stream_writer(raw, closefd=False) as zw:
+                yield zw, "w|"
+
+        return zstd()
+
+    @staticmethod
+    def _remove_quietly(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _discard_tree(self, store, dest, journal=None):
+        """حذف شجرة فشل فك ضغطها مع مراجعها وسجلها"""
+        self._release_dedup_tree(store, dest)
+        shutil.rmtree(dest, ignore_errors=True)
+        if journal is not None:
+            journal.remove()
+
+    def _copy_member(self, zf, member, target, feeder=None):
+        """
+        كتابة عضو ZIP مباشرة إلى المسار الهدف.
+        feeder: فهرس البحث يشوف نفس الأجزاء (بدون قراءة ثانية).
+        يرجع SHA256 (hex) للـ manifest من نفس الأجزاء.
+        """
+        import accel
+        sha256 = hashlib.sha256()
+        if feeder is None:
+            on_chunk = sha256.update
+        else:
+            def on_chunk(chunk):
+                sha256.update(chunk)
+                feeder.feed(chunk)
+        with (
+            accel.open_member(zf, member) as src,
+            open(target, "wb") as dst
+        ):
+            # readinto في buffer مُعاد الاستخدام، والإلغاء
+            # يُفحص حتى داخل عضو ضخم
+            accel.copy_stream(
+                src, dst, member.file_size, self._check_cancelled,
+                on_chunk
+            )
+        return sha256.hexdigest()
+
+    # ════════════════════════════════════════════════
+    # Dedup Store
+    # ════════════════════════════════════════════════
+
+    def _open_dedup_store(self):
+        """فتح مخزن إزالة التكرار لو مفعّل (GH_DEDUP_STORE)"""
+        if not self.dedup_store_path:
+            return None
+        from dedup_store import DedupStore
+        try:
+            return DedupStore(
+                self.dedup_store_path, self.dedup_mode
+            )
+        except (OSError, ValueError) as e:
+            self._log(
+                f"⚠️ Dedup store غير متاح: {e}",
+                "warning"
+            )
+            return None
+
+    def _move_dedup_tree(self, old, new):
+        """مراجع شجرة اتنقلت بعد فك الضغط (وإلا gc يمسحها)"""
+        store = self._open_dedup_store()
+        if store is None:
+            return
+        try:
+            store.move_tree(old, new)
+        except Exception as e:
+            logger.warning(f"Dedup move failed: {e}")
+        finally:
+            store.close()
+
+    @staticmethod
+    def _release_dedup_tree(store, dest):
+        """إزالة مراجع شجرة فشل فك ضغطها"""
+        if store is None:
+            return
+        try:
+            store.release_tree(dest)
+        except Exception as e:
+            logger.warning(f"Dedup release failed: {e}")
+
+    def _extract_member_dedup(
+        self, store, zf, member, target, dest, rel_path,
+        feeder=None
+    ):
+        """
+        فك عضو عبر مخزن المحتوى.
+        - لو فيه مرشح بنفس الحجم و CRC: قراءة وحساب
+          SHA256 فقط (بدون كتابة) ثم ربط
+        - غير كده: كتابة مرة واحدة في المخزن ثم ربط
+        feeder: فهرس البحث (يتغذى من نفس القراءة)
+        يرجع (reflink / hardlink / copy / new, sha256)
+        """
+        import accel
+
+        def hashing(sha256):
+            if feeder is None:
+                return sha256.update
+            feeder.reset()  # قراءة ثانية لنفس العضو تبدأ من الأول
+
+            def both(chunk):
+                sha256.update(chunk)
+                feeder.feed(chunk)
+            return both
+
+        candidates = store.lookup(
+            member.file_size, member.CRC
+        )
+        if candidates:
+            sha256 = hashlib.sha256()
+            with accel.open_member(zf, member) as src:
+                accel.copy_stream(
+                    src, None, member.file_size,
+                    self._check_cancelled, hashing(sha256)
+                )
+            digest = sha256.hexdigest()
+            if digest in candidates:
+                try:
+                    how = store.link(digest, target)
+                    store.add_ref(dest, rel_path, digest)
+                    return how, digest
+                except FileNotFoundError:
+                    pass  # حذفه gc في نفس اللحظة
+
+        tmp = store.new_temp()
+        sha256 = hashlib.sha256()
+        try:
+            with (
+                accel.open_member(zf, member) as src,
+                open(tmp, "wb") as dst
+            ):
+                accel.copy_stream(
+                    src, dst, member.file_size,
+                    self._check_cancelled, hashing(sha256)
+                )
+            digest = sha256.hexdigest()
+            store.commit(
+                tmp, digest, member.file_size, member.CRC
+            )
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        store.link(digest, target)
+        store.add_ref(dest, rel_path, digest)
+        return "new", digest
+
+    def _resume_ref(
+        self, store, member, target, dest, rel_path, digests=None
+    ):
+        """
+        عضو متخطى من الـ journal: المراجع بتتعمل commit على
+        دفعات فممكن تكون ضاعت مع الـ crash — تسجيلها تاني
+        لو الملف على القرص نفس object في المخزن.
+        """
+        import manifest
+        candidates = store.lookup(member.file_size, member.CRC)
+        if not candidates:
+            return
+        digest = manifest.hash_path(target, member.file_size)
+        if digest in candidates:
+            store.add_ref(dest, rel_path, digest)
+        # نفس الـ SHA256 للـ manifest (بدون قراءة ثانية)
+        if digests is not None:
+            st = os.stat(target)
+            digests.add(
+                rel_path, st.st_size, st.st_mtime_ns, digest
             )
 
     # ════════════════════════════════════════════════
@@ -1230,16 +3540,21 @@ class GitHubDownloader:
     # ════════════════════════════════════════════════
 
     def _verify_extracted_files(
-        self, path, api_files, truncated
+        self, path, api_files, truncated, local_files=None
     ):
-        """تحقق من الملفات المستخرجة مقابل API"""
+        """
+        تحقق من الملفات المستخرجة مقابل API.
+        api_files: TreeMap من _get_api_files.
+        local_files: {path: size} جاهزة (ملف tar) بدل المسح.
+        """
         self._set_status(
             "🔍 تحقق نهائي...", "#f9e2af"
         )
 
         # ─── جمع الملفات المحلية ───
-        local_files = {}
-        for dirpath, _, filenames in os.walk(path):
+        walk = os.walk(path) if local_files is None else ()
+        local_files = local_files or {}
+        for dirpath, _, filenames in walk:
             for filename in filenames:
                 if filename.startswith(
                     "_download_report"
@@ -1297,16 +3612,38 @@ class GitHubDownloader:
         # ─── مقارنة الأحجام ───
         missing = []
         size_mismatch = 0
+        lfs_files = 0
+        lfs_patterns = None
 
-        for file_path, info in api_files.items():
-            if file_path not in local_files:
+        for file_path, size in api_files.items():
+            local_size = local_files.get(file_path)
+            if local_size is None:
                 missing.append(file_path)
-            elif (
-                local_files[file_path]
-                != info["size"]
-            ):
+            elif local_size != size:
+                # API يرجع حجم الـ pointer لملفات LFS
+                if self._lfs_sizes.get(file_path) == local_size:
+                    lfs_files += 1
+                    continue
+                if lfs_patterns is None:
+                    import lfs
+                    lfs_patterns = (
+                        lfs.tracked_patterns(path)
+                        if os.path.isdir(path) else []
+                    )
+                if lfs_patterns and lfs.is_tracked(
+                    file_path, lfs_patterns
+                ):
+                    lfs_files += 1
+                    continue
                 size_mismatch += 1
 
+        if lfs_files:
+            self._log(
+                f"ℹ️ ④: {lfs_files} ملف LFS"
+                f" (API يعرض حجم الـ pointer)",
+                "info"
+            )
+
         if not missing and size_mismatch == 0:
             self._log(
                 "✅ ④: كل الأحجام مطابقة! 🎯",
@@ -1345,27 +3682,149 @@ class GitHubDownloader:
 
     def _save_report(
         self, path, owner, repo, branch,
-        zip_hash, zip_size, file_count
+        zip_hash, zip_size, file_count, commit=None,
+        manifest=None
     ):
-        """حفظ تقرير التحميل كـ JSON"""
+        """حفظ تقرير تحميل المستودع"""
+        import accel
         report = {
             "repo": f"{owner}/{repo}",
             "branch": branch,
+            "commit": commit,
             "sha256": zip_hash,
             "zip_size": zip_size,
             "zip_size_human": self._format_size(
                 zip_size
             ),
             "files": file_count,
+            "manifest": manifest,
+            "artifact": (
+                self._artifact_info
+                if os.path.isfile(path) else None
+            ),
+            "search_index": (
+                self._index_info
+                if os.path.isdir(path) else None
+            ),
+            "lfs": self._lfs_info,
+            "submodules": self._submodule_info,
+            "backend": self.backend,
+            "accel": accel.describe(),
             "download_time": time.strftime(
                 "%Y-%m-%d %H:%M:%S"
             ),
             "tool": "GitHubDownloader/2.0",
         }
 
-        report_path = os.path.join(
-            path, "_download_report.json"
+        self._write_report(path, report)
+
+        self._log(
+            f"🔑 SHA256: {zip_hash[:32]}...",
+            "info"
+        )
+
+    def _write_manifest(self, dest):
+        """
+        manifest لكل ملف (المسار + الحجم + SHA256)
+        عشان الشجرة تتراجع لاحقاً بـ verify بعد حذف الأرشيف.
+        الـ SHA256 المحسوبة أثناء فك الضغط تُستخدم كما هي؛
+        اللي اتغير بعدها (LFS، submodules) بس يتحسب من القرص.
+        """
+        import sqlite3
+        import manifest
+        self._set_status(
+            "🧾 حساب manifest الملفات...", "#f9e2af"
+        )
+        try:
+            count, total, digest = manifest.build(
+                dest, check=self._check_cancelled,
+                known=self._digests and self._digests.sorted()
+            )
+        except (OSError, sqlite3.Error) as e:
+            self._log(
+                f"⚠️ فشل كتابة الـ manifest: {e}",
+                "warning"
+            )
+            return None
+        finally:
+            self._drop_digests()
+        return {
+            "file": manifest.MANIFEST_FILE,
+            "files": count,
+            "bytes": total,
+            "sha256": digest,
+        }
+
+    def _drop_digests(self):
+        """حذف ملف الـ SHA256 المؤقت (اتكتب الـ manifest أو انتهت المهمة)"""
+        if self._digests is not None:
+            self._digests.close()
+            self._digests = None
+
+    def _open_search_builder(self):
+        """IndexBuilder لو الفهرسة مفعّلة (مع فهرس الشجرة السابقة)"""
+        if not self.search_index:
+            return None
+        import code_index
+        base = None
+        if self.index_base:
+            base = os.path.join(self.index_base, code_index.INDEX_FILE)
+        return code_index.IndexBuilder(base)
+
+    def _write_search_index(self, dest):
+        """
+        كتابة فهرس البحث للشجرة: من فك الضغط لو اتبنى هناك،
+        وإلا بقراءة الملفات من القرص (git backend).
+        """
+        import code_index
+        builder, self._search_builder = self._search_builder, None
+        self._set_status("🔎 كتابة فهرس البحث...", "#f9e2af")
+        start = time.time()
+        try:
+            if builder is None:
+                base = None
+                if self.index_base:
+                    base = os.path.join(
+                        self.index_base, code_index.INDEX_FILE
+                    )
+                builder = code_index.build_tree(
+                    dest, base, self._check_cancelled
+                )
+            reused = builder.reused
+            files, grams, size = builder.write(
+                os.path.join(dest, code_index.INDEX_FILE)
+            )
+        except OSError as e:
+            self._log(f"⚠️ فشل كتابة فهرس البحث: {e}", "warning")
+            return
+        finally:
+            if builder is not None:
+                builder.close()
+        self._index_info = {
+            "file": code_index.INDEX_FILE,
+            "files": files,
+            "trigrams": grams,
+            "size": size,
+            "reused": reused,
+        }
+        msg = (
+            f"🔎 فهرس البحث: {files} ملف، {grams:,} trigram"
+            f" ({self._format_size(size)}، {time.time() - start:.1f}s)"
         )
+        if reused:
+            msg += f" | ♻️ {reused} من الفهرس السابق"
+        self._log(msg, "info")
+
+    def _write_report(self, path, report):
+        """حفظ تقرير التحميل كـ JSON"""
+        self.last_report = report
+        if os.path.isdir(path):
+            report_path = os.path.join(
+                path, "_download_report.json"
+            )
+        else:
+            # ملف tar واحد: التقرير بجانبه
+            report_path = path + ".report.json"
         try:
             with open(
                 report_path, "w", encoding="utf-8"
@@ -1383,10 +3842,82 @@ class GitHubDownloader:
                 "warning"
             )
 
-        self._log(
-            f"🔑 SHA256: {zip_hash[:32]}...",
-            "info"
+    # ════════════════════════════════════════════════
+    # Catalog
+    # ════════════════════════════════════════════════
+
+    def _phase(self, name):
+        """زمن مرحلة للكتالوج: with self._phase("download"): ..."""
+        return _PhaseTimer(self._job.setdefault("phases", {}), name)
+
+    def _catalog_file(self):
+        """مسار الكتالوج — أو None لو معطّل (GH_CATALOG=0)"""
+        if self.catalog_path in ("0", "off"):
+            return None
+        return self.catalog_path or os.path.join(
+            self._get_data_dir(), "catalog.db"
+        )
+
+    def _open_catalog(self):
+        from catalog import Catalog
+        path = self._catalog_file()
+        return Catalog(path) if path else None
+
+    def _find_existing(self, full_name, commit):
+        """أحدث تحميل ناجح لنفس الـ commit بنفس الإعدادات"""
+        import sqlite3
+        try:
+            catalog = self._open_catalog()
+            if catalog is None:
+                return None
+            with catalog:
+                return catalog.find_existing(
+                    full_name, commit,
+                    self.backend, self.output_format
+                )
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Catalog lookup failed: {e}")
+            return None
+
+    def _record_job(self, result):
+        """
+        تسجيل المهمة المنتهية في الكتالوج (أي حالة).
+        فشل الكتالوج ما يفشّلش التحميل نفسه.
+        """
+        import sqlite3
+        job, self._job = self._job, {}
+        self.last_job_id = None
+        if not job.get("repo"):
+            return  # رابط غير صالح: مفيش مستودع نسجله
+        job.update(
+            state=result["state"],
+            error=result.get("error"),
+            finished=time.time(),
         )
+        if result["state"] == "done":
+            job.update(dest=result["dest"], files=result["files"])
+        try:
+            catalog = self._open_catalog()
+            if catalog is None:
+                return
+            with catalog:
+                self.last_job_id = catalog.record(job)
+        except (OSError, sqlite3.Error) as e:
+            self._log(f"⚠️ فشل التسجيل في الكتالوج: {e}", "warning")
+
+    def _update_job_dest(self, dest):
+        """الشجرة اتنقلت بعد التسجيل (مثلاً staging المرآة)"""
+        import sqlite3
+        if self.last_job_id is None:
+            return
+        try:
+            catalog = self._open_catalog()
+            if catalog is None:
+                return
+            with catalog:
+                catalog.set_dest(self.last_job_id, dest)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Catalog update failed: {e}")
 
     # ════════════════════════════════════════════════
     # Finish States
@@ -1457,12 +3988,1232 @@ class GitHubDownloader:
         self.root.after(0, _update)
 
 
+# ════════════════════════════════════════════════════
+# Command Line
+# ════════════════════════════════════════════════════
+
+STARTUP_BUDGET_MS = 100
+# لازم ما تتحملش في مسار سطر الأوامر السريع
+HEAVY_MODULES = ("requests", "urllib3", "tkinter", "_tkinter")
+
+
+def _build_arg_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="github_downloader",
+        description="GitHub Downloader Pro — بدون وسائط يفتح الواجهة"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    dl = sub.add_parser("download", help="تحميل مستودع أو أكثر")
+    dl.add_argument("urls", nargs="+", metavar="URL")
+    dl.add_argument(
+        "-o", "--output", default=".", help="مجلد الحفظ"
+    )
+    dl.add_argument("--ref", help="فرع / tag / SHA")
+    dl.add_argument(
+        "--release", metavar="TAG",
+        help="تحميل ملفات إصدار (tag أو latest)"
+    )
+    dl.add_argument(
+        "--priority", default="normal",
+        choices=("high", "normal", "low")
+    )
+    dl.add_argument(
+        "--limit", metavar="RATE",
+        help="حد السرعة مثل 500K أو 2M"
+    )
+    dl.add_argument(
+        "--backend", choices=("zip", "git"),
+        help="zip (أرشيف) أو git (shallow fetch) — GH_BACKEND"
+    )
+    dl.add_argument(
+        "--format", dest="output_format",
+        choices=("tree", "tar", "tar.gz", "tar.zst"),
+        help="ملفات (tree) أو ملف واحد — GH_OUTPUT_FORMAT"
+    )
+    dl.add_argument(
+        "--index", action="store_true",
+        help="فهرس بحث trigrams أثناء فك الضغط — GH_SEARCH_INDEX"
+    )
+    dl.add_argument(
+        "--skip-existing", action="store_true",
+        help="تخطي commit محمّل سابقاً ووجهته موجودة (الكتالوج)"
+    )
+    dl.add_argument(
+        "--no-lfs", action="store_true",
+        help="ترك LFS pointers بدون جلب الملفات الحقيقية"
+    )
+    _add_submodule_args(dl)
+    _add_limit_args(dl)
+
+    mr = sub.add_parser(
+        "mirror", help="مرآة لكل مستودعات org أو user"
+    )
+    mr.add_argument(
+        "target", help="org:NAME أو user:NAME أو NAME"
+    )
+    mr.add_argument("-o", "--output", default=".")
+    mr.add_argument(
+        "-j", "--jobs", type=int, default=4,
+        help="عدد التحميلات المتوازية"
+    )
+    mr.add_argument("--include-archived", action="store_true")
+    mr.add_argument("--include-forks", action="store_true")
+    mr.add_argument(
+        "--max-size", metavar="SIZE",
+        help="تخطي المستودعات الأكبر من (مثل 500M)"
+    )
+    mr.add_argument(
+        "--pushed-since", metavar="YYYY-MM-DD",
+        help="فقط المستودعات اللي اتعدلت بعد التاريخ"
+    )
+    mr.add_argument(
+        "--priority", default="low",
+        choices=("high", "normal", "low")
+    )
+    mr.add_argument("--limit", metavar="RATE")
+    mr.add_argument("--backend", choices=("zip", "git"))
+    mr.add_argument(
+        "--index", action="store_true",
+        help="فهرس بحث لكل مستودع (يتحدث تدريجياً مع كل مزامنة)"
+    )
+    mr.add_argument(
+        "--no-lfs", action="store_true",
+        help="ترك LFS pointers بدون جلب الملفات الحقيقية"
+    )
+    _add_submodule_args(mr)
+    _add_limit_args(mr)
+
+    bn = sub.add_parser(
+        "bench", help="مقارنة سرعة فك الضغط والـ hashing"
+    )
+    bn.add_argument("archives", nargs="*", metavar="ZIP")
+    bn.add_argument("--repeat", type=int, default=3)
+    bn.add_argument(
+        "--startup", action="store_true",
+        help="قياس زمن بدء سطر الأوامر (-X importtime)"
+    )
+    bn.add_argument(
+        "--budget-ms", type=float, default=STARTUP_BUDGET_MS,
+        help="الحد المسموح لزمن البدء (يفشل لو تعداه)"
+    )
+
+    ins = sub.add_parser(
+        "inspect",
+        help="قائمة ملفات الأرشيف وحدوده بدون تحميله (HTTP Range)"
+    )
+    ins.add_argument("url", metavar="URL")
+    ins.add_argument("--ref", help="فرع / tag / SHA")
+    ins.add_argument(
+        "--list", action="store_true", help="عرض كل الملفات"
+    )
+    ins.add_argument(
+        "--get", nargs="+", metavar="PATH", default=[],
+        help="تحميل ملفات مفردة فقط"
+    )
+    ins.add_argument("-o", "--output", default=".")
+
+    vf = sub.add_parser(
+        "verify", help="التحقق من شجرة محملة مقابل الـ manifest"
+    )
+    vf.add_argument("dirs", nargs="+", metavar="DIR")
+    vf.add_argument(
+        "-j", "--jobs", type=int, default=0,
+        help="عدد threads الـ hashing (الافتراضي حسب المعالج)"
+    )
+    vf.add_argument(
+        "-r", "--recursive", action="store_true",
+        help="كل الأشجار تحت المجلد (مرآة كاملة)"
+    )
+    vf.add_argument(
+        "--quick", action="store_true",
+        help="تخطي hashing الملفات اللي حجمها و mtime مطابقين"
+    )
+
+    sr = sub.add_parser(
+        "search", help="بحث في الأشجار المفهرسة (--index)"
+    )
+    sr.add_argument("pattern", help="regex (أو نص مع -F)")
+    sr.add_argument(
+        "dirs", nargs="*", default=["."], metavar="DIR",
+        help="شجرة أو مرآة كاملة (الافتراضي: المجلد الحالي)"
+    )
+    sr.add_argument("-i", "--ignore-case", action="store_true")
+    sr.add_argument(
+        "-F", "--fixed-strings", action="store_true",
+        help="النص حرفياً وليس regex"
+    )
+    sr.add_argument(
+        "-l", "--files-with-matches", action="store_true",
+        help="أسماء الملفات فقط"
+    )
+    sr.add_argument(
+        "--stats", action="store_true",
+        help="عدد الملفات المرشحة من الفهرس والوقت"
+    )
+
+    hs = sub.add_parser(
+        "history", help="سجل التحميلات من الكتالوج (GH_CATALOG)"
+    )
+    hs.add_argument(
+        "repo", nargs="?", help="owner/name أو نمط owner/*"
+    )
+    hs.add_argument("--commit", help="SHA كامل أو بادئة")
+    hs.add_argument(
+        "--state", choices=("done", "failed", "cancelled")
+    )
+    hs.add_argument("--since", metavar="YYYY-MM-DD")
+    hs.add_argument(
+        "-n", "--limit", type=int, default=20,
+        help="عدد المهام (0 = الكل)"
+    )
+    hs.add_argument(
+        "-v", "--verbose", action="store_true",
+        help="زمن كل مرحلة والخطأ والـ hash"
+    )
+    hs.add_argument("--json", action="store_true")
+
+    st = sub.add_parser(
+        "stats", help="إحصائيات الكتالوج: أحجام وسرعات وأزمنة المراحل"
+    )
+    st.add_argument(
+        "repo", nargs="?", help="owner/name أو نمط owner/*"
+    )
+    st.add_argument("--since", metavar="YYYY-MM-DD")
+    st.add_argument("--json", action="store_true")
+
+    pl = sub.add_parser(
+        "plan",
+        help="تقدير الحجم والمساحة والزمن بدون تحميل (dry-run)"
+    )
+    pl.add_argument("urls", nargs="+", metavar="URL")
+    pl.add_argument(
+        "-o", "--output", default=".",
+        help="مجلد الحفظ (للمساحة المتاحة)"
+    )
+    pl.add_argument("--ref", help="فرع / tag / SHA")
+    pl.add_argument("--release", metavar="TAG")
+    pl.add_argument("--backend", choices=("zip", "git"))
+    pl.add_argument(
+        "--format", dest="output_format",
+        choices=("tree", "tar", "tar.gz", "tar.zst")
+    )
+    pl.add_argument(
+        "--limit", metavar="RATE",
+        help="حد السرعة المتوقع (يدخل في تقدير الزمن)"
+    )
+    pl.add_argument("--skip-existing", action="store_true")
+    pl.add_argument("--json", action="store_true")
+
+    sv = sub.add_parser(
+        "serve",
+        help="cache proxy للشبكة المحلية (العملاء: GH_CACHE_PROXY)"
+    )
+    sv.add_argument(
+        "--host", default="127.0.0.1",
+        help="عنوان الاستماع (للشبكة: 0.0.0.0 مع --secret/--allow)"
+    )
+    sv.add_argument("--port", type=int, default=8765)
+    sv.add_argument(
+        "--secret", default=os.environ.get("GH_CACHE_SECRET"),
+        help="secret مشترك — العملاء: GH_CACHE_SECRET"
+    )
+    sv.add_argument(
+        "--allow", action="append", default=[], metavar="CIDR",
+        help="شبكة مسموحة للعملاء (يتكرر)، مثال: 192.168.1.0/24"
+    )
+    sv.add_argument(
+        "--share-token", action="store_true",
+        help="استخدام GITHUB_TOKEN بتاع السيرفر للعملاء بدون توكن"
+    )
+    sv.add_argument("--cert", help="شهادة TLS (https)")
+    sv.add_argument("--key", help="مفتاح TLS")
+    sv.add_argument(
+        "--store", help="مجلد الـ cache (الافتراضي: <data>/cache)"
+    )
+    sv.add_argument(
+        "--max-size", type=GitHubDownloader._parse_size,
+        default="20G", metavar="SIZE",
+        help="حد المخزن قبل حذف الأقدم استخداماً (LRU)"
+    )
+    sv.add_argument(
+        "--ttl", type=float, default=60, metavar="SECONDS",
+        help="صلاحية ردود API المتغيرة قبل إعادة التحقق (ETag)"
+    )
+
+    gc = sub.add_parser(
+        "gc", help="تنظيف الأجزاء القديمة ومخزن إزالة التكرار"
+    )
+    gc.add_argument(
+        "--store", default=os.environ.get("GH_DEDUP_STORE"),
+        help="مسار مخزن إزالة التكرار"
+    )
+    return parser
+
+
+def _add_limit_args(parser):
+    """حدود الحماية لكل مهمة (تتخطى GH_MAX_FILES / GH_MAX_EXTRACT_SIZE)"""
+    parser.add_argument(
+        "--max-files", type=int, metavar="N",
+        help=f"أقصى عدد ملفات (الافتراضي"
+             f" {GitHubDownloader.MAX_FILE_COUNT:,}، 0 = بدون حد)"
+    )
+    parser.add_argument(
+        "--max-extract", type=GitHubDownloader._parse_size,
+        metavar="SIZE",
+        help="أقصى حجم بعد الفك مثل 50G (0 = بدون حد)"
+    )
+
+
+def _add_submodule_args(parser):
+    """تحميل الـ submodules (تتخطى GH_SUBMODULES / GH_SUBMODULE_DEPTH)"""
+    parser.add_argument(
+        "--recurse-submodules", action="store_true",
+        help="تحميل الـ submodules عند الـ commit المثبت بالتوازي"
+    )
+    parser.add_argument(
+        "--submodule-depth", type=int, metavar="N",
+        help=f"أقصى عمق تداخل (الافتراضي"
+             f" {GitHubDownloader.SUBMODULE_DEPTH})"
+    )
+
+
+def _apply_submodule_args(engine, args):
+    if args.recurse_submodules:
+        engine.submodules = True
+    if args.submodule_depth is not None:
+        engine.submodule_depth = args.submodule_depth
+
+
+def _cli_progress(kind, *args):
+    """طباعة الحالة في سطر واحد على الطرفية"""
+    if kind == "status" and sys.stderr.isatty():
+        sys.stderr.write(f"\r\033[K{args[0]}")
+        sys.stderr.flush()
+    elif kind == "log" and sys.stderr.isatty():
+        sys.stderr.write("\r\033[K")
+
+
+def _run_cli_job(engine, *job_args):
+    """
+    تشغيل مهمة في thread مع دعم Ctrl+C:
+    المقاطعة تلغي المهمة وتنتظر تنظيفها.
+    """
+    result = {}
+    worker = threading.Thread(
+        target=lambda: result.update(engine._run_job(*job_args)),
+        daemon=True
+    )
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(0.2)
+    except KeyboardInterrupt:
+        engine.cancel()
+        worker.join()
+    return result
+
+
+def _cli_download(args):
+    if args.limit:
+        from bandwidth import get_limiter, parse_rate
+        get_limiter().set_rate(parse_rate(args.limit))
+
+    failed = 0
+    for url in args.urls:
+        engine = GitHubDownloader(
+            on_event=_cli_progress, priority=args.priority
+        )
+        if args.backend:
+            engine.backend = args.backend
+        if args.output_format:
+            engine.output_format = args.output_format
+        if args.index:
+            engine.search_index = True
+        engine.skip_existing = args.skip_existing
+        if args.no_lfs:
+            engine.lfs = False
+        _apply_submodule_args(engine, args)
+        engine.set_limits(args.max_files, args.max_extract)
+        result = _run_cli_job(
+            engine, url, os.path.abspath(args.output),
+            args.ref, args.release
+        )
+        if sys.stderr.isatty():
+            sys.stderr.write("\r\033[K")
+        if result.get("state") == "done":
+            print(f"✅ {url} → {result['dest']}"
+                  f" ({result['files']} ملف)")
+        elif result.get("state") == "cancelled":
+            print(f"⛔ {url}: تم الإلغاء")
+            return 130
+        else:
+            print(f"❌ {url}: {result.get('error', '')}")
+            failed += 1
+    return 1 if failed else 0
+
+
+def _cli_mirror(args):
+    from mirror import OrgMirror
+
+    if args.limit:
+        from bandwidth import get_limiter, parse_rate
+        get_limiter().set_rate(parse_rate(args.limit))
+
+    def make_engine():
+        engine = GitHubDownloader(priority=args.priority)
+        if args.backend:
+            engine.backend = args.backend
+        if args.index:
+            engine.search_index = True
+        if args.no_lfs:
+            engine.lfs = False
+        _apply_submodule_args(engine, args)
+        engine.set_limits(args.max_files, args.max_extract)
+        return engine
+
+    mirror = OrgMirror(
+        make_engine,
+        args.target, args.output, jobs=args.jobs,
+        include_archived=args.include_archived,
+        include_forks=args.include_forks,
+        max_size=(
+            GitHubDownloader._parse_size(args.max_size)
+            if args.max_size else 0
+        ),
+        pushed_since=args.pushed_since,
+        on_event=_cli_progress,
+    )
+
+    result = {}
+
+    def run():
+        try:
+            result["report"] = mirror.run()
+        except Exception as e:
+            result["error"] = str(e)
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(0.2)
+    except KeyboardInterrupt:
+        mirror.cancel()
+        worker.join()
+
+    if sys.stderr.isatty():
+        sys.stderr.write("\r\033[K")
+    if "error" in result:
+        print(f"❌ {result['error']}")
+        return 1
+
+    report = result["report"]
+    for r in report["repos"]:
+        if r["status"] not in ("unchanged",):
+            line = f"  {r['status']:<10} {r['repo']}"
+            if r.get("error"):
+                line += f"  — {r['error'].splitlines()[0]}"
+            print(line)
+    counts = report["counts"]
+    print(
+        f"🪞 {report['target']}: "
+        + ", ".join(f"{k}={v}" for k, v in sorted(counts.items()))
+        + f" | {GitHubDownloader._format_size(report['bytes'])}"
+        f" في {GitHubDownloader._format_time(report['seconds'])}"
+    )
+    if counts.get("cancelled"):
+        return 130
+    return 1 if counts.get("failed") else 0
+
+
+def _import_times(code):
+    """
+    تشغيل python -X importtime -c code في عملية جديدة.
+    يرجع ({module: self_us}, wall_ms)
+    """
+    import subprocess
+
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True
+    )
+    wall = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # سطر العناوين
+        modules[parts[2].strip()] = int(parts[0])
+    return modules, wall
+
+
+def _bench_startup(budget_ms, repeat):
+    """
+    زمن استيراد مسار سطر الأوامر (import + بناء argparse)
+    مطروحاً منه بدء المفسّر نفسه. يرجع exit code.
+    """
+    code = "import github_downloader as g; g._build_arg_parser()"
+    best = None
+    for _ in range(max(1, repeat)):
+        base, base_wall = _import_times("pass")
+        mods, wall = _import_times(code)
+        ours = {m: us for m, us in mods.items() if m not in base}
+        cost = sum(ours.values()) / 1000
+        if best is None or cost < best[0]:
+            best = (cost, wall - base_wall, ours)
+
+    cost, wall, ours = best
+    print(
+        f"🚀 startup: {cost:.1f} ms imports"
+        f" (+{wall:.1f} ms wall فوق المفسّر)"
+        f" | الحد: {budget_ms:.0f} ms"
+    )
+    for name, us in sorted(
+        ours.items(), key=lambda kv: kv[1], reverse=True
+    )[:8]:
+        print(f"  {us / 1000:7.2f} ms  {name}")
+
+    heavy = sorted(m for m in ours if m in HEAVY_MODULES)
+    if heavy:
+        print(f"❌ وحدات ثقيلة في مسار البدء: {', '.join(heavy)}")
+        return 1
+    if cost > budget_ms:
+        print("❌ زمن البدء تعدى الحد!")
+        return 1
+    print("✅ ضمن الحد")
+    return 0
+
+
+def _cli_bench(args):
+    if args.startup:
+        return _bench_startup(args.budget_ms, args.repeat)
+    if not args.archives:
+        print("❌ حدد أرشيف ZIP واحد على الأقل، أو --startup")
+        return 2
+
+    import accel
+
+    print(
+        f"⚙️ inflate: {accel.inflate_backend()[0]}"
+        f" (متاح: {', '.join(accel.available_inflate())})"
+        f" | sha256: {accel.hash_backend()}"
+    )
+    results = accel.benchmark(args.archives, args.repeat)
+    base = next(
+        (sec for name, _, sec in results if name == "zlib"), None
+    )
+    for name, size, sec in results:
+        rate = size / sec if sec > 0 else 0
+        line = (
+            f"  {name:<16} {GitHubDownloader._format_size(size):>10}"
+            f"  {sec * 1000:8.1f} ms"
+            f"  {GitHubDownloader._format_size(int(rate))}/s"
+        )
+        if base and name in accel.INFLATE_BACKENDS and sec > 0:
+            line += f"  ×{base / sec:.2f}"
+        print(line)
+
+    # ─── حلقة النسخ: bytes لكل جزء مقابل buffer مُعاد ───
+    print("📋 فك + SHA-256 (read مقابل readinto):")
+    copies = accel.benchmark_copy(args.archives, args.repeat)
+    base = copies[0][2]
+    for name, size, sec, collections, faults in copies:
+        rate = size / sec if sec > 0 else 0
+        print(
+            f"  {name:<16} {GitHubDownloader._format_size(size):>10}"
+            f"  {sec * 1000:8.1f} ms"
+            f"  {GitHubDownloader._format_size(int(rate))}/s"
+            f"  ×{base / sec if sec > 0 else 0:.2f}"
+            f"  | gc: {collections}  page faults: {faults}"
+        )
+    return 0
+
+
+def _cli_inspect(args):
+    from remote_zip import RemoteZip, RangeNotSupported
+
+    engine = GitHubDownloader(on_event=_cli_progress)
+    owner, repo, url_ref, _ = engine._parse_target(args.url)
+    if not owner:
+        print("❌ رابط غير صحيح!")
+        return 2
+    ref = args.ref or url_ref
+    branch = ref or engine._detect_branch(owner, repo)
+    if not branch:
+        print(f"❌ مستودع غير موجود أو خاص: {owner}/{repo}")
+        return 1
+    commit = engine._resolve_commit(owner, repo, branch)
+    url = engine._archive_url(owner, repo, commit, branch, ref)
+
+    try:
+        rz = RemoteZip(
+            engine.session, url, engine._get_remote_size(url)
+        )
+    except RangeNotSupported as e:
+        print(f"❌ الخادم لا يدعم Range: {e}")
+        return 1
+    except (zipfile.BadZipFile, requests.RequestException) as e:
+        print(f"❌ {e}")
+        return 1
+
+    with rz:
+        info = rz.summary()
+        root = engine._detect_root_folder(rz.names())
+        prefix = root + "/" if root else ""
+        out = os.path.abspath(args.output)
+
+        # ─── نفس فلتر الفك (_member_path)؛ رقم العضو بس ───
+        # في الذاكرة و ZipInfo يُبنى وقت الحاجة
+        members = {}
+        unsafe = 0
+        for n, i in enumerate(rz.infolist()):
+            if i.is_dir():
+                continue
+            rel = engine._member_path(i, root, out)
+            if not rel:
+                unsafe += rel is False
+                continue
+            members[rel] = n
+
+        print(
+            f"📦 {owner}/{repo} @ {(commit or branch)[:12]}"
+            f" — {GitHubDownloader._format_size(info['archive_size'])}"
+        )
+        print(
+            f"   {info['files']} ملف،"
+            f" {GitHubDownloader._format_size(info['uncompressed'])}"
+            f" بعد الفك (نسبة ×{info['ratio']:.1f}،"
+            f" أعلى ×{info['max_ratio']:.0f}:"
+            f" {(info['max_ratio_name'] or '')[len(prefix):]})"
+        )
+        if unsafe:
+            print(f"   ⚠️ {unsafe} عنصر غير آمن (symlink / مسار)")
+        try:
+            engine._check_zip_limits(
+                info["uncompressed"], info["files"]
+            )
+            print("   ✅ ضمن الحدود")
+        except DownloadError as e:
+            print("   ⚠️ " + str(e).replace("\n", " "))
+
+        if args.list:
+            for rel, n in sorted(members.items()):
+                size = rz.index.sizes(n)[0]
+                print(
+                    f"{GitHubDownloader._format_size(size):>10}"
+                    f"  {rel}"
+                )
+
+        failed = 0
+        for rel in args.get:
+            n = members.get(rel.strip("/"))
+            if n is None:
+                print(f"❌ {rel}: غير موجود")
+                failed += 1
+                continue
+            i = rz.index.info(n)
+            target = os.path.join(out, rel.strip("/"))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp = target + ".part"
+            try:
+                with open(tmp, "wb") as f:
+                    rz.extract_member(i, f)
+                os.replace(tmp, target)
+            except (
+                zipfile.BadZipFile, requests.RequestException,
+                RangeNotSupported, OSError
+            ) as e:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                print(f"❌ {rel}: {e}")
+                failed += 1
+                continue
+            print(f"✅ {rel} → {target}")
+
+        if args.get:
+            print(f"🛰️ {rz.requests} طلب Range إجمالاً")
+    return 1 if failed else 0
+
+
+def _verify_tree(tree, args):
+    """التحقق من شجرة واحدة — يرجع True لو سليمة"""
+    import manifest
+
+    # ─── الـ manifest نفسه مقابل التقرير ───
+    expected = None
+    try:
+        with open(
+            os.path.join(tree, "_download_report.json"),
+            encoding="utf-8"
+        ) as f:
+            expected = (json.load(f).get("manifest") or {}).get(
+                "sha256"
+            )
+    except (OSError, ValueError):
+        pass
+    mpath = os.path.join(tree, manifest.MANIFEST_FILE)
+    if expected and manifest.hash_path(mpath) != expected:
+        print(f"❌ {tree}: الـ manifest نفسه اتعدل!")
+        return False
+
+    def progress(done, total):
+        _cli_progress("status", f"🔍 {done}/{total}  {tree}")
+
+    start = time.time()
+    try:
+        result = manifest.verify(
+            tree, args.jobs, args.quick, progress
+        )
+    except (OSError, ValueError) as e:
+        print(f"❌ {tree}: {e}")
+        return False
+    if sys.stderr.isatty():
+        sys.stderr.write("\r\033[K")
+
+    problems = [
+        (label, result[key]) for key, label in (
+            ("missing", "ناقص"), ("size", "حجم مختلف"),
+            ("hash", "محتوى مختلف"), ("extra", "زيادة"),
+        ) if result[key]
+    ]
+    elapsed = time.time() - start
+    summary = (
+        f"{result['files']} ملف"
+        f" ({GitHubDownloader._format_size(result['bytes'])})"
+        f" في {GitHubDownloader._format_time(elapsed)}"
+    )
+    if result["skipped"]:
+        summary += f" | {result['skipped']} بدون hashing (--quick)"
+    if not problems:
+        print(f"✅ {tree}: {summary}")
+        return True
+
+    print(f"❌ {tree}: {summary}")
+    for label, paths in problems:
+        print(f"   {label}: {len(paths)}")
+        for rel in paths[:5]:
+            print(f"      {rel}")
+        if len(paths) > 5:
+            print(f"      ... و{len(paths) - 5} آخر")
+    return False
+
+
+def _cli_verify(args):
+    import manifest
+
+    trees = []
+    for d in args.dirs:
+        if args.recursive:
+            trees.extend(manifest.find_trees(d))
+        else:
+            trees.append(d)
+    if not trees:
+        print("❌ لا يوجد manifest في المجلدات المحددة")
+        return 1
+
+    bad = 0
+    for tree in trees:
+        if not os.path.isfile(
+            os.path.join(tree, manifest.MANIFEST_FILE)
+        ):
+            print(f"❌ {tree}: لا يوجد {manifest.MANIFEST_FILE}")
+            bad += 1
+        elif not _verify_tree(tree, args):
+            bad += 1
+    if len(trees) > 1:
+        print(f"🔍 {len(trees) - bad}/{len(trees)} شجرة سليمة")
+    return 1 if bad else 0
+
+
+def _cli_search(args):
+    import re
+    import code_index
+
+    pattern = (
+        re.escape(args.pattern) if args.fixed_strings
+        else args.pattern
+    )
+    # MULTILINE: ^ و $ لكل سطر (زي grep) حتى في فحص الملف كامل
+    flags = re.MULTILINE
+    if args.ignore_case:
+        flags |= re.IGNORECASE
+    try:
+        regex = re.compile(pattern, flags)
+    except re.error as e:
+        print(f"❌ regex غير صالح: {e}")
+        return 2
+    grams = code_index.query_grams(
+        pattern, bool(regex.flags & re.IGNORECASE)
+    )
+
+    trees = []
+    for d in args.dirs:
+        trees.extend(code_index.find_indexes(d))
+    if not trees:
+        print(
+            "❌ لا يوجد فهرس بحث في المجلدات المحددة"
+            " (حمّل بـ --index)"
+        )
+        return 2
+
+    start = time.time()
+    stats = {}
+    found = 0
+    try:
+        for tree in trees:
+            try:
+                for rel, line_no, line in code_index.search(
+                    tree, regex, grams,
+                    args.files_with_matches, stats
+                ):
+                    found += 1
+                    path = os.path.join(tree, rel)
+                    if args.files_with_matches:
+                        print(path)
+                    else:
+                        print(f"{path}:{line_no}:{line}")
+            except BrokenPipeError:
+                raise
+            except (OSError, ValueError) as e:
+                print(f"❌ {tree}: {e}", file=sys.stderr)
+    except BrokenPipeError:
+        # search ... | head: القارئ اكتفى
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    if args.stats:
+        print(
+            f"🔎 {len(trees)} شجرة | {stats.get('candidates', 0)}"
+            f"/{stats.get('files', 0)} ملف مرشح"
+            f" ({len(grams)} trigram) | {found} نتيجة"
+            f" في {(time.time() - start) * 1000:.1f} ms",
+            file=sys.stderr
+        )
+    return 0 if found else 1
+
+
+def _open_cli_catalog(args):
+    """الكتالوج + since كـ timestamp — أو (None, رسالة خطأ)"""
+    since = None
+    if args.since:
+        try:
+            since = time.mktime(time.strptime(args.since, "%Y-%m-%d"))
+        except ValueError:
+            return None, f"❌ تاريخ غير صالح: {args.since}"
+    engine = GitHubDownloader()
+    path = engine._catalog_file()
+    if path is None:
+        return None, "❌ الكتالوج معطّل (GH_CATALOG=0)"
+    if not os.path.isfile(path):
+        return None, f"❌ لا يوجد كتالوج بعد: {path}"
+    from catalog import Catalog
+    return (Catalog(path), since), None
+
+
+def _cli_history(args):
+    opened, error = _open_cli_catalog(args)
+    if error:
+        print(error)
+        return 2
+    catalog, since = opened
+    with catalog:
+        jobs = catalog.query(
+            args.repo, args.commit, args.state, since, args.limit
+        )
+    if args.json:
+        print(json.dumps(jobs, indent=2, ensure_ascii=False))
+        return 0
+    if not jobs:
+        print("📭 لا توجد مهام مطابقة")
+        return 1
+
+    fmt = GitHubDownloader._format_size
+    icons = {"done": "✅", "failed": "❌", "cancelled": "⛔"}
+    for job in jobs:
+        when = time.strftime(
+            "%Y-%m-%d %H:%M", time.localtime(job["finished"])
+        )
+        line = (
+            f"{when} {icons.get(job['state'], '?')}"
+            f" {job['repo']}"
+        )
+        if job["release"]:
+            line += f" 🏷️ {job['release']}"
+        elif job["commit_sha"]:
+            line += f" @ {job['commit_sha'][:12]}"
+        if job["archive_size"]:
+            line += f" | {fmt(job['archive_size'])}"
+        if job["files"]:
+            line += f" | {job['files']} ملف"
+        line += f" | {job['finished'] - job['started']:.1f}s"
+        if job["dest"]:
+            line += f" → {job['dest']}"
+        print(line)
+        if args.verbose:
+            if job["phases"]:
+                print("    ⏱️ " + "  ".join(
+                    f"{name} {secs:.2f}s"
+                    for name, secs in job["phases"].items()
+                ))
+            if job["sha256"]:
+                print(f"    🔑 {job['sha256']}")
+            if job["error"]:
+                print(f"    ❌ {job['error']}")
+    return 0
+
+
+def _cli_stats(args):
+    opened, error = _open_cli_catalog(args)
+    if error:
+        print(error)
+        return 2
+    catalog, since = opened
+    with catalog:
+        stats = catalog.stats(args.repo, since)
+    if args.json:
+        print(json.dumps(stats, indent=2, ensure_ascii=False))
+        return 0
+
+    fmt = GitHubDownloader._format_size
+    states = stats["states"]
+    print(
+        f"📊 {sum(states.values())} مهمة:"
+        f" ✅ {states.get('done', 0)}"
+        f"  ❌ {states.get('failed', 0)}"
+        f"  ⛔ {states.get('cancelled', 0)}"
+    )
+    if not states.get("done"):
+        return 0
+    print(
+        f"📦 {stats['repos']} مستودع | أرشيفات"
+        f" {fmt(stats['archive_bytes'])} | بعد الفك"
+        f" {fmt(stats['bytes'])} | {stats['files']:,} ملف"
+    )
+    if stats["speed"]:
+        print(f"⚡ متوسط سرعة التحميل: {fmt(stats['speed'])}/s")
+    if stats["phases"]:
+        print("⏱️ متوسط المراحل:")
+        for name, secs in sorted(
+            stats["phases"].items(), key=lambda kv: -kv[1]
+        ):
+            print(f"   {name:<14}{secs:8.2f}s")
+    if stats["top"]:
+        print("🏆 الأكبر:")
+        for row in stats["top"]:
+            print(
+                f"   {row['repo']:<40}"
+                f" {fmt(row['archive_size'] or 0):>10}"
+                f" {row['files'] or 0:>8} ملف"
+                f" ({row['jobs']} مهمة)"
+            )
+    return 0
+
+
+def _cli_plan(args):
+    if args.limit:
+        from bandwidth import get_limiter, parse_rate
+        get_limiter().set_rate(parse_rate(args.limit))
+    save = os.path.abspath(args.output)
+    if not os.path.isdir(save):
+        print(f"❌ مجلد الحفظ غير موجود: {save}")
+        return 2
+
+    engine = GitHubDownloader(on_event=_cli_progress)
+    if args.backend:
+        engine.backend = args.backend
+    if args.output_format:
+        engine.output_format = args.output_format
+    engine.skip_existing = args.skip_existing
+
+    plans = []
+    failed = 0
+    for url in args.urls:
+        try:
+            plan = engine.plan(url, save, args.ref, args.release)
+        except DownloadError as e:
+            if sys.stderr.isatty():
+                sys.stderr.write("\r\033[K")
+            print(f"❌ {url}: {str(e).replace(chr(10), ' ')}")
+            failed += 1
+            continue
+        plan["url"] = url
+        plans.append(plan)
+    if sys.stderr.isatty():
+        sys.stderr.write("\r\033[K")
+
+    # ─── الإجمالي: المهام بالترتيب، كل ناتج بيفضل على القرص ───
+    def total(key):
+        values = [p[key] for p in plans]
+        return None if None in values else sum(values)
+
+    kept = 0
+    peak = 0
+    for plan in plans:
+        if plan["peak"] is None:
+            peak = None
+            break
+        peak = max(peak, kept + plan["peak"])
+        kept += plan["output"]
+    needed = None if peak is None else (
+        peak - sum(p["resume"] for p in plans)
+    )
+    free = plans[0]["free"] if plans else None
+    summary = {
+        "jobs": len(plans), "failed": failed,
+        "download": total("download"),
+        "uncompressed": total("uncompressed"),
+        "files": total("files"),
+        "peak": peak,
+        "needed": needed,
+        "free": free,
+        "fits": None if needed is None or free is None
+        else free >= needed,
+        "duration": total("duration"),
+    }
+    if args.json:
+        print(json.dumps(
+            {"plans": plans, "total": summary},
+            indent=2, ensure_ascii=False
+        ))
+        return 1 if failed else 0
+
+    fmt = GitHubDownloader._format_size
+
+    def size(value):
+        return "؟" if value is None else fmt(value)
+
+    for plan in plans:
+        if plan.get("release"):
+            target = f"🏷️ {plan['release']}"
+        else:
+            target = f"🌿 {plan['branch']}"
+            if plan["commit"]:
+                target += f" ({plan['commit'][:12]})"
+            target += f" [{plan['backend']} → {plan['format']}]"
+        print(f"📋 {plan['repo']} {target}")
+
+        line = f"   📥 تحميل {size(plan['download'])}"
+        if plan["estimated"]:
+            line += " (تقريبي)"
+        if plan["resume"]:
+            line += f" | ♻️ {fmt(plan['resume'])} محفوظ"
+        line += f" | 📂 {size(plan['uncompressed'])}"
+        if plan["files"] is not None:
+            line += f"، {plan['files']:,} ملف"
+        line += {
+            "catalog": " (من الكتالوج)",
+            "zip": " (central directory)",
+            "api": " (شجرة API)",
+        }.get(plan["source"], "")
+        print(line)
+
+        line = f"   💾 أقصى مساحة {size(plan['peak'])}"
+        if plan["free"] is not None and plan["needed"] is not None:
+            line += (
+                f" (متاح {fmt(plan['free'])})"
+                f" {'✅' if plan['fits'] else '❌ غير كافية'}"
+            )
+        print(line)
+
+        if plan["duration"] is not None:
+            line = (
+                f"   ⏱️ ~{GitHubDownloader._format_time(plan['duration'])}"
+            )
+            if plan["speed"]:
+                line += f" ({fmt(plan['speed'])}/s مقاسة)"
+            print(line)
+        elif plan["speed"] is None:
+            print("   ⏱️ ؟ (ما فيش تحميلات سابقة في الكتالوج)")
+        else:
+            print("   ⏱️ ؟")
+        if plan.get("existing"):
+            print(f"   ♻️ محمّل سابقاً: {plan['existing']}")
+        for warning in plan["warnings"]:
+            print(f"   ⚠️ {warning}")
+
+    if len(plans) > 1:
+        line = (
+            f"Σ {len(plans)} مهمة: 📥 {size(summary['download'])}"
+            f" | 📂 {size(summary['uncompressed'])}"
+            f" | 💾 أقصى {size(summary['peak'])}"
+        )
+        if summary["fits"] is not None:
+            line += " ✅" if summary["fits"] else " ❌ مساحة غير كافية"
+        if summary["duration"] is not None:
+            line += (
+                f" | ⏱️ ~"
+                f"{GitHubDownloader._format_time(summary['duration'])}"
+            )
+        print(line)
+    return 1 if failed else 0
+
+
+def _cli_serve(args):
+    import logging as _logging
+    import cache_proxy
+    from http_abort import install
+
+    import ipaddress
+    import ssl
+
+    # ─── مفتوح على الشبكة بدون secret/allowlist: رفض ───
+    for net in args.allow:
+        try:
+            ipaddress.ip_network(net, strict=False)
+        except ValueError as e:
+            print(f"❌ --allow: {e}")
+            return 2
+    try:
+        local = ipaddress.ip_address(args.host).is_loopback
+    except ValueError:
+        local = args.host == "localhost"
+    if not (local or args.secret or args.allow):
+        print(
+            f"❌ {args.host}: الاستماع على الشبكة يحتاج"
+            " --secret أو --allow"
+        )
+        return 2
+
+    # session خاصة بالسيرفر، وبدون GH_CACHE_PROXY (وإلا
+    # الـ proxy يوجّه لنفسه). توكن السيرفر بـ --share-token
+    # بس: غير كده كل عميل يروح لـ GitHub بتوكنه هو
+    session = requests.Session()
+    session.headers.update({
+        "User-Agent": "GitHubDownloader/2.0",
+        "Accept": "application/vnd.github.v3+json"
+    })
+    if args.share_token and os.environ.get("GITHUB_TOKEN"):
+        session.headers["Authorization"] = (
+            f"token {os.environ['GITHUB_TOKEN']}"
+        )
+        print(
+            "⚠️ --share-token: أي عميل مسموح له يستخدم"
+            " توكن السيرفر (مستودعاته الخاصة كمان)"
+        )
+    install(session)
+
+    ssl_context = None
+    if args.cert:
+        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        try:
+            ssl_context.load_cert_chain(args.cert, args.key)
+        except (OSError, ssl.SSLError) as e:
+            print(f"❌ TLS: {e}")
+            return 2
+
+    store = args.store or os.path.join(
+        GitHubDownloader._get_data_dir(), "cache"
+    )
+    proxy = cache_proxy.CacheProxy(
+        session, store, args.max_size, args.ttl
+    )
+    try:
+        server = cache_proxy.make_server(
+            proxy, args.host, args.port, secret=args.secret,
+            allow=args.allow, ssl_context=ssl_context
+        )
+    except OSError as e:
+        print(f"❌ {args.host}:{args.port}: {e}")
+        return 2
+    _logging.basicConfig(level=_logging.INFO, format="%(message)s")
+
+    host, port = server.server_address[:2]
+    fmt = GitHubDownloader._format_size
+    scheme = "https" if ssl_context else "http"
+    print(
+        f"🛰️ cache proxy على {scheme}://{host}:{port}"
+        f" | {store} ({fmt(proxy.store.total)}"
+        f" / {fmt(args.max_size)})"
+    )
+    print(
+        f"   العملاء: GH_CACHE_PROXY={scheme}://<هذا الجهاز>:{port}"
+        + (" + GH_CACHE_SECRET" if args.secret else "")
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    stats = proxy.snapshot()
+    print(
+        f"\n📊 hits {stats['hits']} | misses {stats['misses']}"
+        f" | coalesced {stats['coalesced']}"
+        f" | API {stats['meta_hits']}/{stats['meta_misses']}"
+        f" | {fmt(stats['bytes_served'])} للعملاء"
+    )
+    return 0
+
+
+def _cli_gc(args):
+    engine = GitHubDownloader()
+    removed, freed = engine._open_partial_store().gc()
+    print(
+        f"🧹 partials: {removed} ملف"
+        f" ({engine._format_size(freed)})"
+    )
+    if args.store:
+        from dedup_store import DedupStore
+        store = DedupStore(args.store)
+        try:
+            removed, freed = store.gc()
+        finally:
+            store.close()
+        print(
+            f"🧹 dedup: {removed} object"
+            f" ({engine._format_size(freed)})"
+        )
+    return 0
+
+
+def cli(argv):
+    """نقطة دخول سطر الأوامر — يرجع exit code"""
+    args = _build_arg_parser().parse_args(argv)
+    handlers = {
+        "download": _cli_download,
+        "mirror": _cli_mirror,
+        "bench": _cli_bench,
+        "verify": _cli_verify,
+        "inspect": _cli_inspect,
+        "search": _cli_search,
+        "history": _cli_history,
+        "stats": _cli_stats,
+        "plan": _cli_plan,
+        "serve": _cli_serve,
+        "gc": _cli_gc,
+    }
+    return handlers[args.command](args)
+
+
 # ════════════════════════════════════════════════════
 # Entry Point
 # ════════════════════════════════════════════════════
 
-def main():
-    root = tk.Tk()
+def main(argv=None):
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        sys.exit(cli(argv))
+
+    try:
+        root = tk.Tk()
+    except ImportError:
+        sys.exit(
+            "tkinter غير متاح — استخدم سطر الأوامر"
+            " (python github_downloader.py --help)"
+        )
     app = GitHubDownloader(root)
 
     # ──────────────────────────────────────
@@ -1476,6 +5227,15 @@ def main():
         - لو فيه تحميل → إلغاء + انتظار
           الـ thread يخلص + تنظيف → إغلاق
         """
+        if app.queue.running():
+            if not messagebox.askyesno(
+                "تأكيد الإغلاق",
+                "فيه مهام شغالة في الطابور،"
+                " هل تريد الإغلاق؟\n"
+                "(ستكمل عند التشغيل القادم)"
+            ):
+                return
+
         if (
             app.is_downloading
             and app._worker_thread is not None
@@ -1485,23 +5245,26 @@ def main():
                 "تأكيد الإغلاق",
                 "التحميل شغال، هل تريد الإغلاق؟"
             ):
-                # إرسال إشارة الإلغاء
-                app._cancel_event.set()
+                # الطابور يقف بعد آخر تأكيد بس (لا = يكمل شغال)
+                app.queue.shutdown()
+                # إلغاء فوري (قطع الاتصال) — عادةً أقل من 100ms
+                app.cancel()
+                app._worker_thread.join(0.1)
 
-                # انتظار الـ thread بـ polling
+                # انتظار الـ thread بـ polling لو لسه شغال
                 def wait_for_thread():
                     if app._worker_thread.is_alive():
-                        # لسه شغال → انتظر 200ms
                         root.after(
-                            200, wait_for_thread
+                            20, wait_for_thread
                         )
                     else:
                         # خلص → نظف وأغلق
                         app._cleanup_temp()
                         root.destroy()
 
-                root.after(200, wait_for_thread)
+                wait_for_thread()
         else:
+            app.queue.shutdown()
             app._cleanup_temp()
             root.destroy()
 
@@ -0,0 +1,179 @@
+import socket
+import weakref
+import ipaddress
+import threading
+import logging
+
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import parse_url
+
+logger = logging.getLogger("GitHubDownloader")
+
+# الـ secret المشترك بين العميل والـ cache proxy (serve --secret)
+CACHE_SECRET_HEADER = "X-GH-Cache-Secret"
+
+
+# ════════════════════════════════════════════════
+# Abortable HTTP Session
+# ════════════════════════════════════════════════
+#
+# _check_cancelled يشتغل بين الـ chunks بس: لو الاتصال
+# واقف، الـ thread محبوس في recv لحد timeout (30s).
+# هنا كل اتصال تفتحه الـ session يتسجل، و abort() يعمل
+# shutdown للـ sockets فالـ recv المحبوس يرجع فوراً
+# (سواء أثناء انتظار الـ headers أو قراءة الـ body).
+
+class _Tracker:
+    def __init__(self):
+        self._conns = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def add(self, conn):
+        with self._lock:
+            self._conns.add(conn)
+
+    def abort(self):
+        with self._lock:
+            conns = list(self._conns)
+        aborted = 0
+        for conn in conns:
+            sock = getattr(conn, "sock", None)
+            if sock is None:
+                continue
+            try:
+                _shutdown(sock)
+                aborted += 1
+            except (OSError, ValueError):
+                pass
+        return aborted
+
+
+def _shutdown(sock):
+    # socket.shutdown مباشرة (وليس SSLSocket.shutdown
+    # اللي يفك الـ TLS من تحت القارئ)
+    socket.socket.shutdown(sock, socket.SHUT_RDWR)
+
+
+def abort_response(resp):
+    """
+    قطع اتصال استجابة واحدة (stream) من thread آخر —
+    القراءة المحبوسة فيها ترجع بخطأ فوراً. True لو نجح.
+    """
+    raw = getattr(resp, "raw", None)
+    conn = getattr(raw, "_connection", None)
+    sock = getattr(conn, "sock", None)
+    if sock is None:
+        try:
+            sock = raw._fp.fp.raw._sock
+        except AttributeError:
+            return False
+    try:
+        _shutdown(sock)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def _tracking_pool(base, tracker):
+    class Pool(base):
+        def _new_conn(self):
+            conn = super()._new_conn()
+            tracker.add(conn)
+            return conn
+    return Pool
+
+
+class AbortableAdapter(HTTPAdapter):
+    """HTTPAdapter يسجل اتصالاته ليقطعها abort() من أي thread"""
+
+    def __init__(self, *args, **kwargs):
+        self.tracker = _Tracker()
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _tracking_pool(HTTPConnectionPool, self.tracker),
+            "https": _tracking_pool(
+                HTTPSConnectionPool, self.tracker
+            ),
+        }
+
+    def abort(self):
+        return self.tracker.abort()
+
+
+class ProxyAdapter(AbortableAdapter):
+    """
+    توجيه طلبات GitHub لـ cache proxy على الشبكة المحلية
+    (serve): api.github.com → <proxy>/api و github.com → <proxy>/web.
+    git smart HTTP (.git/) يروح لـ GitHub مباشرة.
+    التوكن ما يتبعتش لـ proxy بـ http على الشبكة (مكشوف):
+    https أو loopback بس — غير كده الطلب يروح بدون توكن.
+    """
+
+    ROUTES = (
+        ("https://api.github.com/", "/api/"),
+        ("https://github.com/", "/web/"),
+    )
+
+    def __init__(self, proxy, secret=None, *args, **kwargs):
+        self.proxy = proxy.rstrip("/")
+        self.secret = secret
+        self.send_auth = _secure_proxy(self.proxy)
+        self._warned = False
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        for prefix, route in self.ROUTES:
+            if request.url.startswith(prefix):
+                path = request.url[len(prefix):]
+                if ".git/" not in path.split("?", 1)[0]:
+                    request.url = self.proxy + route + path
+                    self._prepare(request)
+                break
+        return super().send(request, **kwargs)
+
+    def _prepare(self, request):
+        if self.secret:
+            request.headers[CACHE_SECRET_HEADER] = self.secret
+        if self.send_auth:
+            return
+        if request.headers.pop("Authorization", None) and \
+                not self._warned:
+            self._warned = True
+            logger.warning(
+                "⚠️ GH_CACHE_PROXY بـ http على الشبكة: "
+                "التوكن مش هيتبعت (استخدم https)"
+            )
+
+
+def _secure_proxy(proxy):
+    """https أو loopback — يتبعت له Authorization"""
+    url = parse_url(proxy)
+    if url.scheme == "https":
+        return True
+    host = (url.host or "").strip("[]")
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def install(session, proxy=None, secret=None):
+    """
+    تركيب الـ adapter على session — يرجع دالة abort().
+    proxy: رابط cache proxy (GH_CACHE_PROXY) لطلبات GitHub.
+    secret: الـ secret بتاع الـ proxy (GH_CACHE_SECRET).
+    """
+    adapter = AbortableAdapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if proxy:
+        routed = ProxyAdapter(proxy, secret)
+        for prefix, _ in ProxyAdapter.ROUTES:
+            session.mount(prefix, routed)
+    return adapter.abort
@@ -0,0 +1,603 @@
+import os
+import json
+import threading
+import time
+import uuid
+import logging
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+logger = logging.getLogger("GitHubDownloader")
+
+
+# ════════════════════════════════════════════════
+# Queue Model (بدون واجهة)
+# ════════════════════════════════════════════════
+
+class QueueJob:
+    """مهمة واحدة في الطابور"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    # الحقول المحفوظة على القرص
+    PERSISTED = (
+        "id", "url", "save", "state", "priority",
+        "error", "dest", "files", "added", "limits",
+    )
+
+    PRIORITIES = ("high", "normal", "low")
+
+    def __init__(
+        self, url, save, job_id=None, priority="normal", limits=None
+    ):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.url = url
+        self.save = save
+        self.priority = priority
+        # {"max_files": N, "max_size": "50G"} — حدود هذه المهمة فقط
+        self.limits = dict(limits or {})
+        self.state = self.QUEUED
+        self.error = ""
+        self.dest = ""
+        self.files = 0
+        self.added = time.time()
+
+        # ─── حالة التشغيل (غير محفوظة) ───
+        self.progress = 0.0
+        self.speed = 0.0
+        self.status = ""
+        self.engine = None
+        self.thread = None
+        self.cancel_requested = False
+        self.version = 0  # يزيد مع كل تغيير لتحديث الواجهة
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.PERSISTED}
+
+    @classmethod
+    def from_dict(cls, data):
+        job = cls(data["url"], data["save"], data.get("id"))
+        for key in cls.PERSISTED:
+            if key in data:
+                setattr(job, key, data[key])
+        # مهمة كانت شغالة وقت الإغلاق → ترجع للطابور
+        if job.state == cls.RUNNING:
+            job.state = cls.QUEUED
+        return job
+
+
+class DownloadQueue:
+    """
+    طابور تحميل متعدد المهام:
+    - تشغيل متوازي بحد أقصى قابل للتعديل
+    - تقدم وسرعة وحالة لكل مهمة
+    - إلغاء / إعادة محاولة لمهمة واحدة
+    - حفظ الطابور على القرص واسترجاعه بعد إعادة التشغيل
+
+    engine_factory(on_event) يرجع محرك تحميل بدون واجهة
+    (GitHubDownloader(root=None)).
+    """
+
+    DEFAULT_CONCURRENCY = 2
+    MAX_CONCURRENCY = 8
+
+    def __init__(self, path, engine_factory):
+        self.path = path
+        self._factory = engine_factory
+        self._lock = threading.RLock()
+        self.jobs = []
+        self.concurrency = self.DEFAULT_CONCURRENCY
+        # الطابور المسترجع يبدأ متوقفاً حتى يضغط المستخدم تشغيل
+        self.paused = False
+        self._closing = False
+        self._load()
+
+    # ─── Persistence ───
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cannot load queue: {e}")
+            return
+
+        self.concurrency = int(
+            data.get("concurrency", self.concurrency)
+        )
+        self.jobs = [
+            QueueJob.from_dict(j)
+            for j in data.get("jobs", [])
+        ]
+        self.paused = any(
+            j.state == QueueJob.QUEUED for j in self.jobs
+        )
+
+    def save(self):
+        """حفظ ذري (ملف مؤقت + replace)"""
+        with self._lock:
+            data = {
+                "concurrency": self.concurrency,
+                "jobs": [j.to_dict() for j in self.jobs],
+            }
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Cannot save queue: {e}")
+
+    # ─── Operations ───
+
+    def add(self, urls, save, priority="normal", limits=None):
+        """إضافة رابط أو أكثر (limits: حدود الحماية لهذه المهام)"""
+        with self._lock:
+            for url in urls:
+                url = url.strip()
+                if url:
+                    self.jobs.append(QueueJob(
+                        url, save, priority=priority, limits=limits
+                    ))
+        self.save()
+        self._pump()
+
+    def get(self, job_id):
+        with self._lock:
+            for job in self.jobs:
+                if job.id == job_id:
+                    return job
+        return None
+
+    def cancel(self, job_id):
+        """إلغاء مهمة (شغالة أو منتظرة)"""
+        with self._lock:
+            job = self.get(job_id)
+            if job is None:
+                return
+            if job.state == QueueJob.RUNNING:
+                self._request_cancel(job)
+            elif job.state == QueueJob.QUEUED:
+                self._set_state(job, QueueJob.CANCELLED)
+        self.save()
+
+    def retry(self, job_id):
+        """إعادة مهمة فاشلة أو ملغاة للطابور"""
+        with self._lock:
+            job = self.get(job_id)
+            if job is None or job.state in (
+                QueueJob.RUNNING, QueueJob.QUEUED
+            ):
+                return
+            job.error = ""
+            job.progress = 0.0
+            job.speed = 0.0
+            job.status = ""
+            self._set_state(job, QueueJob.QUEUED)
+        self.save()
+        self._pump()
+
+    def set_priority(self, job_id, priority):
+        """تغيير الأولوية — يسري فوراً على المهمة الشغالة"""
+        if priority not in QueueJob.PRIORITIES:
+            return
+        with self._lock:
+            job = self.get(job_id)
+            if job is None:
+                return
+            job.priority = priority
+            job.version += 1
+            if job.engine is not None:
+                job.engine.set_priority(priority)
+        self.save()
+
+    def remove(self, job_id):
+        """حذف مهمة غير شغالة من القائمة"""
+        with self._lock:
+            job = self.get(job_id)
+            if job is None or job.state == QueueJob.RUNNING:
+                return
+            self.jobs.remove(job)
+        self.save()
+
+    def clear_finished(self):
+        with self._lock:
+            self.jobs = [
+                j for j in self.jobs
+                if j.state not in (
+                    QueueJob.DONE, QueueJob.CANCELLED
+                )
+            ]
+        self.save()
+
+    def set_concurrency(self, n):
+        with self._lock:
+            self.concurrency = max(
+                1, min(int(n), self.MAX_CONCURRENCY)
+            )
+        self.save()
+        self._pump()
+
+    def set_paused(self, paused):
+        self.paused = paused
+        if not paused:
+            self._pump()
+
+    def running(self):
+        with self._lock:
+            return [
+                j for j in self.jobs
+                if j.state == QueueJob.RUNNING
+            ]
+
+    def shutdown(self, timeout=5.0):
+        """
+        إيقاف كل المهام عند إغلاق البرنامج.
+        المهام الشغالة تُحفظ كـ queued لتكمل لاحقاً.
+        """
+        self.paused = True
+        self._closing = True
+        running = self.running()
+        for job in running:
+            self._request_cancel(job)
+        deadline = time.time() + timeout
+        for job in running:
+            if job.thread:
+                job.thread.join(
+                    max(0, deadline - time.time())
+                )
+        with self._lock:
+            for job in running:
+                job.state = QueueJob.QUEUED
+        self.save()
+
+    # ─── Scheduling ───
+
+    @staticmethod
+    def _request_cancel(job):
+        job.cancel_requested = True
+        engine = job.engine
+        if engine is not None:
+            engine.cancel()
+
+    def _set_state(self, job, state):
+        job.state = state
+        job.version += 1
+
+    def _pump(self):
+        """تشغيل مهام جديدة حتى الحد الأقصى"""
+        if self.paused:
+            return
+        with self._lock:
+            active = len(self.running())
+            # الأولوية الأعلى تبدأ أولاً ثم بترتيب الإضافة
+            order = sorted(
+                self.jobs,
+                key=lambda j: QueueJob.PRIORITIES.index(
+                    j.priority
+                ) if j.priority in QueueJob.PRIORITIES else 1
+            )
+            for job in order:
+                if active >= self.concurrency:
+                    break
+                if job.state != QueueJob.QUEUED:
+                    continue
+                self._set_state(job, QueueJob.RUNNING)
+                job.cancel_requested = False
+                job.thread = threading.Thread(
+                    target=self._run, args=(job,),
+                    daemon=True
+                )
+                job.thread.start()
+                active += 1
+
+    def _run(self, job):
+        """Worker thread لمهمة واحدة"""
+        def on_event(kind, *args):
+            self._on_event(job, kind, *args)
+
+        try:
+            engine = self._factory(on_event)
+            engine.set_priority(job.priority)
+            job.engine = engine
+            if job.cancel_requested:
+                engine.cancel()
+            if job.limits:
+                engine.set_limits(**job.limits)
+            result = engine._run_job(job.url, job.save)
+        except Exception as e:
+            # المحرك ما اتعملش أو حدود محفوظة غير صالحة:
+            # المهمة تفشل بدل ما تفضل "running" للأبد
+            result = {"state": QueueJob.FAILED, "error": str(e)}
+        finally:
+            job.engine = None
+
+        job.speed = 0.0
+        job.error = result.get("error", "")
+        if result["state"] == QueueJob.DONE:
+            job.dest = result["dest"]
+            job.files = result["files"]
+            job.progress = 100.0
+
+        with self._lock:
+            # أثناء الإغلاق shutdown يحدد الحالة بنفسه
+            if not self._closing:
+                self._set_state(job, result["state"])
+        if not self._closing:
+            self.save()
+            self._pump()
+
+    @staticmethod
+    def _on_event(job, kind, *args):
+        """تحديث حالة المهمة — بدون أي استدعاء Tk"""
+        if kind == "progress":
+            job.progress = min(float(args[0]), 100.0)
+        elif kind == "status":
+            job.status = args[0]
+        elif kind == "transfer":
+            job.speed = args[2]
+        elif kind == "log" and args[1] == "error":
+            job.status = args[0]
+        else:
+            return
+        job.version += 1
+
+
+# ════════════════════════════════════════════════
+# Queue Panel (واجهة)
+# ════════════════════════════════════════════════
+
+class QueuePanel(tk.Toplevel):
+    """
+    لوحة الطابور: الواجهة تقرأ حالة المهام بـ polling
+    كل REFRESH_MS بدل ما الـ threads تنادي Tk مباشرة،
+    فتظل الواجهة سريعة حتى مع عدة تحميلات بأقصى سرعة.
+    """
+
+    REFRESH_MS = 300
+
+    STATE_LABELS = {
+        QueueJob.QUEUED: "⏳ منتظر",
+        QueueJob.RUNNING: "📥 شغال",
+        QueueJob.DONE: "✅ تم",
+        QueueJob.FAILED: "❌ فشل",
+        QueueJob.CANCELLED: "⛔ ملغي",
+    }
+
+    def __init__(self, app, default_save):
+        super().__init__(app.root)
+        self.app = app
+        self.queue = app.queue
+        self.default_save = default_save
+        self._seen = {}  # job_id → version المعروض
+
+        bg = "#1e1e2e"
+        self.title("📋 طابور التحميل")
+        self.geometry("820x460")
+        self.configure(bg=bg)
+
+        # ─── شريط الأدوات ───
+        bar = tk.Frame(self, bg=bg)
+        bar.pack(fill="x", padx=10, pady=8)
+
+        def button(text, cmd, color="#45475a"):
+            tk.Button(
+                bar, text=text, font=("Segoe UI", 10),
+                bg=color, fg="#cdd6f4", relief="flat",
+                cursor="hand2", command=cmd
+            ).pack(side="right", padx=3)
+
+        button("➕ إضافة", self._add_dialog, "#89b4fa")
+        button("⛔ إلغاء", self._cancel_selected)
+        button("🔄 إعادة", self._retry_selected)
+        button("🗑️ حذف", self._remove_selected)
+        button("🧹 مسح المنتهي", self.queue.clear_finished)
+
+        self.prio_var = tk.StringVar(value="normal")
+        prio = ttk.Combobox(
+            bar, textvariable=self.prio_var, width=7,
+            values=QueueJob.PRIORITIES, state="readonly"
+        )
+        prio.pack(side="right", padx=3)
+        prio.bind(
+            "<<ComboboxSelected>>",
+            lambda _e: self._prioritize_selected()
+        )
+        tk.Label(
+            bar, text="الأولوية:", font=("Segoe UI", 10),
+            fg="#cdd6f4", bg=bg
+        ).pack(side="right")
+
+        self.pause_btn = tk.Button(
+            bar, font=("Segoe UI", 10),
+            bg="#45475a", fg="#cdd6f4", relief="flat",
+            cursor="hand2", command=self._toggle_pause
+        )
+        self.pause_btn.pack(side="left", padx=3)
+
+        tk.Label(
+            bar, text="التوازي:", font=("Segoe UI", 10),
+            fg="#cdd6f4", bg=bg
+        ).pack(side="left", padx=(10, 3))
+
+        self.conc_var = tk.IntVar(value=self.queue.concurrency)
+        tk.Spinbox(
+            bar, from_=1, to=DownloadQueue.MAX_CONCURRENCY,
+            width=3, textvariable=self.conc_var,
+            command=lambda: self.queue.set_concurrency(
+                self.conc_var.get()
+            )
+        ).pack(side="left")
+
+        # ─── حد السرعة العام (يسري فوراً على كل المهام) ───
+        tk.Label(
+            bar, text="حد السرعة:", font=("Segoe UI", 10),
+            fg="#cdd6f4", bg=bg
+        ).pack(side="left", padx=(10, 3))
+        self.rate_var = tk.StringVar(
+            value=self._rate_text(self.app._limiter.rate)
+        )
+        rate = tk.Entry(
+            bar, textvariable=self.rate_var, width=7
+        )
+        rate.pack(side="left")
+        rate.bind("<Return>", lambda _e: self._apply_rate())
+
+        # ─── الجدول ───
+        cols = (
+            "repo", "state", "priority",
+            "progress", "speed", "status"
+        )
+        self.tree = ttk.Treeview(
+            self, columns=cols, show="headings",
+            selectmode="extended"
+        )
+        for col, text, width in (
+            ("repo", "المستودع", 220),
+            ("state", "الحالة", 90),
+            ("priority", "الأولوية", 60),
+            ("progress", "التقدم", 70),
+            ("speed", "السرعة", 90),
+            ("status", "تفاصيل", 260),
+        ):
+            self.tree.heading(col, text=text)
+            self.tree.column(col, width=width, anchor="w")
+        self.tree.pack(
+            fill="both", expand=True, padx=10, pady=(0, 10)
+        )
+
+        self._refresh()
+
+    # ─── Actions ───
+
+    def _selected(self):
+        return list(self.tree.selection())
+
+    def _add_dialog(self):
+        """نافذة لإضافة عدة روابط (رابط في كل سطر)"""
+        dlg = tk.Toplevel(self)
+        dlg.title("➕ إضافة روابط")
+        dlg.configure(bg="#1e1e2e")
+
+        text = tk.Text(
+            dlg, width=70, height=10,
+            font=("Consolas", 10),
+            bg="#313244", fg="#cdd6f4",
+            insertbackground="#cdd6f4"
+        )
+        text.pack(padx=10, pady=10)
+
+        save_var = tk.StringVar(value=self.default_save)
+        tk.Entry(
+            dlg, textvariable=save_var,
+            font=("Consolas", 10), width=70
+        ).pack(padx=10)
+
+        def ok():
+            save = save_var.get().strip()
+            if not save or not os.path.isdir(save):
+                messagebox.showerror(
+                    "خطأ", "مجلد الحفظ غير صحيح!",
+                    parent=dlg
+                )
+                return
+            urls = text.get("1.0", "end").splitlines()
+            self.queue.add(urls, save, self.prio_var.get())
+            dlg.destroy()
+
+        tk.Button(
+            dlg, text="إضافة", command=ok,
+            bg="#89b4fa", fg="#1e1e2e", relief="flat"
+        ).pack(pady=10)
+
+    def _cancel_selected(self):
+        for job_id in self._selected():
+            self.queue.cancel(job_id)
+
+    def _retry_selected(self):
+        for job_id in self._selected():
+            self.queue.retry(job_id)
+
+    def _remove_selected(self):
+        for job_id in self._selected():
+            self.queue.remove(job_id)
+
+    def _prioritize_selected(self):
+        for job_id in self._selected():
+            self.queue.set_priority(job_id, self.prio_var.get())
+
+    @staticmethod
+    def _rate_text(rate):
+        return f"{rate / 1024 ** 2:g}M" if rate else ""
+
+    def _apply_rate(self):
+        """تطبيق حد السرعة (مثل 500K أو 2M، فارغ = بدون حد)"""
+        from bandwidth import parse_rate
+        try:
+            rate = parse_rate(self.rate_var.get())
+        except ValueError:
+            messagebox.showerror(
+                "خطأ", "قيمة غير صالحة! مثال: 500K أو 2M",
+                parent=self
+            )
+            return
+        self.app._limiter.set_rate(rate)
+
+    def _toggle_pause(self):
+        self.queue.set_paused(not self.queue.paused)
+
+    # ─── Refresh ───
+
+    def _row(self, job):
+        owner, repo = self.app._parse_url(job.url)
+        name = f"{owner}/{repo}" if owner else job.url
+        speed = (
+            f"{self.app._format_size(int(job.speed))}/s"
+            if job.state == QueueJob.RUNNING and job.speed
+            else ""
+        )
+        detail = job.error or job.status or job.dest
+        return (
+            name,
+            self.STATE_LABELS.get(job.state, job.state),
+            job.priority,
+            f"{job.progress:.0f}%",
+            speed,
+            detail.replace("\n", " "),
+        )
+
+    def _refresh(self):
+        """مزامنة الجدول مع الطابور (الصفوف المتغيرة فقط)"""
+        if not self.winfo_exists():
+            return
+
+        with self.queue._lock:
+            jobs = list(self.queue.jobs)
+
+        ids = {j.id for j in jobs}
+        for item in self.tree.get_children():
+            if item not in ids:
+                self.tree.delete(item)
+                self._seen.pop(item, None)
+
+        for index, job in enumerate(jobs):
+            if not self.tree.exists(job.id):
+                self.tree.insert(
+                    "", index, iid=job.id,
+                    values=self._row(job)
+                )
+            elif self._seen.get(job.id) != job.version:
+                self.tree.item(job.id, values=self._row(job))
+            self._seen[job.id] = job.version
+
+        self.pause_btn.configure(
+            text="▶️ تشغيل" if self.queue.paused
+            else "⏸️ إيقاف"
+        )
+        self.after(self.REFRESH_MS, self._refresh)
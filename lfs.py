@@ -0,0 +1,208 @@
+import os
+import re
+import shutil
+import fnmatch
+import logging
+import threading
+
+logger = logging.getLogger("GitHubDownloader")
+
+
+# ════════════════════════════════════════════════
+# Git LFS
+# ════════════════════════════════════════════════
+#
+# الأرشيف فيه pointer صغير بدل الملف الحقيقي:
+#   version https://git-lfs.github.com/spec/v1
+#   oid sha256:<64 hex>
+#   size <bytes>
+# الـ pointers تتلقط أثناء فك الضغط (أي ملف <= 1 KB)، والـ
+# objects تتجاب بـ batch API ثم تتحمل بالتوازي في cache مشترك
+# بين المستودعات (objects/<oid[:2]>/<oid[2:4]>/<oid> زي git-lfs)،
+# وكل pointer يتستبدل بالملف الحقيقي بـ os.replace (ذري).
+
+POINTER_MAX = 1024  # الـ spec: الـ pointer أصغر من 1024 بايت
+# version (43) + oid (76) + "size N\n" (7+): أصغر من كده مش pointer
+POINTER_MIN = 126
+BATCH_SIZE = 100  # أقصى objects في طلب batch واحد
+MEDIA_TYPE = "application/vnd.git-lfs+json"
+
+_SPEC = b"version https://git-lfs.github.com/spec/v1\n"
+_OID = re.compile(rb"^oid sha256:([0-9a-f]{64})$")
+_SIZE = re.compile(rb"^size (\d+)$")
+
+
+class LFSError(Exception):
+    """فشل batch API أو object مرفوض من الخادم"""
+
+
+def parse_pointer(data):
+    """(oid, size) لو data هي LFS pointer صالح — وإلا None"""
+    if len(data) >= POINTER_MAX or not data.startswith(_SPEC):
+        return None
+    oid = size = None
+    for line in data.splitlines()[1:]:
+        m = _OID.match(line)
+        if m:
+            oid = m.group(1).decode()
+            continue
+        m = _SIZE.match(line)
+        if m:
+            size = int(m.group(1))
+    if oid is None or size is None:
+        return None
+    return oid, size
+
+
+def read_pointer(path):
+    """parse_pointer لملف على القرص (OSError = مش pointer)"""
+    try:
+        with open(path, "rb") as f:
+            return parse_pointer(f.read(POINTER_MAX))
+    except OSError:
+        return None
+
+
+# ─── .gitattributes ───
+
+def tracked_patterns(root):
+    """أنماط filter=lfs من .gitattributes في جذر الشجرة"""
+    patterns = []
+    try:
+        with open(
+            os.path.join(root, ".gitattributes"),
+            encoding="utf-8", errors="replace"
+        ) as f:
+            for line in f:
+                parts = line.split()
+                if (
+                    len(parts) > 1 and not parts[0].startswith("#")
+                    and "filter=lfs" in parts[1:]
+                ):
+                    patterns.append(parts[0])
+    except OSError:
+        pass
+    return patterns
+
+
+def is_tracked(rel, patterns):
+    """
+    هل المسار متتبع بـ LFS؟ نمط بدون / يطابق الاسم في أي
+    مستوى، ونمط فيه / يطابق المسار من الجذر (زي git).
+    """
+    name = rel.rsplit("/", 1)[-1]
+    for pattern in patterns:
+        if "/" in pattern.rstrip("/"):
+            if fnmatch.fnmatchcase(rel, pattern.lstrip("/")):
+                return True
+        elif fnmatch.fnmatchcase(name, pattern):
+            return True
+    return False
+
+
+# ─── Batch API ───
+
+def batch(session, repo_url, objects, auth=None):
+    """
+    طلب روابط التحميل: objects = {oid: size}.
+    يرجع {oid: action dict ("href" و"header")} و
+    {oid: رسالة خطأ} للـ objects المرفوضة.
+    يرمي LFSError لو الطلب نفسه فشل.
+    """
+    url = f"{repo_url}/info/lfs/objects/batch"
+    actions, errors = {}, {}
+    items = sorted(objects.items())
+    for i in range(0, len(items), BATCH_SIZE):
+        r = session.post(
+            url,
+            json={
+                "operation": "download",
+                "transfers": ["basic"],
+                "objects": [
+                    {"oid": oid, "size": size}
+                    for oid, size in items[i:i + BATCH_SIZE]
+                ],
+                "hash_algo": "sha256",
+            },
+            headers={"Accept": MEDIA_TYPE, "Content-Type": MEDIA_TYPE},
+            auth=auth, timeout=30
+        )
+        if r.status_code != 200:
+            try:
+                message = r.json().get("message", "")
+            except ValueError:
+                message = ""
+            raise LFSError(
+                f"batch API: HTTP {r.status_code} {message}".strip()
+            )
+        try:
+            response = r.json()
+        except ValueError as e:
+            raise LFSError(f"batch API: رد غير صالح ({e})")
+        for obj in response.get("objects", []):
+            oid = obj.get("oid")
+            if oid not in objects:
+                continue
+            if obj.get("error"):
+                errors[oid] = obj["error"].get("message", "error")
+                continue
+            action = (obj.get("actions") or {}).get("download")
+            if not action or not action.get("href"):
+                errors[oid] = "no download action"
+                continue
+            actions[oid] = action
+    for oid in objects:
+        if oid not in actions and oid not in errors:
+            errors[oid] = "missing from batch response"
+    return actions, errors
+
+
+# ─── Object Cache ───
+
+class LFSCache:
+    """
+    objects مفهرسة بالـ OID (SHA-256 المحتوى) مشتركة بين
+    كل المستودعات: نفس الملف في 10 مستودعات = تحميل واحد.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.objects_dir = os.path.join(self.root, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def object_path(self, oid):
+        return os.path.join(self.objects_dir, oid[:2], oid[2:4], oid)
+
+    def has(self, oid, size):
+        try:
+            return os.path.getsize(self.object_path(oid)) == size
+        except OSError:
+            return False
+
+    def commit(self, path, oid):
+        """نقل ملف متحقق منه (SHA-256 = oid) إلى الـ cache"""
+        obj = self.object_path(oid)
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+        with self._lock:
+            if os.path.exists(obj):
+                os.remove(path)  # thread / عملية سبقتنا
+            else:
+                os.replace(path, obj)
+        return obj
+
+    def materialize(self, oid, target):
+        """
+        استبدال الـ pointer بالمحتوى: نسخة مستقلة (مش hardlink،
+        تعديل الملف ما يبوظش الـ cache) ثم os.replace ذري.
+        """
+        tmp = f"{target}.lfs-{os.getpid()}-{threading.get_ident()}"
+        try:
+            shutil.copyfile(self.object_path(oid), tmp)
+            os.replace(tmp, target)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
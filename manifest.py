@@ -0,0 +1,290 @@
+import os
+import mmap
+import sqlite3
+import hashlib
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from accel import hash_file
+
+logger = logging.getLogger("GitHubDownloader")
+
+
+# ════════════════════════════════════════════════
+# Per-file Manifest
+# ════════════════════════════════════════════════
+#
+# ملف نصي بجانب التقرير، سطر لكل ملف:
+#   sha256 <TAB> size <TAB> mtime_ns <TAB> path
+# مرتب بالمسار، يُكتب ويُقرأ سطراً بسطر (بدون تحميل كامل).
+
+MANIFEST_FILE = "_manifest.tsv"
+HEADER = "# gh-manifest v1 sha256\tsize\tmtime_ns\tpath"
+
+# ملفات الأداة نفسها داخل المجلد (code_index.INDEX_FILE)
+SKIP_NAMES = ("_download_report.json", MANIFEST_FILE, "_search.idx")
+
+MMAP_THRESHOLD = 8 * 1024 * 1024
+
+
+def _escape(path):
+    return (
+        path.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+    )
+
+
+def _unescape(text):
+    out = []
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if c == "\\" and i + 1 < len(text):
+            nxt = text[i + 1]
+            out.append({"t": "\t", "n": "\n"}.get(nxt, nxt))
+            i += 2
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out)
+
+
+def hash_path(path, size=None):
+    """
+    SHA-256 لملف: mmap للملفات الكبيرة (بدون نسخ في
+    الذاكرة)، وقراءة مباشرة للصغيرة. hashlib يحرر
+    الـ GIL أثناء الحساب فالـ threads تتوازى فعلاً.
+    """
+    if size is None:
+        size = os.path.getsize(path)
+    if size < MMAP_THRESHOLD:
+        # readinto في buffer واحد (بدون bytes جديدة لكل جزء)
+        return hash_file(path).hexdigest()
+    with open(path, "rb") as f:
+        with mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm:
+            return hashlib.sha256(mm).hexdigest()
+
+
+def _walk(root):
+    """(rel_path, os.stat_result) لكل ملف عادي — مرتبة"""
+    entries = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in filenames:
+            if dirpath == root and name in SKIP_NAMES:
+                continue
+            full = os.path.join(dirpath, name)
+            try:
+                st = os.lstat(full)
+            except OSError:
+                continue
+            if not os.path.isfile(full) or os.path.islink(full):
+                continue
+            rel = os.path.relpath(full, root).replace("\\", "/")
+            entries.append((rel, st))
+    entries.sort()
+    return entries
+
+
+class DigestSpill:
+    """
+    SHA256 المحسوبة أثناء فك الضغط — على القرص (sqlite مؤقت)
+    بدل dict في الذاكرة: أرشيف بمليون عضو ما يكبرش الذاكرة.
+    يُقرأ مرتب بالمسار لـ build(known=...) ثم close() تمسحه.
+    """
+
+    BATCH = 1000
+
+    def __init__(self, directory=None):
+        fd, self.path = tempfile.mkstemp(
+            prefix="gh_digests_", suffix=".db", dir=directory
+        )
+        os.close(fd)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute(
+            "CREATE TABLE digests (rel TEXT PRIMARY KEY,"
+            " size INTEGER, mtime_ns INTEGER, sha256 TEXT)"
+        )
+        self._pending = []
+
+    def add(self, rel, size, mtime_ns, sha256):
+        self._pending.append((rel, size, mtime_ns, sha256))
+        if len(self._pending) >= self.BATCH:
+            self._flush()
+
+    def _flush(self):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?)",
+            self._pending
+        )
+        self._pending = []
+
+    def sorted(self):
+        """(rel, size, mtime_ns, sha256) مرتبة بالمسار (ترتيب _walk)"""
+        self._flush()
+        # BINARY = ترتيب bytes الـ UTF-8 = ترتيب code points
+        return self._db.execute(
+            "SELECT rel, size, mtime_ns, sha256 FROM digests"
+            " ORDER BY rel"
+        )
+
+    def close(self):
+        self._db.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def _workers(workers):
+    return max(1, workers or min(32, (os.cpu_count() or 1) * 2))
+
+
+def build(root, workers=None, check=None, known=None):
+    """
+    بناء الـ manifest لمجلد وكتابته.
+    check(): يُستدعى بين الملفات (للإلغاء).
+    known: (rel, size, mtime_ns, sha256) مرتبة بالمسار، محسوبة
+      أثناء الكتابة (DigestSpill.sorted()) — تُستخدم لو الحجم
+      و mtime لسه مطابقين، والباقي يتحسب.
+    يرجع (عدد الملفات, إجمالي الحجم, sha256 للـ manifest).
+    """
+    entries = _walk(root)
+
+    def tasks():
+        # merge بين قائمتين مرتبتين: بدون تحميل known في الذاكرة
+        rows = iter(known or ())
+        row = next(rows, None)
+        for rel, st in entries:
+            while row is not None and row[0] < rel:
+                row = next(rows, None)
+            if row is not None and row[0] == rel and (
+                row[1], row[2]
+            ) == (st.st_size, st.st_mtime_ns):
+                yield rel, st, row[3]
+            else:
+                yield rel, st, None
+
+    def digest(task):
+        rel, st, cached = task
+        if cached is not None:
+            return cached
+        if check is not None:
+            check()
+        return hash_path(os.path.join(root, rel), st.st_size)
+
+    with ThreadPoolExecutor(max_workers=_workers(workers)) as pool:
+        digests = pool.map(digest, tasks())
+
+        path = os.path.join(root, MANIFEST_FILE)
+        tmp = path + ".tmp"
+        total = 0
+        with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+            f.write(HEADER + "\n")
+            for (rel, st), sha in zip(entries, digests):
+                f.write(
+                    f"{sha}\t{st.st_size}\t{st.st_mtime_ns}"
+                    f"\t{_escape(rel)}\n"
+                )
+                total += st.st_size
+        os.replace(tmp, path)
+
+    return len(entries), total, hash_path(path)
+
+
+def read(path):
+    """قراءة الـ manifest سطراً بسطر: (rel, size, mtime_ns, sha256)"""
+    with open(path, "r", encoding="utf-8", newline="\n") as f:
+        header = f.readline().rstrip("\n")
+        if not header.startswith("# gh-manifest v1"):
+            raise ValueError(f"not a manifest: {path}")
+        for line in f:
+            parts = line.rstrip("\n").split("\t", 3)
+            if len(parts) != 4:
+                raise ValueError(f"bad manifest line: {line!r}")
+            yield (
+                _unescape(parts[3]), int(parts[1]),
+                int(parts[2]), parts[0]
+            )
+
+
+# ════════════════════════════════════════════════
+# Verify
+# ════════════════════════════════════════════════
+
+def verify(root, workers=None, quick=False, on_progress=None):
+    """
+    التحقق من شجرة مقابل الـ manifest الخاص بها:
+    - stat أولاً: ملف ناقص أو حجم مختلف يفشل بدون hashing
+    - quick: الحجم + mtime مطابقين → تخطي الـ hashing
+    - الباقي hashing متوازي (mmap للملفات الكبيرة)
+    on_progress(done, total) بعد كل ملف.
+    يرجع dict بالأعداد وقوائم المشاكل.
+    """
+    path = os.path.join(root, MANIFEST_FILE)
+    result = {
+        "files": 0, "bytes": 0, "ok": 0, "skipped": 0,
+        "missing": [], "size": [], "hash": [], "extra": [],
+    }
+    seen = set()
+    to_hash = []
+
+    for rel, size, mtime_ns, sha in read(path):
+        seen.add(rel)
+        result["files"] += 1
+        result["bytes"] += size
+        try:
+            st = os.stat(os.path.join(root, rel))
+        except OSError:
+            result["missing"].append(rel)
+            continue
+        if st.st_size != size:
+            result["size"].append(rel)
+        elif quick and st.st_mtime_ns == mtime_ns:
+            result["skipped"] += 1
+        else:
+            to_hash.append((rel, size, sha))
+
+    for rel, _ in _walk(root):
+        if rel not in seen:
+            result["extra"].append(rel)
+
+    done = [0]
+
+    def check(item):
+        rel, size, sha = item
+        try:
+            ok = hash_path(os.path.join(root, rel), size) == sha
+        except OSError:
+            ok = False
+        return rel, ok
+
+    with ThreadPoolExecutor(max_workers=_workers(workers)) as pool:
+        # الأكبر أولاً: توزيع أفضل للحمل على الـ threads
+        to_hash.sort(key=lambda item: item[1], reverse=True)
+        for rel, ok in pool.map(check, to_hash):
+            if ok:
+                result["ok"] += 1
+            else:
+                result["hash"].append(rel)
+            done[0] += 1
+            if on_progress is not None:
+                on_progress(done[0], len(to_hash))
+
+    result["ok"] += result["skipped"]
+    return result
+
+
+def find_trees(root):
+    """كل المجلدات اللي فيها manifest تحت root (للمرايا)"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        if MANIFEST_FILE in filenames:
+            dirnames[:] = []  # الشجرة نفسها ما فيهاش أشجار فرعية
+            yield dirpath
@@ -0,0 +1,316 @@
+import os
+import json
+import shutil
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger("GitHubDownloader")
+
+
+# ════════════════════════════════════════════════
+# Organization / User Mirroring
+# ════════════════════════════════════════════════
+
+class OrgMirror:
+    """
+    مرآة لكل مستودعات org أو user:
+    - سرد كل المستودعات عبر API مع الـ pagination
+    - فلترة (archived / forks / الحجم / آخر push)
+    - تخطي المستودعات اللي الـ commit بتاعها ما اتغيرش
+    - تحميل متوازي عبر نفس محرك GitHubDownloader
+    - تقرير ملخص واحد (_mirror_report.json)
+
+    التخطيط على القرص: <dest>/<owner>/<repo>
+    """
+
+    STATE_FILE = ".gh_mirror_state.json"
+    REPORT_FILE = "_mirror_report.json"
+    STAGING_DIR = ".staging"
+    PER_PAGE = 100
+
+    def __init__(
+        self, engine_factory, target, dest, jobs=4,
+        include_archived=False, include_forks=False,
+        max_size=0, pushed_since=None, on_event=None
+    ):
+        """
+        engine_factory() يرجع GitHubDownloader بدون واجهة.
+        target: "org:NAME" أو "user:NAME" أو "NAME".
+        max_size: بالـ bytes (0 = بدون حد)
+        pushed_since: "YYYY-MM-DD" (اختياري)
+        on_event(kind, *args): نفس أحداث المحرك للتقدم المجمّع
+        """
+        self._factory = engine_factory
+        kind, _, name = target.rpartition(":")
+        self.kind = kind or None
+        self.name = name
+        self.dest = os.path.abspath(dest)
+        self.jobs = max(1, jobs)
+        self.include_archived = include_archived
+        self.include_forks = include_forks
+        self.max_size = max_size
+        self.pushed_since = pushed_since
+        self._on_event = on_event
+
+        self._lock = threading.Lock()
+        self._engines = set()
+        self._cancel = threading.Event()
+        self.state = {}
+        self.results = []
+
+    # ─── Events ───
+
+    def _emit(self, kind, *args):
+        if self._on_event is not None:
+            self._on_event(kind, *args)
+
+    def _log(self, msg, level="info"):
+        logger.info(msg)
+        self._emit("log", msg, level)
+
+    def cancel(self):
+        """إلغاء كل التحميلات الجارية"""
+        self._cancel.set()
+        with self._lock:
+            for engine in self._engines:
+                engine.cancel()
+
+    # ─── Enumeration ───
+
+    def list_repos(self, session):
+        """
+        سرد كل المستودعات مع الـ pagination (Link: rel="next").
+        يجرب orgs ثم users لو النوع غير محدد.
+        """
+        kinds = [self.kind] if self.kind else ["org", "user"]
+        for kind in kinds:
+            base = "orgs" if kind == "org" else "users"
+            url = (
+                f"https://api.github.com/{base}/{self.name}/repos"
+                f"?per_page={self.PER_PAGE}"
+                f"&type={'all' if kind == 'org' else 'owner'}"
+            )
+            repos = []
+            while url:
+                r = session.get(url, timeout=30)
+                if r.status_code == 404 and not self.kind:
+                    repos = None
+                    break
+                if r.status_code == 403:
+                    raise RuntimeError(
+                        "GitHub API rate limit! جرب GITHUB_TOKEN"
+                    )
+                if r.status_code != 200:
+                    raise RuntimeError(
+                        f"خطأ HTTP {r.status_code} أثناء السرد"
+                    )
+                repos.extend(r.json())
+                url = r.links.get("next", {}).get("url")
+                self._emit(
+                    "status", f"🔍 سرد المستودعات: {len(repos)}"
+                )
+            if repos is not None:
+                return repos
+        raise RuntimeError(f"{self.name}: org/user غير موجود!")
+
+    def _filter(self, repo):
+        """يرجع سبب الاستبعاد أو None"""
+        if repo.get("archived") and not self.include_archived:
+            return "archived"
+        if repo.get("fork") and not self.include_forks:
+            return "fork"
+        # حقل size في API بالـ KB
+        if self.max_size and (
+            repo.get("size", 0) * 1024 > self.max_size
+        ):
+            return "size"
+        if self.pushed_since and (
+            (repo.get("pushed_at") or "") < self.pushed_since
+        ):
+            return "pushed"
+        if repo.get("disabled"):
+            return "disabled"
+        return None
+
+    # ─── State ───
+
+    def _state_path(self):
+        return os.path.join(self.dest, self.STATE_FILE)
+
+    def _load_state(self):
+        try:
+            with open(self._state_path(), encoding="utf-8") as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+
+    def _save_state(self):
+        # الكتابة والـ replace تحت القفل: الـ workers بيشتركوا
+        # في نفس الـ .tmp، ونسخة أقدم ما تغطيش على أحدث
+        with self._lock:
+            tmp = self._state_path() + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, indent=2)
+            os.replace(tmp, self._state_path())
+
+    # ─── Run ───
+
+    def run(self):
+        """تشغيل المرآة كاملة — يرجع ملخص التقرير"""
+        os.makedirs(self.dest, exist_ok=True)
+        self._load_state()
+        started = time.time()
+
+        lister = self._factory()
+        repos = self.list_repos(lister.session)
+        selected = []
+        excluded = {}
+        for repo in repos:
+            reason = self._filter(repo)
+            if reason:
+                excluded[reason] = excluded.get(reason, 0) + 1
+            else:
+                selected.append(repo)
+
+        self._log(
+            f"🏢 {self.name}: {len(repos)} مستودع،"
+            f" {len(selected)} بعد الفلترة"
+            + (f" (مستبعد: {excluded})" if excluded else ""),
+            "info"
+        )
+
+        done = [0]
+
+        def finished(result):
+            with self._lock:
+                self.results.append(result)
+                done[0] += 1
+                n = done[0]
+            self._emit("progress", n / max(1, len(selected)) * 100)
+            self._emit(
+                "status",
+                f"🪞 {n}/{len(selected)}  {result['repo']}:"
+                f" {result['status']}"
+            )
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            futures = [
+                pool.submit(self._mirror_one, repo)
+                for repo in selected
+            ]
+            for future in as_completed(futures):
+                finished(future.result())
+
+        return self._write_report(
+            started, len(repos), excluded
+        )
+
+    def _mirror_one(self, repo):
+        """مرآة مستودع واحد (يعمل في thread)"""
+        full = repo["full_name"]
+        owner, name = full.split("/", 1)
+        result = {
+            "repo": full, "status": "failed", "commit": None,
+            "files": 0, "zip_size": 0, "seconds": 0.0,
+        }
+        if self._cancel.is_set():
+            result["status"] = "cancelled"
+            return result
+
+        engine = self._factory()
+        with self._lock:
+            self._engines.add(engine)
+        start = time.time()
+        try:
+            branch = repo.get("default_branch") or "main"
+            commit = engine._resolve_commit(owner, name, branch)
+            result["commit"] = commit
+            target = os.path.join(self.dest, owner, name)
+
+            prev = self.state.get(full, {})
+            if (
+                commit and prev.get("commit") == commit
+                and os.path.isdir(target)
+            ):
+                result["status"] = "unchanged"
+                return result
+
+            # ─── تحميل في staging ثم تبديل ذري ───
+            staging = os.path.join(
+                self.dest, owner, self.STAGING_DIR
+            )
+            os.makedirs(staging, exist_ok=True)
+            # فهرس البحث: الملفات اللي ما اتغيرتش تتنقل من القديم
+            engine.index_base = target if os.path.isdir(target) else None
+            job = engine._run_job(
+                f"https://github.com/{full}", staging,
+                commit or branch
+            )
+            if job["state"] != "done":
+                result["status"] = job["state"]
+                result["error"] = job.get("error", "")
+                return result
+
+            self._swap_into_place(job["dest"], target)
+            engine._move_dedup_tree(job["dest"], target)
+            engine._update_job_dest(target)
+            report = engine.last_report or {}
+            result.update(
+                status="updated" if prev else "new",
+                files=job["files"],
+                zip_size=report.get("zip_size", 0),
+            )
+            with self._lock:
+                self.state[full] = {
+                    "commit": commit,
+                    "branch": branch,
+                    "updated": time.strftime("%Y-%m-%d %H:%M:%S"),
+                }
+            self._save_state()
+            return result
+
+        except Exception as e:
+            logger.exception(f"Mirror failed: {full}")
+            result["error"] = f"{type(e).__name__}: {e}"
+            return result
+        finally:
+            result["seconds"] = round(time.time() - start, 2)
+            with self._lock:
+                self._engines.discard(engine)
+
+    @staticmethod
+    def _swap_into_place(new, target):
+        """استبدال النسخة القديمة بالجديدة بأقل فترة غياب"""
+        old = None
+        if os.path.exists(target):
+            old = target + ".old"
+            shutil.rmtree(old, ignore_errors=True)
+            os.replace(target, old)
+        os.replace(new, target)
+        if old:
+            shutil.rmtree(old, ignore_errors=True)
+
+    # ─── Report ───
+
+    def _write_report(self, started, listed, excluded):
+        counts = {}
+        for r in self.results:
+            counts[r["status"]] = counts.get(r["status"], 0) + 1
+
+        report = {
+            "target": f"{self.kind or 'auto'}:{self.name}",
+            "listed": listed,
+            "excluded": excluded,
+            "counts": counts,
+            "bytes": sum(r["zip_size"] for r in self.results),
+            "seconds": round(time.time() - started, 2),
+            "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "repos": sorted(self.results, key=lambda r: r["repo"]),
+            "tool": "GitHubDownloader/2.0",
+        }
+        path = os.path.join(self.dest, self.REPORT_FILE)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        return report
@@ -0,0 +1,195 @@
+import os
+import json
+import re
+import time
+import logging
+
+logger = logging.getLogger("GitHubDownloader")
+
+
+# ════════════════════════════════════════════════
+# Persistent Partial Downloads
+# ════════════════════════════════════════════════
+
+class PartialMeta:
+    """
+    بيانات ملف جزئي (.json بجانب الأرشيف):
+    الرابط، الـ commit، والـ ETag للتحقق بـ If-Range.
+    """
+
+    def __init__(self, path, data=None):
+        self.path = path
+        data = data or {}
+        self.url = data.get("url", "")
+        self.commit = data.get("commit", "")
+        self.etag = data.get("etag", "")
+        self.last_modified = data.get("last_modified", "")
+        self.expected = data.get("expected", 0)
+
+    @property
+    def validator(self):
+        """قيمة If-Range: ETag قوي أولاً ثم Last-Modified"""
+        if self.etag and not self.etag.startswith("W/"):
+            return self.etag
+        return self.last_modified
+
+    def save(self):
+        data = {
+            "url": self.url,
+            "commit": self.commit,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "expected": self.expected,
+            "updated": time.time(),
+        }
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Cannot save partial meta: {e}")
+
+
+class PartialStore:
+    """
+    مخزن ثابت للأرشيفات الجزئية، مفهرس بالمستودع والـ commit،
+    عشان الاستكمال يعيش بعد إعادة تشغيل العملية أو الجهاز.
+    """
+
+    MAX_AGE = 7 * 24 * 3600             # ثواني
+    MAX_TOTAL = 20 * 1024 * 1024 * 1024  # 20 GB
+
+    _UNSAFE = re.compile(r"[^A-Za-z0-9._-]+")
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, owner, repo, key, suffix=".zip"):
+        """مسار حتمي: owner__repo__key.zip"""
+        name = "__".join(
+            self._UNSAFE.sub("_", part)
+            for part in (owner, repo, key)
+        )
+        return os.path.join(self.root, name + suffix)
+
+    @staticmethod
+    def meta_path(path):
+        return path + ".json"
+
+    def load_meta(self, path):
+        """قراءة البيانات — أو PartialMeta فارغة"""
+        mpath = self.meta_path(path)
+        try:
+            with open(mpath, "r", encoding="utf-8") as f:
+                return PartialMeta(mpath, json.load(f))
+        except (OSError, ValueError):
+            return PartialMeta(mpath)
+
+    # ─── Locking ───
+
+    def acquire(self, path):
+        """
+        قفل ملف جزئي (O_EXCL) لمنع عمليتين من الكتابة فيه.
+        يرجع False لو عملية حية أخرى ماسكاه.
+        """
+        lock = path + ".lock"
+        for _ in range(2):
+            try:
+                fd = os.open(
+                    lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY
+                )
+            except FileExistsError:
+                if not self._is_stale_lock(lock):
+                    return False
+                try:
+                    os.remove(lock)
+                except OSError:
+                    return False
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(str(os.getpid()))
+            return True
+        return False
+
+    def release(self, path):
+        try:
+            os.remove(path + ".lock")
+        except OSError:
+            pass
+
+    @staticmethod
+    def _is_stale_lock(lock):
+        """القفل قديم لو صاحبه مات"""
+        try:
+            with open(lock, "r") as f:
+                pid = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return True
+        if pid <= 0:
+            return True
+        if os.name == "nt":
+            # بدون os.kill آمن على ويندوز: نعتمد على العمر
+            return time.time() - os.path.getmtime(lock) > 86400
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            return False
+        return False
+
+    # ─── Cleanup ───
+
+    def discard(self, path):
+        """حذف الأرشيف الجزئي وبياناته"""
+        for p in (path, self.meta_path(path)):
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Cannot remove {p}: {e}")
+
+    def gc(self, keep=(), max_age=None, max_total=None):
+        """
+        حذف الأرشيفات الجزئية القديمة:
+        - أقدم من max_age
+        - ثم الأقدم أولاً حتى يصبح المجموع <= max_total
+        الملفات المقفولة أو في keep لا تُلمس.
+        يرجع (عدد المحذوف, الحجم المحرر)
+        """
+        max_age = self.MAX_AGE if max_age is None else max_age
+        max_total = (
+            self.MAX_TOTAL if max_total is None else max_total
+        )
+        keep = {os.path.abspath(p) for p in keep}
+        now = time.time()
+
+        entries = []
+        for name in os.listdir(self.root):
+            if name.endswith((".json", ".lock", ".tmp")):
+                continue
+            path = os.path.join(self.root, name)
+            if path in keep or os.path.exists(path + ".lock"):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        freed = 0
+        for mtime, size, path in entries:
+            if now - mtime <= max_age and total <= max_total:
+                continue
+            self.discard(path)
+            total -= size
+            freed += size
+            removed += 1
+
+        return removed, freed
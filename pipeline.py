@@ -0,0 +1,132 @@
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+# ════════════════════════════════════════════════
+# Download Pipeline (network → disk / hash)
+# ════════════════════════════════════════════════
+#
+# حلقة التحميل كانت تقرأ ثم تكتب ثم تحسب SHA-256 بالترتيب:
+# لو القرص بطيء لحظياً، الـ socket ما يتقراش والـ TCP window
+# يقفل. هنا thread الشبكة يسلّم كل جزء لطابورين محدودين
+# (كاتب + hasher) ويرجع للقراءة فوراً. امتلاء أي طابور =
+# ضغط عكسي (put ينتظر)، والترتيب محفوظ (FIFO لكل مرحلة)
+# فالملف الجزئي دائماً بادئة صحيحة للاستكمال.
+
+class _Stage(threading.Thread):
+    def __init__(self, name, handle, depth):
+        super().__init__(name=f"pipeline-{name}", daemon=True)
+        self.handle = handle
+        self.queue = queue.Queue(depth)
+        self.error = None
+        self.busy = 0.0  # وقت العمل الفعلي (للإحصاء)
+        self._discard = False
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                return
+            if self._discard or self.error is not None:
+                continue
+            start = time.perf_counter()
+            try:
+                self.handle(item)
+            except BaseException as e:
+                self.error = e
+            self.busy += time.perf_counter() - start
+
+
+class DownloadPipeline:
+    """
+    put(chunk) من thread الشبكة → f.write و sha256.update
+    على threads منفصلة، كل واحدة بطابور depth جزء.
+    depth=0: تنفيذ مباشر في نفس الـ thread (السلوك القديم).
+    close() ينتظر تفريغ الطوابير ويرمي خطأ أي مرحلة؛
+    close(discard=True) يتخلى عن الأجزاء المنتظرة (إلغاء)
+    والملف يبقى بادئة سليمة.
+    check(): يُستدعى أثناء انتظار الضغط العكسي (للإلغاء).
+    discard_on: استثناءات تعني التخلي عند الخروج من with
+    (غيرها: تفريغ اللي وصل قبل تمرير الخطأ).
+    """
+
+    POLL = 0.1
+
+    def __init__(self, f, sha256, depth, check=None,
+                 discard_on=()):
+        self._check = check
+        self._discard_on = (KeyboardInterrupt,) + tuple(discard_on)
+        self._closed = False
+        self.blocked = 0.0  # وقت انتظار thread الشبكة
+        if depth <= 0:
+            self._stages = []
+            self._inline = (f.write, sha256.update)
+            return
+        self._inline = ()
+        self._stages = [
+            _Stage("write", f.write, depth),
+            _Stage("hash", sha256.update, depth),
+        ]
+        for stage in self._stages:
+            stage.start()
+
+    def put(self, chunk):
+        for handle in self._inline:
+            handle(chunk)
+        for stage in self._stages:
+            self._raise_error()
+            try:
+                stage.queue.put_nowait(chunk)
+                continue
+            except queue.Full:
+                pass
+            start = time.perf_counter()
+            while True:
+                if self._check is not None:
+                    self._check()
+                self._raise_error()
+                try:
+                    stage.queue.put(chunk, timeout=self.POLL)
+                    break
+                except queue.Full:
+                    pass
+            self.blocked += time.perf_counter() - start
+
+    def _raise_error(self):
+        for stage in self._stages:
+            if stage.error is not None:
+                raise stage.error
+
+    def close(self, discard=False):
+        if self._closed:
+            return
+        self._closed = True
+        for stage in self._stages:
+            stage._discard = discard
+            stage.queue.put(_DONE)  # يحترم الترتيب: بعد آخر جزء
+        for stage in self._stages:
+            stage.join()
+        if not discard:
+            self._raise_error()
+
+    def stats(self):
+        """{"write": s, "hash": s, "blocked": s} — أوقات كل مرحلة"""
+        times = {stage.name[9:]: stage.busy for stage in self._stages}
+        times["blocked"] = self.blocked
+        return times
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return
+        # خطأ الشبكة: نكمل كتابة اللي وصل (استكمال أطول)
+        try:
+            self.close(discard=issubclass(exc_type, self._discard_on))
+        except Exception:
+            pass  # الخطأ الأصلي أهم
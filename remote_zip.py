@@ -0,0 +1,293 @@
+import io
+import os
+import zipfile
+import logging
+
+from accel import inflate_backend
+
+logger = logging.getLogger("GitHubDownloader")
+
+
+# ════════════════════════════════════════════════
+# Remote ZIP (HTTP Range)
+# ════════════════════════════════════════════════
+#
+# الـ central directory في آخر الأرشيف: طلب Range لنهاية
+# الملف يكفي لمعرفة كل الأسماء والأحجام قبل أي تحميل،
+# وأي عضو ممكن يتجاب لوحده بـ Range لبياناته فقط.
+
+class RangeNotSupported(Exception):
+    """الخادم لا يدعم طلبات Range (أو الحجم غير معروف)"""
+    pass
+
+
+class HTTPRangeFile(io.RawIOBase):
+    """
+    ملف للقراءة فقط فوق HTTP Range — يكفي لـ zipfile.
+    أول طلب يجيب آخر TAIL_SIZE بايت (EOCD + غالباً كل
+    الـ central directory) ويحتفظ بيها في الذاكرة.
+    """
+
+    TAIL_SIZE = 64 * 1024
+    READAHEAD = 64 * 1024
+
+    def __init__(self, session, url, size=0, timeout=30):
+        super().__init__()
+        self.session = session
+        self.url = url
+        self.timeout = timeout
+        self.requests = 0
+        self._pos = 0
+        self._cache = (0, b"")  # (offset, data)
+
+        # ─── طلب النهاية: يحدد الحجم والدعم معاً ───
+        if size > 0:
+            tail = min(self.TAIL_SIZE, size)
+            resp = self._get(f"bytes={size - tail}-{size - 1}")
+        else:
+            resp = self._get(f"bytes=-{self.TAIL_SIZE}")
+        total = resp.headers.get(
+            "Content-Range", ""
+        ).rpartition("/")[2]
+        if not total.isdigit():
+            raise RangeNotSupported("Content-Range مفقود")
+        self.size = int(total)
+        data = resp.content
+        self._cache = (self.size - len(data), data)
+
+    def _get(self, byte_range, stream=False):
+        resp = self.session.get(
+            self.url, headers={"Range": byte_range},
+            timeout=self.timeout, stream=stream
+        )
+        self.requests += 1
+        if resp.status_code != 206:
+            resp.close()
+            raise RangeNotSupported(
+                f"HTTP {resp.status_code} بدل 206"
+            )
+        # تثبيت الرابط النهائي (تجنب redirect في كل طلب)
+        self.url = resp.url
+        return resp
+
+    def fetch(self, start, end):
+        """قراءة [start, end) بطلب واحد (بدون cache)"""
+        if end <= start:
+            return b""
+        return self._get(f"bytes={start}-{end - 1}").content
+
+    def stream(self, start, length, chunk_size=65536):
+        """بث [start, start+length) على أجزاء"""
+        if length <= 0:
+            return
+        resp = self._get(
+            f"bytes={start}-{start + length - 1}", stream=True
+        )
+        try:
+            for chunk in resp.iter_content(chunk_size):
+                if chunk:
+                    yield chunk
+        finally:
+            resp.close()
+
+    # ─── io.RawIOBase ───
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            self._pos = offset
+        elif whence == os.SEEK_CUR:
+            self._pos += offset
+        elif whence == os.SEEK_END:
+            self._pos = self.size + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        if self._pos < 0:
+            raise ValueError("negative seek position")
+        return self._pos
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self.size - self._pos
+        n = max(0, min(n, self.size - self._pos))
+        if n == 0:
+            return b""
+
+        start, data = self._cache
+        end = self._pos + n
+        if not (start <= self._pos and end <= start + len(data)):
+            fetch_end = min(
+                self.size, max(end, self._pos + self.READAHEAD)
+            )
+            data = self.fetch(self._pos, fetch_end)
+            start = self._pos
+            self._cache = (start, data)
+
+        chunk = data[self._pos - start:end - start]
+        self._pos += len(chunk)
+        return chunk
+
+    def readinto(self, b):
+        chunk = self.read(len(b))
+        b[:len(chunk)] = chunk
+        return len(chunk)
+
+
+class RemoteZip:
+    """
+    قراءة central directory لأرشيف ZIP بعيد وجلب أعضاء مفردة.
+    يرمي RangeNotSupported لو الخادم ما يدعمش Range.
+    """
+
+    LOCAL_HEADER = 30
+
+    def __init__(self, session, url, size=0):
+        from zip_index import ZipIndex
+        self.file = HTTPRangeFile(session, url, size)
+        # نفس الفهرس المضغوط بتاع الفك المحلي (مش ZipInfo
+        # لكل عضو) — الفحص عن بعد بنفس استهلاك الذاكرة
+        try:
+            self.index = ZipIndex(fileobj=self.file)
+        except zipfile.BadZipFile:
+            self.file.close()
+            raise
+
+    @property
+    def size(self):
+        return self.file.size
+
+    @property
+    def requests(self):
+        return self.file.requests
+
+    def names(self):
+        """أسماء الأعضاء كـ generator (لاكتشاف الجذر)"""
+        return self.index.names()
+
+    def infolist(self):
+        """ZipInfo لكل عضو — generator وليس قائمة كاملة"""
+        return self.index.infolist()
+
+    def close(self):
+        self.index.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def summary(self):
+        """أرقام الـ pre-flight: العدد، الأحجام، أعلى نسبة ضغط"""
+        index = self.index
+        files = total = compressed = 0
+        worst, max_ratio = None, 0
+        for i in range(len(index)):
+            if index.is_dir(i):
+                continue
+            size, csize = index.sizes(i)
+            files += 1
+            total += size
+            compressed += csize
+            ratio = size / max(1, csize)
+            if worst is None or ratio > max_ratio:
+                worst, max_ratio = i, ratio
+        return {
+            "entries": len(index),
+            "files": files,
+            "uncompressed": total,
+            "compressed": compressed,
+            "ratio": total / max(1, compressed),
+            "max_ratio": max_ratio,
+            "max_ratio_name": (
+                index.info(worst).filename
+                if worst is not None else None
+            ),
+            "archive_size": self.size,
+        }
+
+    def extract_member(self, info, out, check=None):
+        """
+        جلب عضو واحد بـ Range لبياناته فقط وكتابته في out
+        (مع فك الضغط والتحقق من CRC والحجم).
+        check(): بين الأجزاء (للإلغاء). يرجع الحجم.
+        """
+        if info.flag_bits & 0x1:
+            raise zipfile.BadZipFile(f"{info.filename}: مشفر")
+        # الـ header + الاسم المتوقع في طلب واحد
+        encoding = "utf-8" if info.flag_bits & 0x800 else "cp437"
+        expected = len(info.orig_filename.encode(encoding))
+        start = info.header_offset + self.LOCAL_HEADER
+        header = self.file.fetch(
+            info.header_offset, min(self.size, start + expected)
+        )
+        if (
+            len(header) < self.LOCAL_HEADER
+            or header[:4] != b"PK\x03\x04"
+        ):
+            raise zipfile.BadZipFile(
+                f"Bad local header: {info.filename}"
+            )
+        name_len = int.from_bytes(header[26:28], "little")
+        extra_len = int.from_bytes(header[28:30], "little")
+        # الاسم في الـ local header = الـ central directory
+        # (زي accel.DeflateMemberReader): offset مزيف يجيب عضو تاني
+        name = header[start - info.header_offset:][:name_len]
+        name = name.decode(encoding, "replace")
+        if name_len != expected or name != info.orig_filename:
+            raise zipfile.BadZipFile(
+                f"File name in directory {info.orig_filename!r}"
+                f" and header {name!r} differ."
+            )
+        data_start = start + name_len + extra_len
+
+        _, mod = inflate_backend()
+        if info.compress_type == zipfile.ZIP_DEFLATED:
+            d = mod.decompressobj(-15)
+        elif info.compress_type == zipfile.ZIP_STORED:
+            d = None
+        else:
+            raise zipfile.BadZipFile(
+                f"{info.filename}: ضغط غير مدعوم"
+                f" ({info.compress_type})"
+            )
+
+        crc = 0
+        size = 0
+        try:
+            for chunk in self.file.stream(
+                data_start, info.compress_size
+            ):
+                if check is not None:
+                    check()
+                if d is not None:
+                    chunk = d.decompress(chunk)
+                size += len(chunk)
+                if size > info.file_size:
+                    raise zipfile.BadZipFile(
+                        f"{info.filename}: أكبر من الحجم المعلن"
+                    )
+                crc = mod.crc32(chunk, crc)
+                out.write(chunk)
+            if d is not None:
+                tail = d.flush()
+                size += len(tail)
+                crc = mod.crc32(tail, crc)
+                out.write(tail)
+        except mod.error as e:
+            raise zipfile.BadZipFile(f"{info.filename}: {e}")
+
+        if size != info.file_size or crc != info.CRC:
+            raise zipfile.BadZipFile(
+                f"Bad CRC-32 / size for {info.filename!r}"
+            )
+        return size
@@ -0,0 +1,89 @@
+import os
+import re
+import logging
+
+logger = logging.getLogger("GitHubDownloader")
+
+
+# ════════════════════════════════════════════════
+# Git Submodules
+# ════════════════════════════════════════════════
+#
+# أرشيف GitHub (والـ checkout) فيه الـ submodule كـ gitlink:
+# مجلد فاضي + commit مثبت في شجرة الأب. الـ URL في .gitmodules
+# والـ commit من الشجرة (type "commit" في API أو mode 160000).
+# كل submodule على GitHub يتحمل بنفس مسار المستودع العادي
+# عند الـ commit المثبت بالظبط.
+
+GITMODULES = ".gitmodules"
+
+_SECTION = re.compile(r'^\[\s*submodule\s+"(.*)"\s*\]$')
+_GITHUB_URL = re.compile(
+    r"^(?:(?:https?|git|ssh)://(?:[^@/]+@)?github\.com(?::\d+)?/"
+    r"|[^@/]+@github\.com:)"
+    r"([^/]+)/([^/]+?)(?:\.git)?/?$",
+    re.IGNORECASE
+)
+
+
+def parse_gitmodules(root):
+    """
+    {path: url} من .gitmodules في جذر الشجرة
+    (صيغة git config: [submodule "name"] ثم key = value).
+    """
+    modules = {}
+    current = None
+    try:
+        with open(
+            os.path.join(root, GITMODULES),
+            encoding="utf-8", errors="replace"
+        ) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line[0] in "#;":
+                    continue
+                m = _SECTION.match(line)
+                if m:
+                    current = modules.setdefault(m.group(1), {})
+                    continue
+                if line.startswith("["):
+                    current = None  # قسم تاني (مش submodule)
+                    continue
+                if current is None or "=" not in line:
+                    continue
+                key, _, value = line.partition("=")
+                value = value.strip()
+                if len(value) > 1 and value[0] == value[-1] == '"':
+                    value = value[1:-1]
+                current[key.strip().lower()] = value
+    except OSError:
+        return {}
+    return {
+        m["path"].strip("/"): m["url"]
+        for m in modules.values()
+        if m.get("path") and m.get("url")
+    }
+
+
+def resolve_url(url, owner, repo):
+    """
+    (owner, repo) لـ submodule على GitHub — أو None لمستضيف آخر.
+    الـ URL النسبي (../other.git) بالنسبة لمستودع الأب زي git.
+    """
+    url = url.strip()
+    if url.startswith(("./", "../")):
+        parts = [owner, repo]
+        for part in url.split("/"):
+            if part == "..":
+                if not parts:
+                    return None
+                parts.pop()
+            elif part not in ("", "."):
+                parts.append(part)
+        if len(parts) != 2:
+            return None
+        url = f"https://github.com/{parts[0]}/{parts[1]}"
+    m = _GITHUB_URL.match(url)
+    if not m:
+        return None
+    return m.group(1), m.group(2)
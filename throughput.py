@@ -0,0 +1,127 @@
+import time
+import threading
+from collections import deque
+
+
+# ════════════════════════════════════════════════
+# Throughput Estimator + Stall Watchdog
+# ════════════════════════════════════════════════
+#
+# السرعة من بداية التحميل (bytes / elapsed) بطيئة الاستجابة:
+# بعد دقائق بسرعة عالية، هبوط الاتصال لـ "تنقيط" ما يبانش.
+# هنا نافذة منزلقة لآخر ثواني للعرض والـ ETA، ووقت انتظار
+# الشبكة لكل chunk يتسجل منفصلاً عشان الـ watchdog يحكم على
+# الشبكة نفسها (انتظار حد السرعة مش بطء في الاتصال).
+
+class ThroughputMeter:
+    """
+    add(n) بعد كل chunk، و begin_wait() قبل انتظار الشبكة.
+    rate(): bytes/s على آخر WINDOW ثانية (للعرض).
+    network_rate(span): bytes/s على آخر span ثانية من وقت
+    انتظار الشبكة الفعلي (للـ watchdog).
+    """
+
+    WINDOW = 5.0
+
+    def __init__(self, window=None):
+        self.window = window or self.WINDOW
+        self._lock = threading.Lock()
+        self._samples = deque()  # (t, bytes, wait_seconds)
+        self._start = time.monotonic()
+        self._waiting_since = None
+        self.total = 0
+
+    def begin_wait(self):
+        self._waiting_since = time.monotonic()
+
+    def add(self, n, now=None):
+        now = now or time.monotonic()
+        waited = (
+            now - self._waiting_since
+            if self._waiting_since is not None else 0.0
+        )
+        self._waiting_since = None
+        with self._lock:
+            self._samples.append((now, n, waited))
+            self.total += n
+            # نحتفظ بما يكفي للنافذة + نافذة الـ watchdog
+            while len(self._samples) > 4096:
+                self._samples.popleft()
+
+    def rate(self, now=None):
+        """السرعة على النافذة المنزلقة (bytes/s)"""
+        now = now or time.monotonic()
+        since = now - self.window
+        with self._lock:
+            n = sum(b for t, b, _ in self._samples if t >= since)
+        span = min(self.window, now - self._start)
+        return n / span if span > 0 else 0.0
+
+    def network_rate(self, span, now=None):
+        """
+        السرعة على آخر span ثانية من انتظار الشبكة
+        (شاملة الانتظار الجاري الآن). None لو الوقت المتراكم
+        أقل من span (بداية الاتصال).
+        """
+        now = now or time.monotonic()
+        waiting = self._waiting_since
+        busy = now - waiting if waiting is not None else 0.0
+        got = 0
+        with self._lock:
+            for _, n, waited in reversed(self._samples):
+                if busy >= span:
+                    break
+                busy += waited
+                got += n
+        if busy < span:
+            return None
+        return got / busy
+
+
+class StallWatchdog:
+    """
+    Thread يراقب meter: لو سرعة الشبكة أقل من min_rate
+    لمدة window ثانية → on_stall() مرة واحدة (قطع الاتصال).
+    """
+
+    def __init__(self, meter, min_rate, window, on_stall,
+                 interval=1.0):
+        self.meter = meter
+        self.min_rate = min_rate
+        self.window = window
+        self.on_stall = on_stall
+        self.interval = interval
+        self.stalled = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.min_rate <= 0 or self.window <= 0:
+            return self  # معطل
+        self._thread = threading.Thread(
+            target=self._run, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if (
+            self._thread is not None
+            and self._thread is not threading.current_thread()
+        ):
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rate = self.meter.network_rate(self.window)
+            if rate is not None and rate < self.min_rate:
+                self.stalled = True
+                self.on_stall(rate)
+                return
@@ -0,0 +1,246 @@
+import re
+import json
+import codecs
+import logging
+from array import array
+from bisect import bisect_left
+
+logger = logging.getLogger("GitHubDownloader")
+
+
+# ════════════════════════════════════════════════
+# Compact File Map
+# ════════════════════════════════════════════════
+#
+# قائمة ملفات الـ API لمستودع ضخم (مئات الآلاف من المسارات)
+# كـ dict of dicts تكلف مئات الـ MB. هنا كل ملف = مفتاح
+# 64-bit (رقم المجلد << 32 | رقم الاسم) + حجم + SHA ثنائي
+# (20 بايت) في arrays، وأجزاء المسارات مخزنة مرة واحدة.
+
+_SHA_SIZE = 20
+_NO_SHA = bytes(_SHA_SIZE)
+
+
+class TreeMap:
+    """
+    {path: (size, sha)} مضغوط للقراءة فقط بعد البناء.
+    add() أثناء البناء، والبحث بـ bisect على المفاتيح المرتبة.
+    """
+
+    def __init__(self):
+        self._dirs = {"": 0}
+        self._dir_names = [""]
+        self._names = {}
+        self._name_list = []
+        self._keys = array("Q")
+        self._sizes = array("Q")
+        self._shas = bytearray()
+        self._sorted = True
+        self.total_size = 0
+        # submodules: {path: commit SHA} (قليلة — dict عادي)
+        self.gitlinks = {}
+
+    # ─── البناء ───
+
+    def _intern_dir(self, path):
+        dir_id = self._dirs.get(path)
+        if dir_id is None:
+            dir_id = len(self._dir_names)
+            self._dirs[path] = dir_id
+            self._dir_names.append(path)
+        return dir_id
+
+    def _intern_name(self, name):
+        name_id = self._names.get(name)
+        if name_id is None:
+            name_id = len(self._name_list)
+            self._names[name] = name_id
+            self._name_list.append(name)
+        return name_id
+
+    def add(self, path, size, sha=""):
+        parent, _, name = path.rpartition("/")
+        key = (
+            self._intern_dir(parent) << 32
+            | self._intern_name(name)
+        )
+        keys = self._keys
+        if keys and key < keys[-1]:
+            self._sorted = False
+        keys.append(key)
+        size = size if size and size > 0 else 0
+        self._sizes.append(size)
+        self.total_size += size
+        try:
+            raw = bytes.fromhex(sha)
+        except (TypeError, ValueError):
+            raw = b""
+        self._shas += raw if len(raw) == _SHA_SIZE else _NO_SHA
+
+    def _freeze(self):
+        """ترتيب المفاتيح (مرة واحدة) قبل أول بحث"""
+        if self._sorted:
+            return
+        order = sorted(
+            range(len(self._keys)), key=self._keys.__getitem__
+        )
+        shas = self._shas
+        self._keys = array("Q", (self._keys[i] for i in order))
+        self._sizes = array("Q", (self._sizes[i] for i in order))
+        self._shas = bytearray(len(shas))
+        for new, old in enumerate(order):
+            start = old * _SHA_SIZE
+            self._shas[
+                new * _SHA_SIZE:(new + 1) * _SHA_SIZE
+            ] = shas[start:start + _SHA_SIZE]
+        self._sorted = True
+
+    # ─── البحث ───
+
+    def _index(self, path):
+        parent, _, name = path.rpartition("/")
+        dir_id = self._dirs.get(parent)
+        name_id = self._names.get(name)
+        if dir_id is None or name_id is None:
+            return -1
+        self._freeze()
+        key = dir_id << 32 | name_id
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+        return -1
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __bool__(self):
+        return len(self._keys) > 0
+
+    def __contains__(self, path):
+        return self._index(path) >= 0
+
+    def size(self, path, default=None):
+        i = self._index(path)
+        return self._sizes[i] if i >= 0 else default
+
+    def sha(self, path, default=None):
+        """SHA الـ blob كـ hex (أو default)"""
+        i = self._index(path)
+        if i < 0:
+            return default
+        raw = self._shas[i * _SHA_SIZE:(i + 1) * _SHA_SIZE]
+        return raw.hex() if raw != _NO_SHA else ""
+
+    def _path(self, key):
+        parent = self._dir_names[key >> 32]
+        name = self._name_list[key & 0xFFFFFFFF]
+        return f"{parent}/{name}" if parent else name
+
+    def __iter__(self):
+        self._freeze()
+        for key in self._keys:
+            yield self._path(key)
+
+    def items(self):
+        """(path, size) لكل ملف — مجمعة حسب المجلد"""
+        self._freeze()
+        for key, size in zip(self._keys, self._sizes):
+            yield self._path(key), size
+
+
+# ════════════════════════════════════════════════
+# Streaming Tree Parser
+# ════════════════════════════════════════════════
+#
+# استجابة git/trees?recursive=1:
+#   {"sha": ..., "url": ..., "tree": [{...}, ...], "truncated": ...}
+# عناصر "tree" تُفك واحداً واحداً بـ raw_decode من الـ chunks
+# بدون الاحتفاظ بالاستجابة كاملة ولا بقائمة dicts.
+
+_TREE_START = re.compile(r'"tree"\s*:\s*\[')
+_SKIP = " \t\r\n,"
+
+
+def _chunks_text(chunks):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def iter_tree(chunks, meta):
+    """
+    عناصر "tree" كـ dicts واحداً واحداً من bytes chunks.
+    meta: dict يتملأ بباقي الحقول (sha، truncated...)
+    بعد انتهاء التوليد. ValueError لو الـ JSON غير صالح.
+    """
+    decoder = json.JSONDecoder()
+    texts = _chunks_text(chunks)
+    buf = ""
+    head = None
+    for text in texts:
+        buf += text
+        m = _TREE_START.search(buf)
+        if m:
+            head = buf[:m.start()]
+            buf = buf[m.end():]
+            break
+    if head is None:
+        raise ValueError("no tree array in response")
+
+    pos = 0
+    done = False
+    while not done:
+        # ─── فك كل العناصر الكاملة في الـ buffer ───
+        while True:
+            while pos < len(buf) and buf[pos] in _SKIP:
+                pos += 1
+            if pos >= len(buf):
+                break
+            if buf[pos] == "]":
+                pos += 1
+                done = True
+                break
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # عنصر ناقص: محتاج بيانات أكتر
+            pos = end
+            yield item
+        if done:
+            break
+        buf = buf[pos:]
+        pos = 0
+        text = next(texts, None)
+        if text is None:
+            raise ValueError("truncated tree response")
+        buf += text
+
+    # ─── الباقي صغير: نفك الغلاف نفسه ───
+    tail = buf[pos:] + "".join(texts)
+    outer = json.loads(head + '"tree": []' + tail)
+    outer.pop("tree", None)
+    meta.update(outer)
+
+
+def load(chunks):
+    """
+    بناء TreeMap للـ blobs من استجابة الشجرة: (map, truncated)
+    + الـ submodules (type "commit") في map.gitlinks.
+    """
+    files = TreeMap()
+    meta = {}
+    for item in iter_tree(chunks, meta):
+        kind = item.get("type")
+        if kind == "blob":
+            files.add(
+                item["path"], item.get("size", 0),
+                item.get("sha", "")
+            )
+        elif kind == "commit" and item.get("sha"):
+            files.gitlinks[item["path"]] = item["sha"]
+    return files, bool(meta.get("truncated", False))
@@ -0,0 +1,248 @@
+import struct
+import zipfile
+import logging
+from array import array
+
+logger = logging.getLogger("GitHubDownloader")
+
+
+# ════════════════════════════════════════════════
+# Compact Central-Directory Index
+# ════════════════════════════════════════════════
+#
+# zipfile.ZipFile يبني ZipInfo كامل لكل عضو عند الفتح —
+# مع مليون ملف ده مئات الـ MB قبل ما نكتب أي حاجة.
+# هنا الـ central directory يُقرأ على أجزاء إلى arrays
+# (offsets / أحجام / CRC) + كل الأسماء في buffer واحد،
+# و ZipInfo يُبنى لعضو واحد بس وقت الحاجة.
+
+_CD_STRUCT = struct.Struct(zipfile.structCentralDir)
+_CD_SIG = zipfile.stringCentralDir
+_CD_SIZE = _CD_STRUCT.size
+_ZIP64_EXTRA = 0x0001
+_MAX32 = 0xFFFFFFFF
+_UTF8_FLAG = 0x800
+
+READ_BLOCK = 1024 * 1024
+
+
+class ZipIndex:
+    """
+    فهرس مضغوط لأرشيف ZIP محلي (قراءة فقط).
+    - names(): الأسماء كـ generator (لاكتشاف الجذر)
+    - infolist(): ZipInfo لكل عضو واحداً واحداً
+    - open(info): قارئ العضو (stored / deflate) مع تحقق CRC
+    يكفي كبديل لـ ZipFile في accel.open_member / testzip.
+    fileobj: يقرأ الفهرس من ملف مفتوح بدل path
+    (مثل remote_zip.HTTPRangeFile — open() غير متاح وقتها).
+    يرمي zipfile.BadZipFile لو الأرشيف غير صالح.
+    """
+
+    def __init__(self, path=None, fileobj=None):
+        self.filename = path
+        self._offsets = array("Q")
+        self._csizes = array("Q")
+        self._sizes = array("Q")
+        self._crcs = array("L")
+        self._methods = array("H")
+        self._flags = array("H")
+        self._attrs = array("L")
+        self._dos = array("L")  # (date << 16) | time
+        self._name_ends = array("Q")
+        self._names = bytearray()
+        if fileobj is not None:
+            self._read_central_directory(fileobj)
+            return
+        with open(path, "rb") as f:
+            self._read_central_directory(f)
+
+    # ─── القراءة ───
+
+    def _read_central_directory(self, f):
+        # _EndRecData من zipfile نفسها: EOCD + zip64 + التعليق
+        endrec = zipfile._EndRecData(f)
+        if endrec is None:
+            raise zipfile.BadZipFile("File is not a zip file")
+        size_cd = endrec[zipfile._ECD_SIZE]
+        offset_cd = endrec[zipfile._ECD_OFFSET]
+        count = endrec[zipfile._ECD_ENTRIES_TOTAL]
+        # بيانات قبل الأرشيف (مثل self-extracting)
+        concat = endrec[zipfile._ECD_LOCATION] - size_cd - offset_cd
+        if endrec[zipfile._ECD_SIGNATURE] == zipfile.stringEndArchive64:
+            concat -= (
+                zipfile.sizeEndCentDir64
+                + zipfile.sizeEndCentDir64Locator
+            )
+        if concat < 0:
+            raise zipfile.BadZipFile("Bad offset for central directory")
+        self._concat = concat
+
+        f.seek(offset_cd + concat)
+        left = size_cd
+        buf = b""
+        pos = 0
+        while True:
+            if len(buf) - pos < _CD_SIZE or not self._entry_complete(
+                buf, pos
+            ):
+                if left <= 0:
+                    break
+                block = f.read(min(READ_BLOCK, left))
+                if not block:
+                    raise zipfile.BadZipFile(
+                        "Truncated central directory"
+                    )
+                left -= len(block)
+                buf = buf[pos:] + block
+                pos = 0
+                continue
+            pos = self._parse_entry(buf, pos)
+
+        if pos != len(buf):
+            raise zipfile.BadZipFile("Truncated central directory")
+        if len(self) != count:
+            logger.warning(
+                f"Central directory: {len(self)} entries,"
+                f" EOCD says {count}"
+            )
+
+    @staticmethod
+    def _entry_complete(buf, pos):
+        fields = _CD_STRUCT.unpack_from(buf, pos)
+        end = pos + _CD_SIZE + sum(fields[12:15])
+        return end <= len(buf)
+
+    def _parse_entry(self, buf, pos):
+        (
+            sig, _, _, _, _, flags, method, dos_time, dos_date,
+            crc, csize, size, name_len, extra_len, comment_len,
+            _, _, attrs, offset
+        ) = _CD_STRUCT.unpack_from(buf, pos)
+        if sig != _CD_SIG:
+            raise zipfile.BadZipFile(
+                "Bad magic number for central directory"
+            )
+        start = pos + _CD_SIZE
+        name = buf[start:start + name_len]
+        extra = buf[start + name_len:start + name_len + extra_len]
+
+        if _MAX32 in (size, csize, offset):
+            size, csize, offset = self._zip64(
+                extra, size, csize, offset
+            )
+
+        self._names += name
+        self._name_ends.append(len(self._names))
+        self._offsets.append(offset + self._concat)
+        self._csizes.append(csize)
+        self._sizes.append(size)
+        self._crcs.append(crc)
+        self._methods.append(method)
+        self._flags.append(flags)
+        self._attrs.append(attrs)
+        self._dos.append(dos_date << 16 | dos_time)
+        return start + name_len + extra_len + comment_len
+
+    @staticmethod
+    def _zip64(extra, size, csize, offset):
+        """قيم الـ zip64 extra field بنفس ترتيب المواصفة"""
+        i = 0
+        while i + 4 <= len(extra):
+            tag, length = struct.unpack_from("<HH", extra, i)
+            if tag == _ZIP64_EXTRA:
+                data = extra[i + 4:i + 4 + length]
+                values = list(struct.unpack_from(
+                    f"<{len(data) // 8}Q", data
+                ))
+                try:
+                    if size == _MAX32:
+                        size = values.pop(0)
+                    if csize == _MAX32:
+                        csize = values.pop(0)
+                    if offset == _MAX32:
+                        offset = values.pop(0)
+                except IndexError:
+                    raise zipfile.BadZipFile(
+                        "Corrupt zip64 extra field"
+                    )
+                break
+            i += 4 + length
+        return size, csize, offset
+
+    # ─── الوصول ───
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass  # الملف يُفتح لكل عضو على حدة
+
+    def _name(self, i):
+        start = self._name_ends[i - 1] if i else 0
+        raw = bytes(self._names[start:self._name_ends[i]])
+        if self._flags[i] & _UTF8_FLAG:
+            return raw.decode("utf-8")
+        return raw.decode("cp437")
+
+    def names(self):
+        """أسماء الأعضاء بالترتيب (بدون بناء قائمة)"""
+        for i in range(len(self)):
+            yield self._name(i)
+
+    def is_dir(self, i):
+        end = self._name_ends[i]
+        return end > 0 and self._names[end - 1] == ord("/")
+
+    def file_count(self):
+        """عدد الملفات (بدون المجلدات)"""
+        return sum(
+            1 for i in range(len(self)) if not self.is_dir(i)
+        )
+
+    def sizes(self, i):
+        """(الحجم بعد الفك، الحجم المضغوط) للعضو رقم i"""
+        return self._sizes[i], self._csizes[i]
+
+    def total_size(self):
+        """مجموع الأحجام بعد الفك"""
+        return sum(self._sizes)
+
+    def info(self, i):
+        """ZipInfo للعضو رقم i (يُبنى عند الطلب)"""
+        dos = self._dos[i]
+        d, t = dos >> 16, dos & 0xFFFF
+        zi = zipfile.ZipInfo(
+            self._name(i),
+            (
+                (d >> 9) + 1980, (d >> 5) & 0xF, d & 0x1F,
+                t >> 11, (t >> 5) & 0x3F, (t & 0x1F) * 2
+            )
+        )
+        zi.compress_type = self._methods[i]
+        zi.flag_bits = self._flags[i]
+        zi.CRC = self._crcs[i]
+        zi.compress_size = self._csizes[i]
+        zi.file_size = self._sizes[i]
+        zi.header_offset = self._offsets[i]
+        zi.external_attr = self._attrs[i]
+        return zi
+
+    def infolist(self):
+        """ZipInfo لكل عضو — generator وليس قائمة كاملة"""
+        for i in range(len(self)):
+            yield self.info(i)
+
+    def open(self, info):
+        """قارئ للعضو مع تحقق CRC والحجم (stored / deflate)"""
+        import accel
+        if self.filename is None:
+            raise ValueError("ZipIndex من fileobj: لا يوجد ملف محلي")
+        if info.flag_bits & 0x1:
+            raise zipfile.BadZipFile(f"{info.filename}: مشفر")
+        return accel.open_raw_member(self.filename, info)